@@ -1,27 +1,27 @@
 from datetime import datetime, timedelta
 from decimal import Decimal
-from io import BytesIO
-import csv
 
 from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Sum, Count, F, DecimalField, IntegerField, ExpressionWrapper, Value
-from django.db.models.functions import ExtractYear, ExtractMonth, ExtractWeek, ExtractQuarter, TruncDate
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
 
-from orders.models import Order, OrderItem
-from catalog.models import Product, Brand, Category, Variant
+from aj_shoes_backend.csv_stream import streaming_csv_response
+from aj_shoes_backend.xlsx_stream import xlsx_file_response
+from aj_shoes_backend.sales_aggregate import SOURCES, aggregate_sales
+from orders.models import OrderItem
 
 def _parse_params(request):
-    # dates: YYYY-MM-DD
+    return _parse_filters(request.query_params)
+
+def _parse_filters(q):
+    # q: query_params หรือ dict ตัวกรองของ ExportJob — dates: YYYY-MM-DD
     def parse_date(s, default=None):
         if not s:
             return default
         return datetime.strptime(s, "%Y-%m-%d").replace(tzinfo=timezone.get_current_timezone())
 
-    q = request.query_params
     date_from = parse_date(q.get("date_from"), timezone.now() - timedelta(days=30))
     date_to = parse_date(q.get("date_to"), timezone.now())
     group = (q.get("group") or "day").lower()
@@ -47,117 +47,70 @@ def _base_queryset(date_from, date_to, brands, categories, coupons):
         items = items.filter(order__coupon__code__in=coupons)
     return items
 
-def _money_expr():
-    return ExpressionWrapper(F("price") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2))
+def _rollup_days(date_from, date_to):
+    # ยอดขายรวมเป็นรายวัน → ช่วงวันที่นับรวมทั้งวันของ date_from และ date_to
+    return timezone.localdate(date_from), timezone.localdate(date_to)
+
+def _aggregate(request, brands, categories, coupons, date_from, date_to):
+    # ?source=orders → คำนวณสดจาก OrderItem (ตรวจเทียบ rollup / ก่อนรัน backfill_sales_rollup)
+    source = request.query_params.get("source") or "rollup"
+    if source not in SOURCES:
+        source = "rollup"
+    day_from, day_to = _rollup_days(date_from, date_to)
+    return aggregate_sales(day_from, day_to, brands, categories, coupons, source=source)
+
+def _series_label(day, group):
+    if group == "month":
+        return f"{day.year}-{day.month:02d}"
+    if group == "week":
+        iso = day.isocalendar()
+        return f"{iso[0]}-W{iso[1]:02d}"
+    if group == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    return day.strftime("%Y-%m-%d")
+
+def _series(daily, group):
+    """รวมแถวรายวันเป็น week/month/quarter ใน Python (จำนวนวันในช่วงมีไม่มาก) → group ไหนก็ใช้ผลรวมชุดเดียวกัน"""
+    buckets = {}
+    for day in sorted(daily):
+        b = buckets.setdefault(_series_label(day, group), {"revenue": Decimal(0), "items": 0, "orders": 0})
+        for key in b:
+            b[key] += daily[day][key]
+    return [{"label": label, **b, "revenue": float(b["revenue"])} for label, b in buckets.items()]
+
+def _top_products(products, limit):
+    # คีย์ product__name_en คงไว้ตามที่ frontend ใช้อยู่ (Product มีแค่ name)
+    return [{"product_id": p["id"], "product__name_en": p["name"], "qty": p["items"], "revenue": float(p["revenue"])}
+            for p in products[:limit]]
 
 class SalesSummaryView(APIView):
+    """
+    สรุปยอดขาย (order ที่ชำระแล้วขึ้นไป) จาก DailySalesRollup
+    ทุก breakdown มาจาก SQL คำสั่งเดียว (GROUPING SETS, aj_shoes_backend/sales_aggregate.py)
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         date_from, date_to, group, brands, categories, coupons, limit = _parse_params(request)
-        items = _base_queryset(date_from, date_to, brands, categories, coupons)
-
-        # Totals
-        totals = items.aggregate(
-            revenue=Sum(_money_expr()),
-            items=Sum("quantity", output_field=IntegerField()),
-            orders=Count("order", distinct=True),
-        )
-
-        # Grouped series
-        if group == "day":
-            qs = items.annotate(g=TruncDate("order__created_at")).values("g")
-        elif group == "month":
-            qs = items.annotate(y=ExtractYear("order__created_at"), m=ExtractMonth("order__created_at")).values("y","m")
-        elif group == "week":
-            qs = items.annotate(y=ExtractYear("order__created_at"), w=ExtractWeek("order__created_at")).values("y","w")
-        elif group == "quarter":
-            qs = items.annotate(y=ExtractYear("order__created_at"), q=ExtractQuarter("order__created_at")).values("y","q")
-        else:
-            qs = items.annotate(g=TruncDate("order__created_at")).values("g")
-
-        if group == "day":
-            series_qs = qs.annotate(
-                revenue=Sum(_money_expr()), items=Sum("quantity"), orders=Count("order", distinct=True)
-            ).order_by("g")
-            series = [{
-                "label": x["g"].strftime("%Y-%m-%d"),
-                "revenue": float(x["revenue"] or 0),
-                "items": x["items"] or 0,
-                "orders": x["orders"] or 0,
-            } for x in series_qs]
-        elif group == "month":
-            series_qs = qs.annotate(
-                revenue=Sum(_money_expr()), items=Sum("quantity"), orders=Count("order", distinct=True)
-            ).order_by("y","m")
-            series = [{
-                "label": f"{x['y']}-{x['m']:02d}",
-                "revenue": float(x["revenue"] or 0),
-                "items": x["items"] or 0,
-                "orders": x["orders"] or 0,
-            } for x in series_qs]
-        elif group == "week":
-            series_qs = qs.annotate(
-                revenue=Sum(_money_expr()), items=Sum("quantity"), orders=Count("order", distinct=True)
-            ).order_by("y","w")
-            series = [{
-                "label": f"{x['y']}-W{x['w']:02d}",
-                "revenue": float(x["revenue"] or 0),
-                "items": x["items"] or 0,
-                "orders": x["orders"] or 0,
-            } for x in series_qs]
-        else:  # quarter
-            series_qs = qs.annotate(
-                revenue=Sum(_money_expr()), items=Sum("quantity"), orders=Count("order", distinct=True)
-            ).order_by("y","q")
-            series = [{
-                "label": f"{x['y']}-Q{x['q']}",
-                "revenue": float(x["revenue"] or 0),
-                "items": x["items"] or 0,
-                "orders": x["orders"] or 0,
-            } for x in series_qs]
-
-        # Breakdown by brand
-        by_brand = list(items.values("product__brand_id", "product__brand__name").annotate(
-            revenue=Sum(_money_expr()), items=Sum("quantity")
-        ).order_by("-revenue"))
-        for b in by_brand:
-            b["revenue"] = float(b["revenue"] or 0)
-
-        # Breakdown by category
-        by_cat = list(items.values("product__category_id", "product__category__name").annotate(
-            revenue=Sum(_money_expr()), items=Sum("quantity")
-        ).order_by("-revenue"))
-        for c in by_cat:
-            c["revenue"] = float(c["revenue"] or 0)
-
-        # Breakdown by coupon
-        by_coupon = list(items.values("order__coupon__code").annotate(
-            revenue=Sum(_money_expr()), items=Sum("quantity")
-        ).order_by("-revenue"))
-        for c in by_coupon:
-            c["revenue"] = float(c["revenue"] or 0)
-
-        # Top products
-        top = list(items.values("product_id","product__name_en").annotate(
-            qty=Sum("quantity"), revenue=Sum(_money_expr())
-        ).order_by("-revenue")[:limit])
-        for t in top:
-            t["revenue"] = float(t["revenue"] or 0)
+        agg = _aggregate(request, brands, categories, coupons, date_from, date_to)
+        daily = agg["daily"].values()
 
         return Response({
             "totals": {
-                "revenue": float(totals.get("revenue") or 0),
-                "items": totals.get("items") or 0,
-                "orders": totals.get("orders") or 0
+                "revenue": float(sum((d["revenue"] for d in daily), Decimal(0))),
+                "items": sum(d["items"] for d in daily),
+                "orders": sum(d["orders"] for d in daily),
             },
-            "series": series,
+            "series": _series(agg["daily"], group),
             "breakdown": {
-                "brands": by_brand,
-                "categories": by_cat,
-                "coupons": by_coupon
+                "brands": [{"product__brand_id": b["id"], "product__brand__name": b["name"],
+                            "revenue": float(b["revenue"]), "items": b["items"]} for b in agg["brands"]],
+                "categories": [{"product__category_id": c["id"], "product__category__name": c["name"],
+                                "revenue": float(c["revenue"]), "items": c["items"]} for c in agg["categories"]],
+                "coupons": [{"order__coupon__code": c["code"] or None,
+                             "revenue": float(c["revenue"]), "items": c["items"]} for c in agg["coupons"]],
             },
-            "top_products": top,
+            "top_products": _top_products(agg["products"], limit),
             "currency": "THB"
         })
 
@@ -165,102 +118,54 @@ class TopProductsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         date_from, date_to, group, brands, categories, coupons, limit = _parse_params(request)
-        items = _base_queryset(date_from, date_to, brands, categories, coupons)
-        top = list(items.values("product_id","product__name_en").annotate(
-            qty=Sum("quantity"), revenue=Sum(_money_expr())
-        ).order_by("-revenue")[:limit])
-        for t in top:
-            t["revenue"] = float(t["revenue"] or 0)
-        return Response(top)
+        agg = _aggregate(request, brands, categories, coupons, date_from, date_to)
+        return Response(_top_products(agg["products"], limit))
 
 def _export_items_queryset(request):
     date_from, date_to, group, brands, categories, coupons, limit = _parse_params(request)
     return _base_queryset(date_from, date_to, brands, categories, coupons)
 
+SALES_EXPORT_HEADER = ["order_id","created_at","product_id","name","brand","category","color","size_eu","size_cm","quantity","price","line_total","coupon"]
+EXPORT_CHUNK = 2000
+
+def _sales_export_rows(items):
+    """
+    แถว export ทีละแถวจาก server-side cursor (.iterator) เป็น tuple จาก values_list
+    ไม่สร้าง model instance / ไม่โหลดทั้ง queryset → หน่วยความจำคงที่ไม่ว่าช่วงวันที่จะยาวแค่ไหน
+    """
+    rows = items.values_list(
+        "order_id", "order__created_at", "product_id", "product__name", "product__brand__name",
+        "product__category__name", "variant__color", "variant__size_eu", "variant__size_cm",
+        "quantity", "price", "order__coupon__code",
+    ).iterator(chunk_size=EXPORT_CHUNK)
+    for (order_id, created_at, product_id, name, brand, category, color, size_eu, size_cm,
+         quantity, price, coupon) in rows:
+        price = price or 0
+        yield [
+            order_id, created_at.isoformat(), product_id, name, brand or "", category or "",
+            color, size_eu, size_cm, quantity, float(price), float(price * quantity), coupon or "",
+        ]
+
 class ExportCSVView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         items = _export_items_queryset(request)
-        # CSV header
-        header = ["order_id","created_at","product_id","name","brand","category","color","size_eu","size_cm","quantity","price","line_total","coupon"]
-        resp = HttpResponse(content_type="text/csv; charset=utf-8")
-        resp["Content-Disposition"] = "attachment; filename=ajshoes_sales.csv"
-        writer = csv.writer(resp)
-        writer.writerow(header)
-        for it in items:
-            line_total = (it.price or 0) * it.quantity
-            writer.writerow([
-                it.order_id,
-                it.order.created_at.isoformat(),
-                it.product_id,
-                it.product.name,
-                getattr(it.product.brand, "name", ""),
-                getattr(it.product.category, "name", ""),
-                it.variant.color,
-                it.variant.size_eu,
-                it.variant.size_cm,
-                it.quantity,
-                float(it.price or 0),
-                float(line_total),
-                getattr(getattr(it.order, "coupon", None), "code", ""),
-            ])
-        return resp
+        return streaming_csv_response("ajshoes_sales.csv", SALES_EXPORT_HEADER, _sales_export_rows(items))
 
 class ExportXLSXView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         try:
-            from openpyxl import Workbook
+            import openpyxl  # noqa: F401
         except Exception:
             return HttpResponse("openpyxl is required. Run: pip install openpyxl>=3.1.5", status=500, content_type="text/plain")
         items = _export_items_queryset(request)
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Sales"
-        header = ["order_id","created_at","product_id","name","brand","category","color","size_eu","size_cm","quantity","price","line_total","coupon"]
-        ws.append(header)
-        for it in items:
-            line_total = (it.price or 0) * it.quantity
-            ws.append([
-                it.order_id,
-                it.order.created_at.isoformat(),
-                it.product_id,
-                it.product.name,
-                getattr(it.product.brand, "name", ""),
-                getattr(it.product.category, "name", ""),
-                it.variant.color,
-                it.variant.size_eu,
-                it.variant.size_cm,
-                it.quantity,
-                float(it.price or 0),
-                float(line_total),
-                getattr(getattr(it.order, "coupon", None), "code", ""),
-            ])
-        bio = BytesIO()
-        wb.save(bio)
-        bio.seek(0)
-        resp = HttpResponse(bio.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        resp["Content-Disposition"] = "attachment; filename=ajshoes_sales.xlsx"
-        return resp
+        # write_only workbook ลงไฟล์ชั่วคราว ป้อนจาก iterator เดียวกับ CSV → หน่วยความจำคงที่
+        return xlsx_file_response("ajshoes_sales.xlsx", "Sales", SALES_EXPORT_HEADER, _sales_export_rows(items))
 
 class ExportStockCSVView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
-        from catalog.models import Variant
-        from django.http import StreamingHttpResponse
-        header = ["product_id","name","brand","category","color","size_eu","size_cm","stock"]
-        resp = HttpResponse(content_type="text/csv; charset=utf-8")
-        resp["Content-Disposition"] = "attachment; filename=ajshoes_stock.csv"
-        writer = csv.writer(resp)
-        writer.writerow(header)
-        qs = Variant.objects.select_related("product","product__brand","product__category").order_by("product_id","color","size_eu","size_cm")
-        for v in qs:
-            writer.writerow([
-                v.product_id,
-                v.product.name,
-                getattr(v.product.brand, "name", ""),
-                getattr(v.product.category, "name", ""),
-                v.color, v.size_eu, v.size_cm,
-                v.stock
-            ])
-        return resp
+        # stream ทีละก้อนจาก server-side cursor (ไฟล์เดียวกันนี้นำเข้ากลับได้ที่ variants/import_stock/)
+        from catalog.stock_io import EXPORT_HEADER, iter_stock_export
+        return streaming_csv_response("ajshoes_stock.csv", EXPORT_HEADER, iter_stock_export())
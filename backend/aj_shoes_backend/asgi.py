@@ -12,6 +12,10 @@ from aj_shoes_backend.jwt_ws import JWTAuthMiddlewareStack
 from chat.routing import websocket_urlpatterns as chat_ws
 from notifications.routing import websocket_urlpatterns as notif_ws
 
+# ✅ build index สำหรับ /api/catalog/suggest/ ใน background ตอน start
+from catalog.suggest_index import warm_suggest_index
+warm_suggest_index()
+
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": JWTAuthMiddlewareStack(
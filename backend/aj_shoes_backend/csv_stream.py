@@ -0,0 +1,39 @@
+# aj_shoes_backend/csv_stream.py
+"""
+ส่ง CSV แบบ streaming: header ออกไปทันที แล้วเขียนทีละก้อน (flush ทุก N แถว)
+ใช้กับ rows ที่เป็น generator (เช่น values_list().iterator()) → หน่วยความจำคงที่ไม่ว่าไฟล์จะใหญ่แค่ไหน
+ใต้ ASGI ก็ส่งทีละก้อน (ดู stream_response.py)
+"""
+import csv
+import io
+
+from aj_shoes_backend.stream_response import ChunkedStreamingHttpResponse
+
+FLUSH_ROWS = 1000
+
+
+def csv_chunks(header, rows, flush_rows=FLUSH_ROWS):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def streaming_csv_response(filename, header, rows, flush_rows=FLUSH_ROWS):
+    resp = ChunkedStreamingHttpResponse(csv_chunks(header, rows, flush_rows), content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f"attachment; filename={filename}"
+    return resp
@@ -0,0 +1,51 @@
+# aj_shoes_backend/export_job_views.py
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from accounts.permissions import IsSuperadmin
+from aj_shoes_backend.export_jobs import create_export_job
+from aj_shoes_backend.stream_response import ChunkedFileResponse
+from orders.models import ExportJob
+from orders.serializers import ExportJobSerializer
+
+
+class ExportJobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    POST   /api/admin/analytics/exports/                {"kind": "sales"|"stock", "format": "csv"|"xlsx", "filters": {...}}
+           → 202 job ใหม่ / 200 {"reused": true} เมื่อมีไฟล์ของตัวกรองเดียวกันและยังไม่มี order ใหม่
+    GET    /api/admin/analytics/exports/{id}/           poll สถานะ (เสร็จแล้วผู้สร้าง job และผู้ที่ได้ job นี้ไปตอน reuse
+                                                        ได้แจ้งเตือน kind=system ด้วย)
+    GET    /api/admin/analytics/exports/{id}/download/  ไฟล์ (409 ถ้ายังไม่เสร็จ)
+    filters ใช้คีย์เดียวกับ query string ของ export.csv: date_from, date_to, brands, categories, coupons
+    """
+    # job ที่ถูก reuse อาจเป็นของ superadmin คนอื่น → ทุกคนใน role นี้เห็น/ดาวน์โหลดได้
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSuperadmin]
+
+    def create(self, request):
+        kind = request.data.get("kind") or ExportJob.Kind.SALES
+        fmt = request.data.get("format") or ExportJob.Format.CSV
+        if kind not in ExportJob.Kind.values or fmt not in ExportJob.Format.values:
+            return Response(
+                {"detail": f"kind must be one of {ExportJob.Kind.values}, format one of {ExportJob.Format.values}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        filters = request.data.get("filters") or {}
+        if not isinstance(filters, dict):
+            return Response({"detail": "filters must be an object"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job, reused = create_export_job(request.user, kind, fmt, filters)
+        except ValueError:
+            return Response({"detail": "dates must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = dict(self.get_serializer(job).data, reused=reused)
+        return Response(data, status=status.HTTP_200_OK if reused else status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.Status.DONE or not job.file:
+            return Response({"detail": "export is not ready", "status": job.status}, status=status.HTTP_409_CONFLICT)
+        return ChunkedFileResponse(job.file.open("rb"), as_attachment=True, filename=job.file.name.rsplit("/", 1)[-1])
@@ -0,0 +1,283 @@
+# aj_shoes_backend/export_jobs.py
+"""
+export ยอดขาย / stock แบบ background job (แทนการ export ใน request ที่ค้าง worker เป็นนาที)
+- create_export_job(): บันทึก ExportJob แล้วส่งเข้า thread pool หลัง commit
+  (EXPORT_JOB_WORKERS=0 → ไม่รันใน web process ปล่อยให้ `manage.py run_export_jobs` หยิบไปทำ)
+- run_job(): เขียนไฟล์ CSV/XLSX ลง MEDIA_ROOT/exports/ แล้วแจ้งผู้สั่งผ่าน notifications
+- ตัวกรองเดิม + ข้อมูลยังไม่เปลี่ยน (fingerprint เท่ากัน) → คืน job/ไฟล์เดิม ไม่ export ซ้ำ
+  ยอดขาย: version = id ล่าสุด + จำนวน order ในช่วงวันที่ที่ขอ → มี order ใหม่ในช่วงนั้นเมื่อไหร่ค่อยสร้างใหม่
+  stock: version = namespace "catalog" (ถูก bump ทุกครั้งที่ stock เปลี่ยน)
+- job ที่ยังไม่จบมีได้ตัวเดียวต่อ fingerprint (unique constraint แบบมีเงื่อนไข) → request พร้อมกันได้ job เดียวกัน
+  ผู้ขอที่ได้ job ของคนอื่นไปถูกเพิ่มใน ExportJob.notify ให้ได้แจ้งเตือนตอนเสร็จด้วย
+  job ที่รอคิว/ทำนานเกิน STALE_MINUTES (process ตาย) ถูกส่งเข้าคิวใหม่แทนการรอไปเรื่อย ๆ
+  ถ้า run เดิมแค่ช้า (ยังไม่ตาย) จะมีสอง run → บันทึกผลแบบมีเงื่อนไขใน run_job: ผลถูกเขียนครั้งเดียว
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from aj_shoes_backend.analytics_views import SALES_EXPORT_HEADER, _base_queryset, _parse_filters, _sales_export_rows
+from aj_shoes_backend.csv_stream import csv_chunks
+from aj_shoes_backend.middleware.cache_api import namespace_version
+from aj_shoes_backend.xlsx_stream import write_xlsx
+from notifications.models import Notification
+from notifications.utils import create_and_push
+from orders.models import ExportJob, Order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAYS = 30
+STALE_MINUTES = 30  # QUEUED/RUNNING นานกว่านี้ถือว่า worker ตาย (ค่าเริ่มของ run_export_jobs --stale-minutes)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def normalize_filters(kind, raw):
+    """
+    ตัวกรองรูปแบบเดียวกับ query string ของ analytics (YYYY-MM-DD, id คั่นด้วย comma)
+    เรียง/ตัดค่าว่างให้เป็นรูปเดียว → ตัวกรองที่ความหมายเท่ากันได้ fingerprint เดียวกัน
+    date_from ที่ไม่ระบุถูกตรึงเป็นวันที่ (ย้อนหลัง 30 วัน) ตอนสร้าง job
+    """
+    if kind == ExportJob.Kind.STOCK:
+        return {}
+    raw = raw or {}
+
+    def ids(key):
+        values = str(raw.get(key) or "").split(",")
+        return ",".join(str(i) for i in sorted({int(v) for v in values if v.strip().isdigit()}))
+
+    filters = {
+        "date_from": str(raw.get("date_from") or "").strip()
+        or (timezone.localdate() - timedelta(days=DEFAULT_DAYS)).isoformat(),
+        "date_to": str(raw.get("date_to") or "").strip(),
+        "brands": ids("brands"),
+        "categories": ids("categories"),
+        "coupons": ",".join(sorted({c.strip() for c in str(raw.get("coupons") or "").split(",") if c.strip()})),
+    }
+    _parse_filters(filters)  # วันที่ผิดรูปแบบ → ValueError (view ตอบ 400)
+    return {k: v for k, v in filters.items() if v}
+
+
+def _data_version(kind, filters):
+    if kind == ExportJob.Kind.STOCK:
+        return namespace_version("catalog")
+    date_from, date_to = _parse_filters(filters)[:2]
+    agg = Order.objects.filter(created_at__gte=date_from, created_at__lte=date_to).aggregate(
+        last=Max("id"), n=Count("id")
+    )
+    return [agg["last"], agg["n"]]
+
+
+def fingerprint(kind, fmt, filters):
+    payload = json.dumps([kind, fmt, filters, _data_version(kind, filters)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _artifact_exists(job):
+    return bool(job.file) and job.file.storage.exists(job.file.name)
+
+
+def _is_stale(job, cutoff):
+    since = job.started_at if job.status == ExportJob.Status.RUNNING else job.queued_at
+    return since is None or since < cutoff
+
+
+def _requeue(job):
+    """ส่ง job ที่ค้างเข้าคิวใหม่ (conditional UPDATE → request ที่เจอพร้อมกันทำแค่ตัวเดียว)"""
+    if ExportJob.objects.filter(pk=job.pk, status=job.status, started_at=job.started_at).update(
+        status=ExportJob.Status.QUEUED, started_at=None, queued_at=timezone.now()
+    ):
+        logger.warning("export job %s was stale (%s), requeued", job.pk, job.status)
+        transaction.on_commit(lambda: enqueue(job.pk))
+    job.refresh_from_db()
+
+
+def _reusable_job(fp):
+    cutoff = timezone.now() - timedelta(minutes=STALE_MINUTES)
+    candidates = ExportJob.objects.filter(
+        fingerprint=fp, status__in=[ExportJob.Status.QUEUED, ExportJob.Status.RUNNING, ExportJob.Status.DONE]
+    ).order_by("-created_at")
+    for job in candidates[:5]:
+        if job.status == ExportJob.Status.DONE:
+            if _artifact_exists(job):
+                return job
+            continue
+        if _is_stale(job, cutoff):
+            _requeue(job)
+            if job.status not in (ExportJob.Status.QUEUED, ExportJob.Status.RUNNING):
+                continue  # จบไประหว่างนี้พอดี
+        return job
+    return None
+
+
+def create_export_job(user, kind, fmt, raw_filters=None):
+    """คืน (job, reused) — reused=True เมื่อใช้ไฟล์ที่ export ไว้แล้วหรือ job ที่กำลังทำอยู่"""
+    filters = normalize_filters(kind, raw_filters)
+    fp = fingerprint(kind, fmt, filters)
+    while True:
+        job = _reusable_job(fp)
+        if job is not None:
+            if job.status != ExportJob.Status.DONE and job.user_id != user.pk:
+                job.notify.add(user)
+            return job, True
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(user=user, kind=kind, fmt=fmt, filters=filters, fingerprint=fp)
+        except IntegrityError:
+            continue  # request อื่นสร้าง job ของ fingerprint นี้ไปก่อน (export_job_active_fingerprint) → ใช้ตัวนั้น
+        transaction.on_commit(lambda: enqueue(job.pk))
+        return job, False
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.EXPORT_JOB_WORKERS, thread_name_prefix="export-job"
+            )
+        return _executor
+
+
+def enqueue(job_id):
+    if settings.EXPORT_JOB_WORKERS > 0:
+        _get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception("export job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def _rows(job):
+    if job.kind == ExportJob.Kind.STOCK:
+        from catalog.stock_io import EXPORT_HEADER, iter_stock_export
+        return "Stock", EXPORT_HEADER, iter_stock_export()
+    date_from, date_to, _, brands, categories, coupons, _ = _parse_filters(job.filters)
+    items = _base_queryset(date_from, date_to, brands, categories, coupons)
+    return "Sales", SALES_EXPORT_HEADER, _sales_export_rows(items)
+
+
+class _Counted:
+    """นับแถวที่ผ่าน iterator (ไม่เก็บแถวไว้)"""
+
+    def __init__(self, rows):
+        self.rows, self.count = rows, 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def run_job(job_id):
+    """
+    ทำ job ที่ยัง QUEUED (claim ด้วย conditional UPDATE → worker หลายตัวไม่ทำ job เดียวกันซ้ำ)
+    job ที่ถูก requeue ระหว่างที่ run เดิมยังทำอยู่ → ผลถูกบันทึกแบบมีเงื่อนไข (ดู _finish)
+    คืน True ถ้าผลของการเรียกครั้งนี้ถูกบันทึก
+    """
+    now = timezone.now()
+    if not ExportJob.objects.filter(pk=job_id, status=ExportJob.Status.QUEUED).update(
+        status=ExportJob.Status.RUNNING, started_at=now
+    ):
+        return False
+    job = ExportJob.objects.select_related("user").get(pk=job_id)
+
+    try:
+        title, header, rows = _rows(job)
+        rows = _Counted(rows)
+        with tempfile.TemporaryFile() as tmp:
+            if job.fmt == ExportJob.Format.XLSX:
+                write_xlsx(tmp, title, header, rows)
+            else:
+                for chunk in csv_chunks(header, rows):
+                    tmp.write(chunk.encode("utf-8"))
+            tmp.seek(0)
+            job.file.save(f"ajshoes_{job.kind}_{job.pk}.{job.fmt}", File(tmp), save=False)
+        job.rows = rows.count
+        job.status = ExportJob.Status.DONE
+    except Exception as exc:
+        logger.exception("export job %s failed", job.pk)
+        job.status = ExportJob.Status.FAILED
+        job.error = str(exc)[:2000]
+    job.finished_at = timezone.now()
+    if not _finish(job, claimed_at=now):
+        logger.warning("export job %s was requeued and finished by another run, result discarded", job.pk)
+        if job.file:
+            job.file.delete(save=False)
+        return False
+    _notify(job)
+    return True
+
+
+def _finish(job, claimed_at):
+    """
+    บันทึกผลเฉพาะเมื่อ claim ของ run นี้ยังอยู่ (RUNNING + started_at เดิม)
+    ยกเว้นผลที่สำเร็จ: fingerprint เดียวกัน = ข้อมูลชุดเดียวกัน → run ที่เสร็จก่อนชนะแม้ job ถูก requeue ไปแล้ว
+    (ไม่งั้น job ที่ทำนานกว่า STALE_MINUTES จะถูก requeue วนไม่จบ) run ที่เสร็จทีหลังบันทึกไม่ได้
+    """
+    claim = Q(status=ExportJob.Status.RUNNING, started_at=claimed_at)
+    if job.status == ExportJob.Status.DONE:
+        claim |= Q(status__in=[ExportJob.Status.QUEUED, ExportJob.Status.RUNNING])
+    return ExportJob.objects.filter(claim, pk=job.pk).update(
+        file=job.file.name or "", rows=job.rows, status=job.status, error=job.error, finished_at=job.finished_at
+    )
+
+
+def _notify(job):
+    if job.status == ExportJob.Status.DONE:
+        title, message = "ไฟล์ export พร้อมดาวน์โหลด", f"{job.get_kind_display()} ({job.fmt.upper()}) {job.rows:,} แถว"
+    else:
+        title, message = "export ไม่สำเร็จ", job.error
+    data = {"export_job_id": job.pk, "status": job.status, "download_url": download_path(job)}
+    for user in [job.user, *job.notify.exclude(pk=job.user_id)]:
+        try:
+            create_and_push(user, Notification.Kind.SYSTEM, title, message, data=data)
+        except Exception:
+            # แจ้งเตือนไม่ได้ (เช่น channel layer ล่ม) ไม่ทำให้ job ล้ม — client ยัง poll สถานะได้
+            logger.exception("export job %s: notification to user %s failed", job.pk, user.pk)
+
+
+def download_path(job):
+    if job.status != ExportJob.Status.DONE:
+        return None
+    return f"/api/admin/analytics/exports/{job.pk}/download/"
+
+
+def requeue_stale(minutes=STALE_MINUTES):
+    """job ที่ค้าง RUNNING นานเกิน (process ตายกลางทาง) → กลับเป็น QUEUED"""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return ExportJob.objects.filter(status=ExportJob.Status.RUNNING, started_at__lt=cutoff).update(
+        status=ExportJob.Status.QUEUED, started_at=None, queued_at=timezone.now()
+    )
+
+
+def purge_jobs(days):
+    """ลบ job ที่จบแล้วเก่ากว่า `days` วันพร้อมไฟล์"""
+    cutoff = timezone.now() - timedelta(days=days)
+    old = ExportJob.objects.filter(
+        status__in=[ExportJob.Status.DONE, ExportJob.Status.FAILED], created_at__lt=cutoff
+    )
+    count = 0
+    for job in old.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -1,14 +1,152 @@
-import hashlib, time, os
+import hashlib, time
+from django.conf import settings
 from django.core.cache import caches
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+CACHE_PATHS = (
+    "/api/catalog/products/",
+    "/api/catalog/products/home_rows/",
+    "/api/catalog/brands/rows/",
+    "/api/catalog/categories/rows/",
+)
+
+# ---- namespace version (generation counter) ----
+# key ของ response ฝัง version ของ namespace ไว้ → bump แล้ว key เก่าจะไม่ถูกอ่านอีก (หมดอายุเองตาม TTL)
+NS_KEY = "api-cache-ns:{}"
+
+
+def _initial_version():
+    # ใช้เวลา (ms) เป็นค่าเริ่ม กันชนกับ version เก่าที่อาจยังค้างใน cache หลัง key ถูก evict
+    return int(time.time() * 1000)
+
+
+def namespace_version(ns="catalog"):
+    cache = caches["default"]
+    key = NS_KEY.format(ns)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key) or _initial_version()
+    return version
+
+
+def bump_namespace(ns="catalog"):
+    cache = caches["default"]
+    key = NS_KEY.format(ns)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_namespace_on_commit(ns="catalog"):
+    """bump หลัง commit เพื่อไม่ให้ request อื่น cache ข้อมูลก่อน commit ไว้ใต้ version ใหม่"""
+    transaction.on_commit(lambda: bump_namespace(ns))
+
+
+# ---- metrics (นับรวมทุก worker ผ่าน cache backend) ----
+METRIC_KEY = "api-cache-metrics:{}:{}"
+METRIC_EVENTS = ("hit", "miss", "stale", "lock_wait")
+
+
+def _metric(name, event):
+    cache = caches["default"]
+    key = METRIC_KEY.format(name, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+
+def cache_metrics(names=("api", "home_rows", "catalog_rows", "coupon_center")):
+    cache = caches["default"]
+    keys = {METRIC_KEY.format(n, e): (n, e) for n in names for e in METRIC_EVENTS}
+    found = cache.get_many(list(keys))
+    out = {n: {e: 0 for e in METRIC_EVENTS} for n in names}
+    for key, (n, e) in keys.items():
+        out[n][e] = int(found.get(key) or 0)
+    return out
+
+
+# ---- single-flight + stale-while-revalidate ----
+def cached_compute(key, build, ttl, stale_ttl=None, metric="api", lock_timeout=30, wait_seconds=5.0):
+    """
+    อ่านค่าจาก cache แบบกัน stampede:
+      - ยังไม่เลย soft expiry (ttl)        → hit
+      - เลย soft expiry แต่ยังไม่ถึง hard expiry (ttl + stale_ttl)
+          worker ที่ได้ lock จะ build ใหม่ ที่เหลือได้ค่าเก่าไปก่อน (stale)
+      - ไม่มีค่าเลย → worker ที่ได้ lock build, ที่เหลือรอ (lock_wait) แล้วอ่านผลที่ได้
+    lock ใช้ cache.add (SET NX บน Redis) จึงทำงานข้าม process ได้
+    build() คืน None = ไม่ต้อง cache ผลนี้
+    คืน (value, state) โดย state คือ "hit" | "miss" | "stale"
+    """
+    cache = caches["default"]
+    if stale_ttl is None:
+        stale_ttl = int(getattr(settings, "API_CACHE_STALE_SECONDS", 300))
+
+    entry = cache.get(key)
+    if entry is not None and entry["soft_exp"] > time.time():
+        _metric(metric, "hit")
+        return entry["value"], "hit"
+
+    lock_key = key + ":lock"
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        if entry is not None:
+            _metric(metric, "stale")
+            return entry["value"], "stale"
+
+        # ยังไม่มีค่าเก่าให้เสิร์ฟ → รอ worker ที่ถือ lock
+        _metric(metric, "lock_wait")
+        deadline = time.time() + wait_seconds
+        while time.time() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["value"], "hit"
+            if cache.add(lock_key, 1, timeout=lock_timeout):
+                break  # คนเดิมพลาด/lock หมดอายุ → build เอง
+        else:
+            _metric(metric, "miss")
+            return build(), "miss"
+
+    try:
+        value = build()
+        if value is not None:
+            cache.set(key, {"value": value, "soft_exp": time.time() + ttl}, timeout=ttl + stale_ttl)
+    finally:
+        cache.delete(lock_key)
+    _metric(metric, "miss")
+    return value, "miss"
+
+
+def _body_etag(body):
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def _etag_matches(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    if not header or not etag:
+        return False
+    etags = parse_etags(header)
+    # เทียบแบบ weak comparison (ตัด W/ ออก)
+    return "*" in etags or etag.strip('"') in {e.removeprefix("W/").strip('"') for e in etags}
 
-CACHE_PATHS = ("/api/catalog/products/", "/api/catalog/products/home_rows/")
 
 class APISimpleCacheMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
         self.cache = caches["default"]
-        self.ttl = int(os.getenv("API_CACHE_SECONDS", "60"))
+        self.ttl = int(getattr(settings, "API_CACHE_SECONDS", 60))
+        # browser/proxy ไม่รู้เรื่อง invalidation → ให้ max-age สั้นกว่า TTL ฝั่ง server
+        self.client_max_age = min(self.ttl, int(getattr(settings, "API_CACHE_CLIENT_MAX_AGE", 60)))
 
     def __call__(self, request):
         if request.method != "GET":
@@ -17,23 +155,47 @@ class APISimpleCacheMiddleware:
         if not any(path.startswith(p) for p in CACHE_PATHS):
             return self.get_response(request)
 
-        key = "api-cache:" + hashlib.sha256((request.get_full_path()).encode("utf-8")).hexdigest()
-        cached = self.cache.get(key)
-        if cached:
-            resp = HttpResponse(cached["body"], status=cached["status"], content_type=cached["ctype"])
-            for h, v in cached["headers"].items():
-                resp[h] = v
-            resp["X-Cache-Hit"] = "1"
-            return resp
+        version = namespace_version("catalog")
+        key = f"api-cache:{version}:" + hashlib.sha256((request.get_full_path()).encode("utf-8")).hexdigest()
+        built = {}
 
-        resp = self.get_response(request)
-        try:
-            body = resp.content
-            ctype = resp.get("Content-Type", "application/json")
-            headers = {"Cache-Control": f"public, max-age={self.ttl}"}
-            self.cache.set(key, {"body": body, "status": resp.status_code, "ctype": ctype, "headers": headers}, timeout=self.ttl)
-            resp["Cache-Control"] = headers["Cache-Control"]
+        def build():
+            resp = built["resp"] = self.get_response(request)
+            try:
+                headers = {"Cache-Control": f"public, max-age={self.client_max_age}"}
+                resp["Cache-Control"] = headers["Cache-Control"]
+                if resp.status_code != 200 or resp.streaming:
+                    return None
+                ctype = resp.get("Content-Type", "application/json")
+                # content hash เก็บคู่กับ body → request ถัดไปตอบ 304 ได้โดยไม่ต้อง serialize
+                headers["ETag"] = resp["ETag"] = _body_etag(resp.content)
+                return {"body": resp.content, "status": resp.status_code, "ctype": ctype, "headers": headers}
+            except Exception:
+                return None
+
+        cached, state = cached_compute(key, build, ttl=self.ttl, metric="api")
+        if "resp" in built:
+            resp = built["resp"]
+            if resp.status_code == 200 and _etag_matches(request, resp.get("ETag")):
+                return self._not_modified(resp.get("ETag"), hit="0")
             resp["X-Cache-Hit"] = "0"
-        except Exception:
-            pass
+            return resp
+
+        etag = cached["headers"].get("ETag")
+        if _etag_matches(request, etag):
+            return self._not_modified(etag, hit="1")
+
+        resp = HttpResponse(cached["body"], status=cached["status"], content_type=cached["ctype"])
+        for h, v in cached["headers"].items():
+            resp[h] = v
+        resp["X-Cache-Hit"] = "1"
+        if state == "stale":
+            resp["X-Cache-Stale"] = "1"
+        return resp
+
+    def _not_modified(self, etag, hit):
+        resp = HttpResponseNotModified()
+        resp["ETag"] = etag
+        resp["Cache-Control"] = f"public, max-age={self.client_max_age}"
+        resp["X-Cache-Hit"] = hit
         return resp
@@ -3,6 +3,11 @@ from datetime import datetime
 from django.http import JsonResponse
 from django.views import View
 from django.conf import settings
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
+from aj_shoes_backend.middleware.cache_api import cache_metrics
+from orders.expiry import sweeper_metrics
 import logging
 
 logger = logging.getLogger("frontend")
@@ -25,3 +30,19 @@ class FrontendLogView(View):
         }
         logger.error(json.dumps(meta, ensure_ascii=False))
         return JsonResponse({"ok": True, "rid": rid}, status=201)
+
+
+class CacheMetricsView(APIView):
+    """GET /api/admin/cache/metrics/ → ตัวนับ hit/miss/stale/lock_wait ของ API cache"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_metrics())
+
+
+class OrderSweeperMetricsView(APIView):
+    """GET /api/admin/orders/sweeper/metrics/ → ตัวนับสะสมของ sweeper (orders/expiry.py) + ผลรอบล่าสุด"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(sweeper_metrics())
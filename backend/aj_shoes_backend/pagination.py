@@ -0,0 +1,152 @@
+# aj_shoes_backend/pagination.py
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination บน ordering ที่คงที่ เช่น (-popularity, id) / (-created_at, id)
+    - ไม่มี OFFSET และไม่ COUNT(*) ทุก request → หน้าลึก ๆ เร็วเท่าหน้าแรก
+    - cursor เป็น base64 ของค่า key ของแถวสุดท้าย (opaque สำหรับ client)
+    - opt-in: ส่ง ?cursor= (ค่าว่าง = หน้าแรก) ถ้าไม่ส่ง view จะทำงานแบบเดิม (คืน list)
+      subclass ที่ตั้ง cursor_required = False จะแบ่งหน้าเสมอ (ไม่ส่ง cursor = หน้าแรก)
+    - ?with_total=1 → แนบ count แบบ cache ไว้ (estimate ไม่ต้องแม่นทุกวินาที)
+    """
+    ordering = ("-id",)
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    total_query_param = "with_total"
+    total_cache_seconds = 60
+    cursor_required = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_required and self.cursor_query_param not in request.query_params:
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering(queryset)
+
+        self.total = None
+        if request.query_params.get(self.total_query_param) in ("1", "true"):
+            self.total = self.estimate_total(queryset)
+
+        queryset = queryset.order_by(*self.keys)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "results": data}
+        if self.total is not None:
+            payload["count"] = self.total
+        return Response(payload)
+
+    # ---------- helpers ----------
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """
+        ใช้ ordering ของ queryset ถ้ามี (เช่น ?ordering= หรือ search rank)
+        แล้วต่อท้ายด้วย id ตามทิศของ class (เช่น (-popularity, id) ของสินค้า) ให้ unique
+        """
+        keys = [k for k in queryset.query.order_by if isinstance(k, str) and "__" not in k]
+        if not keys or len(keys) != len(queryset.query.order_by):
+            keys = list(self.ordering)
+        if not any(k.lstrip("-") in ("id", "pk") for k in keys):
+            keys.append(self.tie_breaker())
+        return tuple(keys)
+
+    def tie_breaker(self):
+        return next((k for k in self.ordering if k.lstrip("-") in ("id", "pk")), "id")
+
+    def after(self, position):
+        """(a DESC, b ASC) หลัง (x, y) → a < x OR (a = x AND b > y)"""
+        cond = Q()
+        equal = Q()
+        for key, value in zip(self.keys, position):
+            field = key.lstrip("-")
+            op = "lt" if key.startswith("-") else "gt"
+            cond |= equal & Q(**{f"{field}__{op}": value})
+            equal &= Q(**{field: value})
+        return cond
+
+    def encode_cursor(self, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key.lstrip("-"))
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        raw = json.dumps({"o": self.keys, "k": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            if tuple(data["o"]) != self.keys or len(data["k"]) != len(self.keys):
+                raise ValueError
+            return data["k"]
+        except Exception:
+            raise NotFound("Invalid cursor")
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.total_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def estimate_total(self, queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        key = "page-total:" + hashlib.sha256(f"{sql}|{params}".encode("utf-8")).hexdigest()
+        total = cache.get(key)
+        if total is None:
+            total = queryset.order_by().count()
+            cache.set(key, total, self.total_cache_seconds)
+        return total
+
+
+class ProductKeysetPagination(KeysetPagination):
+    ordering = ("-popularity", "id")
+    page_size = 24
+
+
+class RecentKeysetPagination(KeysetPagination):
+    """รีวิว / ประวัติคำสั่งซื้อ / การแจ้งเตือน: ใหม่สุดก่อน"""
+    ordering = ("-created_at", "-id")
+    page_size = 20
+
+
+class NotificationKeysetPagination(RecentKeysetPagination):
+    """
+    การแจ้งเตือน: แบ่งหน้าเสมอ (frontend ไม่ส่ง cursor) → หน้าแรกคือ 20 รายการล่าสุด
+    จำนวนที่ยังไม่อ่านสำหรับ badge ใช้ /notifications/unread-count/ แทนการนับจาก list
+    """
+    cursor_required = False
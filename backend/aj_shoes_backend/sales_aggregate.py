@@ -0,0 +1,180 @@
+# aj_shoes_backend/sales_aggregate.py
+"""
+ตัวรวมยอดขายของ dashboard: series รายวัน + breakdown brand / category / coupon / product ใน SQL คำสั่งเดียว
+- PostgreSQL: GROUP BY GROUPING SETS ((date), (brand), (category), (coupon), (product)) → scan ข้อมูลรอบเดียว
+  แล้วแยกแถวตาม GROUPING() ใน Python
+  จำนวน order ต่อวันต่อท้ายด้วย UNION ALL ใน statement เดียวกัน (orders/rollup.daily_order_counts_qs)
+  ไม่ใช้ COUNT(DISTINCT order_id) ใน grouping sets เพราะบังคับให้ PostgreSQL sort ทุก set แทน hash aggregate
+- source="rollup": อ่าน DailySalesRollup (ค่าเริ่มต้นของ dashboard)
+  source="orders": join OrderItem/Order/Product สด ๆ (ใช้ตรวจ rollup / ก่อน backfill)
+- method="queries": คิวรีแยกต่อ breakdown แบบเดิม — ใช้กับฐานข้อมูลอื่น และเป็น baseline ของ bench_sales_summary
+ผลลัพธ์: {"daily": {date: {"revenue", "items", "orders"}}, "brands"/"categories"/"products": [{"id", "name", ...}],
+          "coupons": [{"code", ...}]} แต่ละ breakdown เรียงตาม revenue มากไปน้อย
+"""
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from catalog.models import Brand, Category, Product
+from coupons.models import Coupon
+from orders.models import DailySalesRollup, Order, OrderItem
+from orders.rollup import counted_orders, daily_order_counts, daily_order_counts_qs, day_bounds
+
+SOURCES = ("rollup", "orders")
+METHODS = ("grouping_sets", "queries")
+
+# GROUPING(date, brand_id, category_id, coupon_code, product_id): bit = 1 เมื่อคอลัมน์นั้นไม่อยู่ใน set
+G_DATE, G_BRAND, G_CATEGORY, G_COUPON, G_PRODUCT = 0b01111, 0b10111, 0b11011, 0b11101, 0b11110
+G_ORDERS = -1  # แถวจำนวน order ต่อวันจาก UNION ALL
+
+_GROUPING_SQL = """
+WITH l AS ({lines})
+SELECT GROUPING(l.date, l.brand_id, l.category_id, l.coupon_code, l.product_id),
+       l.date, l.brand_id, b.name, l.category_id, c.name, l.coupon_code, l.product_id, p.name,
+       SUM(l.revenue), SUM(l.items), NULL::bigint
+FROM l
+JOIN {brand} b ON b.id = l.brand_id
+LEFT JOIN {category} c ON c.id = l.category_id
+JOIN {product} p ON p.id = l.product_id
+GROUP BY GROUPING SETS ((l.date), (l.brand_id, b.name), (l.category_id, c.name), (l.coupon_code), (l.product_id, p.name))
+"""
+
+
+def _filter_sql(brands, categories, coupons, brand_col, category_col, coupon_col):
+    where, params = [], []
+    for values, column in ((brands, brand_col), (categories, category_col), (coupons, coupon_col)):
+        if values:
+            where.append(f"{column} = ANY(%s)")
+            params.append(list(values))
+    return "".join(f" AND {w}" for w in where), params
+
+
+def _rollup_lines(day_from, day_to, brands, categories, coupons):
+    extra, params = _filter_sql(brands, categories, coupons, "brand_id", "category_id", "coupon_code")
+    sql = (
+        "SELECT date, brand_id, category_id, coupon_code, product_id, revenue, items "
+        f"FROM {DailySalesRollup._meta.db_table} WHERE date >= %s AND date <= %s{extra}"
+    )
+    return sql, [day_from, day_to, *params]
+
+
+def _order_lines(day_from, day_to, brands, categories, coupons):
+    start, end = day_bounds(day_from, day_to)
+    extra, params = _filter_sql(brands, categories, coupons, "p.brand_id", "p.category_id", "COALESCE(cp.code, '')")
+    sql = (
+        "SELECT (o.created_at AT TIME ZONE %s)::date AS date, p.brand_id, p.category_id, "
+        "COALESCE(cp.code, '') AS coupon_code, i.product_id, i.price * i.quantity AS revenue, "
+        "i.quantity AS items "
+        f"FROM {OrderItem._meta.db_table} i "
+        f"JOIN {Order._meta.db_table} o ON o.id = i.order_id "
+        f"JOIN {Product._meta.db_table} p ON p.id = i.product_id "
+        f"LEFT JOIN {Coupon._meta.db_table} cp ON cp.id = o.coupon_id "
+        f"WHERE o.status = ANY(%s) AND o.created_at >= %s AND o.created_at < %s{extra}"
+    )
+    return sql, [timezone.get_current_timezone_name(), list(Order.COUNTED_STATUSES), start, end, *params]
+
+
+def _empty():
+    return {"daily": {}, "brands": [], "categories": [], "coupons": [], "products": []}
+
+
+def _day(out, day):
+    return out["daily"].setdefault(day, {"revenue": Decimal(0), "items": 0, "orders": 0})
+
+
+def _sorted(out):
+    # revenue มากไปน้อย, เท่ากันเรียงตาม id/code (None ท้ายสุด) → ทุก method ได้ลำดับเดียวกัน
+    for key, ident in (("brands", "id"), ("categories", "id"), ("products", "id"), ("coupons", "code")):
+        out[key].sort(key=lambda x: (-x["revenue"], x[ident] is None, x[ident] if x[ident] is not None else 0))
+    return out
+
+
+def _grouping_sets(source, day_from, day_to, brands, categories, coupons):
+    build = _rollup_lines if source == "rollup" else _order_lines
+    lines, params = build(day_from, day_to, brands, categories, coupons)
+    sql = _GROUPING_SQL.format(
+        lines=lines, brand=Brand._meta.db_table, category=Category._meta.db_table, product=Product._meta.db_table,
+    )
+    counts = daily_order_counts_qs(day_from, day_to, brands, categories, coupons, live=source == "orders")
+    counts_sql, counts_params = counts.query.sql_with_params()
+    sql += (
+        f"UNION ALL SELECT {G_ORDERS}, oc.day, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, NULL, oc.n "
+        f"FROM ({counts_sql}) AS oc(day, n)"
+    )
+    params += list(counts_params)
+
+    out = _empty()
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    for (g, day, brand_id, brand_name, category_id, category_name, coupon_code, product_id, product_name,
+         revenue, items, orders) in rows:
+        if g == G_ORDERS:
+            _day(out, day)["orders"] = int(orders or 0)
+            continue
+        values = {"revenue": revenue or Decimal(0), "items": int(items or 0)}
+        if g == G_DATE:
+            d = _day(out, day)
+            d["revenue"], d["items"] = values["revenue"], values["items"]
+        elif g == G_BRAND:
+            out["brands"].append({"id": brand_id, "name": brand_name, **values})
+        elif g == G_CATEGORY:
+            out["categories"].append({"id": category_id, "name": category_name, **values})
+        elif g == G_COUPON:
+            out["coupons"].append({"code": coupon_code, **values})
+        elif g == G_PRODUCT:
+            out["products"].append({"id": product_id, "name": product_name, **values})
+    return _sorted(out)
+
+
+def _queries(source, day_from, day_to, brands, categories, coupons):
+    """คิวรีแยกต่อ breakdown (ORM) — ผลเท่ากับ _grouping_sets"""
+    if source == "rollup":
+        rows = DailySalesRollup.objects.filter(date__gte=day_from, date__lte=day_to).annotate(code=F("coupon_code"))
+        fields = {"brand": "brand", "category": "category", "product": "product"}
+        revenue, items = Sum("revenue"), Sum("items")
+    else:
+        rows = OrderItem.objects.filter(order__in=counted_orders(day_from, day_to)).annotate(
+            date=TruncDate("order__created_at"), code=Coalesce("order__coupon__code", Value("")),
+        )
+        fields = {"brand": "product__brand", "category": "product__category", "product": "product"}
+        revenue = Sum(F("price") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2))
+        items = Sum("quantity")
+    if brands:
+        rows = rows.filter(**{f"{fields['brand']}_id__in": brands})
+    if categories:
+        rows = rows.filter(**{f"{fields['category']}_id__in": categories})
+    if coupons:
+        rows = rows.filter(code__in=coupons)
+
+    out = _empty()
+    daily = rows.values("date").annotate(revenue=revenue, items=items).order_by()
+    if source == "orders":
+        daily = daily.annotate(orders=Count("order_id", distinct=True))
+    for x in daily:
+        d = _day(out, x["date"])
+        d["revenue"], d["items"], d["orders"] = x["revenue"] or Decimal(0), x["items"] or 0, x.get("orders", 0)
+    if source == "rollup":
+        for day, n in daily_order_counts(day_from, day_to, brands, categories, coupons).items():
+            _day(out, day)["orders"] = n
+    for key, field in (("brands", fields["brand"]), ("categories", fields["category"]), ("products", fields["product"])):
+        out[key] = [
+            {"id": x[f"{field}_id"], "name": x[f"{field}__name"], "revenue": x["revenue"] or Decimal(0), "items": x["items"] or 0}
+            for x in rows.values(f"{field}_id", f"{field}__name").annotate(revenue=revenue, items=items).order_by()
+        ]
+    out["coupons"] = [
+        {"code": x["code"], "revenue": x["revenue"] or Decimal(0), "items": x["items"] or 0}
+        for x in rows.values("code").annotate(revenue=revenue, items=items).order_by()
+    ]
+    return _sorted(out)
+
+
+def aggregate_sales(day_from, day_to, brands=(), categories=(), coupons=(), source="rollup", method=None):
+    """ยอดขายช่วง [day_from, day_to] ทุก breakdown — method=None เลือก grouping_sets บน PostgreSQL"""
+    if method is None:
+        method = "grouping_sets" if connection.vendor == "postgresql" else "queries"
+    run = _grouping_sets if method == "grouping_sets" else _queries
+    return run(source, day_from, day_to, list(brands), list(categories), list(coupons))
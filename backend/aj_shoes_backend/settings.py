@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "rest_framework",
     "rest_framework.authtoken",
@@ -186,7 +187,21 @@ POPULARITY_DECAY_DAYS = 14
 
 MIDDLEWARE.insert(0, "aj_shoes_backend.middleware.cache_api.APISimpleCacheMiddleware")
 
-API_CACHE_SECONDS = int(os.getenv("API_CACHE_SECONDS", "60"))
+# cache ฝั่ง server ถูก invalidate ด้วย namespace version (catalog/signals.py) จึงตั้ง TTL ยาวได้
+# แต่เฉพาะเมื่อ cache ใช้ร่วมกันทุก process (Redis) — LocMem แต่ละ worker เก็บ version ของตัวเอง
+# bump ใน worker หนึ่งไม่ถึง worker อื่น → คงค่าเริ่ม 60s
+API_CACHE_SECONDS = int(os.getenv("API_CACHE_SECONDS", "3600" if REDIS_URL else "60"))
+API_CACHE_CLIENT_MAX_AGE = int(os.getenv("API_CACHE_CLIENT_MAX_AGE", "60"))
+# หลังหมด TTL ยังเก็บค่าเดิมไว้เสิร์ฟระหว่างที่ worker ตัวเดียว build ใหม่ (stale-while-revalidate)
+API_CACHE_STALE_SECONDS = int(os.getenv("API_CACHE_STALE_SECONDS", "300"))
+
+# เก็บคูปองจำนวนจำกัด (flash drop) ด้วยตัวนับใน Redis แล้วค่อยบันทึก UserCoupon เป็น batch (coupons/flash.py)
+# ไม่มี Redis จะใช้ตัวนับในหน่วยความจำแทน ซึ่งถูกต้องเฉพาะตอนรัน process เดียว → ค่าเริ่มต้นจึงเปิดเมื่อมี REDIS_URL
+COUPON_FLASH_CLAIMS = os.getenv("COUPON_FLASH_CLAIMS", "1" if REDIS_URL else "0") == "1"
+
+# export ยอดขาย/stock แบบ background (aj_shoes_backend/export_jobs.py): จำนวน thread ต่อ web process
+# 0 = ไม่รันใน web process ให้ `manage.py run_export_jobs` ทำแทน (ไฟล์อยู่ใน MEDIA_ROOT/exports/)
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
 
 LOG_DIR = BASE_DIR / "logs"
 LOG_DIR.mkdir(exist_ok=True)
@@ -0,0 +1,32 @@
+# aj_shoes_backend/stream_response.py
+"""
+StreamingHttpResponse / FileResponse ที่ยังส่งทีละก้อนเมื่อรันใต้ ASGI (daphne)
+- Django 5.2 เจอ iterator แบบ sync ใน __aiter__ จะอ่านทั้งหมดด้วย sync_to_async(list) ก่อนส่ง
+  → export ขนาดใหญ่ถูกโหลดเข้า memory ทั้งไฟล์ และ client ไม่ได้ byte แรกจนกว่าจะอ่านครบ
+- ที่นี่ดึงทีละก้อนด้วย sync_to_async(next) แบบ thread_sensitive (thread เดียวกับ view
+  → server-side cursor ของ .iterator() ยังอยู่บน connection เดิม)
+- WSGI ใช้ __iter__ (sync) ตามเดิม
+"""
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, StreamingHttpResponse
+
+_END = object()
+
+
+class ChunkedAsyncIterMixin:
+    async def __aiter__(self):
+        chunks = iter(self.streaming_content)
+        pull = sync_to_async(next, thread_sensitive=True)
+        while True:
+            chunk = await pull(chunks, _END)
+            if chunk is _END:
+                return
+            yield chunk
+
+
+class ChunkedStreamingHttpResponse(ChunkedAsyncIterMixin, StreamingHttpResponse):
+    pass
+
+
+class ChunkedFileResponse(ChunkedAsyncIterMixin, FileResponse):
+    pass
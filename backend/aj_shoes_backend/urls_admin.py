@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 from catalog.admin_api import ProductAdminViewSet, ProductImageAdminViewSet, VariantAdminViewSet
 from coupons.admin_api import CouponAdminViewSet
 from accounts.admin_api import UserAdminViewSet
+from aj_shoes_backend.observability_views import CacheMetricsView, OrderSweeperMetricsView
 from aj_shoes_backend.analytics_views import SalesSummaryView, TopProductsView, ExportCSVView, ExportXLSXView, ExportStockCSVView
+from aj_shoes_backend.export_job_views import ExportJobViewSet
 
 router = DefaultRouter()
 router.register(r"catalog/products", ProductAdminViewSet, basename="admin-product")
@@ -11,6 +13,7 @@ router.register(r"catalog/images", ProductImageAdminViewSet, basename="admin-ima
 router.register(r"catalog/variants", VariantAdminViewSet, basename="admin-variant")
 router.register(r"coupons", CouponAdminViewSet, basename="admin-coupon")
 router.register(r"users", UserAdminViewSet, basename="admin-user")
+router.register(r"analytics/exports", ExportJobViewSet, basename="admin-export-job")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -19,4 +22,6 @@ urlpatterns = [
     path("analytics/export.csv", ExportCSVView.as_view()),
     path("analytics/export.xlsx", ExportXLSXView.as_view()),
     path("analytics/export_stock.csv", ExportStockCSVView.as_view()),
+    path("cache/metrics/", CacheMetricsView.as_view()),
+    path("orders/sweeper/metrics/", OrderSweeperMetricsView.as_view()),
 ]
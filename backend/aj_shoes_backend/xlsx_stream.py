@@ -0,0 +1,34 @@
+# aj_shoes_backend/xlsx_stream.py
+"""
+XLSX ขนาดใหญ่แบบหน่วยความจำคงที่
+- openpyxl write_only: เขียนแถวลงไฟล์ชั่วคราวทีละแถว ไม่เก็บ cell ทั้งชีตไว้ใน RAM
+- zip ลง TemporaryFile แล้วส่งด้วย FileResponse (อ่านส่งทีละก้อน ไม่ copy ทั้งไฟล์เข้า memory — ใต้ ASGI ด้วย
+  ดู stream_response.py)
+"""
+import tempfile
+
+from aj_shoes_backend.stream_response import ChunkedFileResponse
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def write_xlsx(fileobj, title, header, rows):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
+
+
+def xlsx_file_response(filename, title, header, rows):
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")  # ลบเองเมื่อ FileResponse ปิดไฟล์
+    try:
+        write_xlsx(tmp, title, header, rows)
+    except BaseException:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return ChunkedFileResponse(tmp, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
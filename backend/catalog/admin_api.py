@@ -1,5 +1,6 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django.db import transaction
@@ -9,9 +10,10 @@ from django.core.files.base import ContentFile
 import requests
 
 from .models import Product, ProductImage, Variant
+from .stock_io import StockImportError, import_stock, read_stock_file
 from .serializers import (
     ProductSerializer, ProductWriteSerializer,
-    ProductImageSerializer, VariantSerializer
+    ProductImageSerializer, VariantSerializer, with_rating_stats
 )
 
 
@@ -19,6 +21,12 @@ class ProductAdminViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all().prefetch_related("images", "variants")
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ["list", "retrieve"]:
+            qs = with_rating_stats(qs)
+        return qs
+
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
             return ProductSerializer
@@ -135,3 +143,20 @@ class VariantAdminViewSet(viewsets.ModelViewSet):
     queryset = Variant.objects.all()
     serializer_class = VariantSerializer
     permission_classes = [IsAdminUser]
+
+    @action(detail=False, methods=["post"], parser_classes=[MultiPartParser])
+    def import_stock(self, request):
+        """
+        multipart: file=<.csv | .xlsx> คอลัมน์ product_id, color, size_eu, size_cm, stock
+        ?dry_run=1 → ดูรายงาน diff อย่างเดียว ไม่แก้ stock
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        try:
+            rows, invalid = read_stock_file(upload, upload.name)
+            report = import_stock(rows, invalid, dry_run=dry_run)
+        except StockImportError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
@@ -1,7 +1,7 @@
 # catalog/filters.py  (ready-to-replace)
-from django.db.models import Q
 import django_filters as filters
 from .models import Product
+from .search import search_products
 
 def _truthy(v) -> bool:
     if isinstance(v, bool):
@@ -29,14 +29,11 @@ class ProductFilter(filters.FilterSet):
                   "min_price", "max_price", "discount_only", "on_sale"]
 
     def filter_search(self, qs, name, value: str):
+        value = (value or "").strip()
         if not value:
             return qs
-        return qs.filter(
-            Q(name__icontains=value)
-            | Q(description__icontains=value)
-            | Q(brand__name__icontains=value)
-            | Q(category__name__icontains=value)
-        ).distinct()
+        # Postgres FTS (+ trigram บนชื่อ) ดู catalog/search.py — แนบ search_rank ให้ view ใช้เรียง
+        return search_products(qs, value)
 
     def filter_discount_only(self, qs, name, value):
         if not _truthy(value):
@@ -0,0 +1,93 @@
+# catalog/fragments.py
+"""
+cache JSON ของสินค้ารายตัว (fragment) แทนการ serialize ใหม่ทุก request
+- key: product-frag:<profile>:<id> → (ns_version, product_version, data)
+- product_version: counter ต่อสินค้า bump เมื่อ Product/ProductImage/Variant/Review เปลี่ยน (signals)
+- ns_version: namespace "product_fragments" สำหรับงานแก้ข้อมูลทีละมาก ๆ (เช่น rebuild_rating_summary)
+- หนึ่งหน้าใช้ get_many ครั้งเดียว (version + fragment) แล้ว serialize เฉพาะตัวที่ miss
+  (prefetch images/variants ก็ทำเฉพาะตัวที่ miss)
+- ถ้าสินค้าถูกแก้ระหว่างที่ request อ่านแถวจาก DB กับตอนอ่าน version อาจได้ fragment เก่าใต้ version ใหม่
+  → จำกัดอายุด้วย FRAGMENT_SECONDS
+"""
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from aj_shoes_backend.middleware.cache_api import NS_KEY, namespace_version
+
+FRAGMENT_SECONDS = 600
+FRAGMENT_NS = "product_fragments"
+VERSION_KEY = "product-ver:{}"
+FRAGMENT_KEY = "product-frag:{}:{}"
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def bump_product_versions(product_ids):
+    cache = caches["default"]
+    for pid in {pid for pid in product_ids if pid}:
+        key = VERSION_KEY.format(pid)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+
+
+def bump_product_versions_on_commit(*product_ids):
+    transaction.on_commit(lambda: bump_product_versions(product_ids))
+
+
+def serialize_products(products, serializer_class, request, profile, prefetch=()):
+    """
+    คืน list ของ dict ตามลำดับเดิมของ `products`
+    `profile` แยก fragment ของ serializer คนละแบบ (เช่น "full" / "card")
+    """
+    products = list(products)
+    if not products:
+        return []
+    cache = caches["default"]
+    # URL ของไฟล์รูปเป็น absolute ตาม host ของ request
+    profile = f"{profile}@{request.get_host()}" if request is not None else profile
+
+    ns_key = NS_KEY.format(FRAGMENT_NS)
+    version_keys = [VERSION_KEY.format(p.pk) for p in products]
+    fragment_keys = [FRAGMENT_KEY.format(profile, p.pk) for p in products]
+    found = cache.get_many([ns_key, *version_keys, *fragment_keys])
+    ns = found.get(ns_key)
+    if ns is None:
+        ns = namespace_version(FRAGMENT_NS)
+
+    out = [None] * len(products)
+    misses = []
+    for i, (vkey, fkey) in enumerate(zip(version_keys, fragment_keys)):
+        version = found.get(vkey)
+        fragment = found.get(fkey)
+        if version is not None and fragment is not None and fragment[:2] == (ns, version):
+            out[i] = fragment[2]
+        else:
+            misses.append(i)
+    if not misses:
+        return out
+
+    # สินค้าที่ยังไม่มี version → ตั้งค่าเริ่ม (add กันทับ bump ที่เพิ่งเกิด)
+    new_versions = {version_keys[i]: _initial_version() for i in misses if found.get(version_keys[i]) is None}
+    for key, value in new_versions.items():
+        if not cache.add(key, value, timeout=None):
+            new_versions[key] = cache.get(key, value)
+    found.update(new_versions)
+
+    missed = [products[i] for i in misses]
+    if prefetch:
+        prefetch_related_objects(missed, *prefetch)
+    data = serializer_class(missed, many=True, context={"request": request}).data
+
+    to_store = {}
+    for i, item in zip(misses, data):
+        out[i] = item
+        to_store[fragment_keys[i]] = (ns, found[version_keys[i]], item)
+    cache.set_many(to_store, timeout=FRAGMENT_SECONDS)
+    return out
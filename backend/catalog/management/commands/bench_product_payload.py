@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+
+from catalog.models import Brand, Category, Product, ProductImage, Variant
+from catalog.serializers import ProductCardSerializer, ProductSerializer, with_card_fields, with_rating_stats
+
+COLORS = ["Black", "White", "Red", "Blue"]
+SIZES = [("39", "24.5"), ("40", "25"), ("41", "26"), ("42", "26.5"), ("43", "27.5")]
+
+
+class Command(BaseCommand):
+    help = "Benchmark product grid payload: ProductSerializer vs ProductCardSerializer (synthetic products, rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=24)
+        parser.add_argument("--rounds", type=int, default=50)
+        parser.add_argument("--images", type=int, default=6, help="รูปต่อสินค้า")
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(42)
+        size = opts["page_size"]
+        with transaction.atomic():
+            self._seed(opts["products"], opts["images"], rnd)
+            base = with_rating_stats(Product.objects.filter(brand__name__startswith="bench-payload-"))
+            profiles = (
+                ("full", lambda: base.prefetch_related("images", "variants"), ProductSerializer),
+                ("card", lambda: with_card_fields(base), ProductCardSerializer),
+            )
+
+            for name, queryset, serializer_class in profiles:
+                fetch, serialize, queries, body = [], [], 0, b""
+                for _ in range(opts["rounds"]):
+                    offset = rnd.randint(0, max(0, opts["products"] - size))
+                    with CaptureQueriesContext(connection) as ctx:
+                        t = time.perf_counter()
+                        items = list(queryset().order_by("-popularity", "id")[offset:offset + size])
+                        fetch.append(time.perf_counter() - t)
+                    queries = len(ctx.captured_queries)
+
+                    t = time.perf_counter()
+                    body = JSONRenderer().render(serializer_class(items, many=True).data)
+                    serialize.append(time.perf_counter() - t)
+
+                self.stdout.write(
+                    f"{name:>4}: page={size} bytes={len(body):>7} queries={queries} "
+                    f"fetch median={statistics.median(fetch) * 1000:7.2f}ms "
+                    f"serialize median={statistics.median(serialize) * 1000:7.2f}ms"
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, count, images, rnd):
+        brand = Brand.objects.create(name="bench-payload-brand")
+        cat = Category.objects.create(name="bench-payload-cat")
+        products = Product.objects.bulk_create([
+            Product(brand=brand, category=cat, name=f"bench shoe {i}", description="x" * 200,
+                    base_price=1000 + i, sale_percent=rnd.choice([0, 10, 20]), popularity=rnd.randint(0, 1000))
+            for i in range(count)
+        ], batch_size=2000)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, url_source=f"https://cdn.example.com/p/{p.pk}/{n}.jpg", alt=p.name,
+                         is_cover=(n == 0), sort_order=n, color=rnd.choice(COLORS),
+                         width=1200, height=1200, checksum=f"{p.pk:032x}")
+            for p in products for n in range(images)
+        ], batch_size=5000)
+        Variant.objects.bulk_create([
+            Variant(product=p, color=color, size_eu=eu, size_cm=cm, stock=rnd.randint(0, 5))
+            for p in products for color in COLORS[:2] for eu, cm in SIZES
+        ], batch_size=5000)
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import Brand, Category, Product
+from catalog.search import refresh_search_vectors
+from catalog.suggest_index import SuggestIndex
+from catalog.views import _suggest_from_db
+
+WORDS = ["air", "zoom", "pegasus", "runner", "court", "classic", "street", "ultra", "boost", "trail",
+         "แอร์", "ซูม", "วิ่ง", "คลาสสิก", "สตรีท", "เทรล"]
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    p = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000  # noqa: E731
+    return p(0.50), p(0.99)
+
+
+class Command(BaseCommand):
+    help = "Benchmark suggest latency: in-memory index vs ORM path (synthetic products, rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+        parser.add_argument("--queries", type=int, default=300)
+        parser.add_argument("--limit", type=int, default=8)
+
+    def handle(self, *args, **opts):
+        rnd = random.Random(42)
+        for size in opts["sizes"]:
+            with transaction.atomic():
+                self._seed(size, rnd)
+                queries = [self._query(rnd) for _ in range(opts["queries"])]
+
+                started = time.perf_counter()
+                index = SuggestIndex.build()
+                build_ms = (time.perf_counter() - started) * 1000
+
+                results = {}
+                for name, fn in (("orm", _suggest_from_db), ("index", index.suggest)):
+                    samples = []
+                    for q in queries:
+                        t = time.perf_counter()
+                        fn(q, opts["limit"])
+                        samples.append(time.perf_counter() - t)
+                    results[name] = _percentiles(samples)
+
+                self.stdout.write(
+                    f"products={size:>7} build={build_ms:8.1f}ms  "
+                    f"orm p50={results['orm'][0]:7.2f}ms p99={results['orm'][1]:7.2f}ms  "
+                    f"index p50={results['index'][0]:7.3f}ms p99={results['index'][1]:7.3f}ms"
+                )
+                transaction.set_rollback(True)
+
+    def _seed(self, size, rnd):
+        brands = [Brand.objects.create(name=f"bench-brand-{i}") for i in range(50)]
+        cats = [Category.objects.create(name=f"bench-cat-{i}") for i in range(20)]
+        batch = []
+        for i in range(size):
+            name = " ".join(rnd.sample(WORDS, 3)) + f" {i}"
+            batch.append(Product(brand=rnd.choice(brands), category=rnd.choice(cats), name=name,
+                                 description=name, base_price=1000, popularity=rnd.randint(0, 1000)))
+        Product.objects.bulk_create(batch, batch_size=5000)
+        refresh_search_vectors(Product.objects.filter(brand__in=brands))
+
+    def _query(self, rnd):
+        word = rnd.choice(WORDS)
+        return word[: rnd.randint(1, len(word))]
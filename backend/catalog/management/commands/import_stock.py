@@ -0,0 +1,56 @@
+# catalog/management/commands/import_stock.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.stock_io import StockImportError, import_stock, read_stock_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-set variant stock from a CSV/XLSX file (product_id, color, size_eu, size_cm, stock) "
+        "via COPY + one UPDATE ... FROM, and print a diff report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--dry-run", action="store_true", help="รายงาน diff อย่างเดียว ไม่แก้ stock")
+        parser.add_argument("--report", help="เขียนรายการที่เปลี่ยนทั้งหมดเป็น CSV ที่ path นี้")
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        try:
+            with open(opts["path"], "rb") as fh:
+                rows, invalid = read_stock_file(fh, opts["path"])
+            parsed = time.perf_counter()
+            report = import_stock(rows, invalid, dry_run=opts["dry_run"], report_limit=None)
+        except (OSError, StockImportError) as exc:
+            raise CommandError(str(exc))
+        done = time.perf_counter()
+
+        for row in report["invalid"][:20]:
+            self.stderr.write(f"line {row['line']}: {row['error']}")
+        for row in report["unknown"][:20]:
+            self.stderr.write(
+                f"line {row['line']}: unknown variant {row['product_id']} {row['color']} "
+                f"EU{row['size_eu']} / {row['size_cm']}cm"
+            )
+        if opts["report"]:
+            with open(opts["report"], "w", newline="", encoding="utf-8") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["variant_id", "product_id", "color", "size_eu", "size_cm", "old", "new", "delta"])
+                for c in report["changes"]:
+                    writer.writerow([c["variant_id"], c["product_id"], c["color"], c["size_eu"], c["size_cm"],
+                                     c["old"], c["new"], c["delta"]])
+
+        self.stdout.write(
+            f"rows={report['rows']} matched={report['matched']} updated={report['updated']} "
+            f"unchanged={report['unchanged']} unknown={report['unknown_count']} invalid={report['invalid_count']} "
+            f"duplicates={report['duplicates']} +{report['increased']} -{report['decreased']} "
+            f"parse={(parsed - started) * 1000:.0f}ms apply={(done - parsed) * 1000:.0f}ms"
+        )
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING("dry run: nothing changed"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"stock updated for {report['updated']} variant(s)"))
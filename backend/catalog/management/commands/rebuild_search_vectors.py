@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from catalog.models import Product
+from catalog.search import refresh_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.search_vector for every product"
+
+    def handle(self, *args, **kwargs):
+        count = refresh_search_vectors(Product.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Refreshed search vectors for {count} products."))
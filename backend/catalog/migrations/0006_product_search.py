@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# เติม search_vector ให้สินค้าที่มีอยู่แล้ว (ต้องตรงกับ catalog/search.py::search_vector_expr)
+BACKFILL_SQL = """
+UPDATE catalog_product p SET search_vector =
+    setweight(to_tsvector('simple', COALESCE(p.name, '')), 'A')
+    || setweight(to_tsvector('simple', COALESCE((SELECT b.name FROM catalog_brand b WHERE b.id = p.brand_id), '')), 'B')
+    || setweight(to_tsvector('simple', COALESCE((SELECT c.name FROM catalog_category c WHERE c.id = p.category_id), '')), 'B')
+    || setweight(to_tsvector('simple', COALESCE(p.description, '')), 'C');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_rename_description_en_product_description_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='product_name_upper_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('name', name='gin_trgm_ops'), name='product_name_trgm'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
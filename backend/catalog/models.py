@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.files.base import ContentFile
 from PIL import Image, ImageOps
 import hashlib
@@ -37,6 +40,20 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # name + brand + category + description (ดู catalog/search.py, อัปเดตผ่าน catalog/signals.py)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            # pg_trgm: icontains/istartswith (UPPER(name) LIKE ...) และข้อความไทยที่ไม่มีช่องว่าง
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="product_name_upper_trgm"),
+            # pg_trgm: trigram_word_similar (พิมพ์ผิด) สำหรับ suggest
+            GinIndex(OpClass("name", name="gin_trgm_ops"), name="product_name_trgm"),
+            # pg_trgm: description__icontains — คำไทยกลางคำอธิบาย (FTS แบบ simple แยกคำไทยไม่ได้)
+            GinIndex(OpClass(Upper("description"), name="gin_trgm_ops"), name="product_description_upper_trgm"),
+        ]
+
     def __str__(self):
         return self.name or f"Product #{self.pk}"
 
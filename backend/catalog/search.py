@@ -0,0 +1,80 @@
+# catalog/search.py
+"""
+Full-text search ของสินค้าบน Postgres
+- search_vector: name (A) + brand/category (B) + description (C) ใช้ config "simple"
+  (ไม่มี stemming → ใช้ได้ทั้งอังกฤษและไทย)
+- ข้อความไทยไม่มีช่องว่างระหว่างคำ จึงมี path สำรองเป็น pg_trgm (n-gram) บนชื่อและคำอธิบายสินค้า
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Brand, Category
+
+SEARCH_CONFIG = "simple"
+# อักขระพิเศษของ tsquery ที่ต้องตัดทิ้งก่อนสร้าง prefix query
+_TSQUERY_SPECIAL = re.compile(r"[\s&|!():*<>'\"\\]+")
+
+
+def search_vector_expr():
+    brand_name = Subquery(Brand.objects.filter(pk=OuterRef("brand_id")).values("name")[:1])
+    category_name = Subquery(Category.objects.filter(pk=OuterRef("category_id")).values("name")[:1])
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(brand_name, weight="B", config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(qs):
+    """UPDATE search_vector ของ queryset ในคิวรีเดียว (ไม่ยิง signal)"""
+    return qs.update(search_vector=search_vector_expr())
+
+
+def prefix_query(text):
+    """'air zo' → 'air':* & 'zo':*  (ใช้กับ suggest แบบพิมพ์ไปเรื่อย ๆ)"""
+    terms = [t for t in _TSQUERY_SPECIAL.split(text) if t]
+    if not terms:
+        return None
+    return SearchQuery(" & ".join(f"'{t}':*" for t in terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+def search_products(qs, text):
+    """
+    กรอง + จัดอันดับสินค้า:
+      FTS (GIN บน search_vector) หรือ substring บนชื่อ/คำอธิบาย (GIN trigram บน UPPER(name), UPPER(description))
+      หรือ substring บนชื่อ brand/category (FTS จับได้แค่ทั้งคำ → "Nik" / คำไทยกลางข้อความต้องใช้ icontains)
+      brand/category เป็นตารางเล็ก → หา id ก่อนใน subquery แล้วกรองด้วย brand_id/category_id
+    แนบ search_rank ไว้ให้ view ใช้เรียงลำดับ
+    """
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    cond = (
+        Q(search_vector=query)
+        | Q(name__icontains=text)
+        | Q(description__icontains=text)
+        | Q(brand_id__in=Brand.objects.filter(name__icontains=text).values("pk"))
+        | Q(category_id__in=Category.objects.filter(name__icontains=text).values("pk"))
+    )
+    return qs.filter(cond).annotate(
+        search_rank=SearchRank(F("search_vector"), query) + TrigramWordSimilarity(text, "name")
+    )
+
+
+def suggest_products(qs, text):
+    """prefix (FTS) + substring + typo-tolerant (trigram word similarity) บนชื่อสินค้า"""
+    cond = Q(name__icontains=text) | Q(name__trigram_word_similar=text)
+    pq = prefix_query(text)
+    if pq is not None:
+        cond |= Q(search_vector=pq)
+    return qs.filter(cond).annotate(similarity=TrigramWordSimilarity(text, "name"))
+
+
+def suggest_names(model, text):
+    """Brand/Category: substring หรือชื่อใกล้เคียง เรียงตามความใกล้"""
+    return (
+        model.objects.filter(Q(name__icontains=text) | Q(name__trigram_word_similar=text))
+        .annotate(similarity=TrigramWordSimilarity(text, "name"))
+        .order_by("-similarity", "name")
+    )
@@ -1,7 +1,51 @@
 # backend/catalog/serializers.py
+from django.core.files.storage import default_storage
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Brand, Category, Product, ProductImage, Variant
 
+
+def with_rating_stats(qs):
+    """
+    แนบ rating_sum / rating_count ให้ queryset ของ Product ในคิวรีเดียว
+    อ่านจากตารางสรุป orders.ProductRatingSummary (LEFT JOIN แบบ 1:1 ไม่ต้อง GROUP BY)
+    ProductSerializer จะอ่านค่าจาก annotation นี้แทนการยิง Review query ต่อสินค้า
+    """
+    return qs.annotate(
+        rating_sum=Coalesce(F("rating_summary__rating_sum"), 0),
+        rating_count=Coalesce(F("rating_summary__review_count"), 0),
+    )
+
+
+def with_card_fields(qs):
+    """
+    แนบ cover_file / cover_url / in_stock สำหรับ ProductCardSerializer
+    เป็น subquery ต่อแถว แทนการ prefetch รูปและ variant ทั้งหมดของทุกสินค้า
+    (รูป cover เลือกแบบเดียวกับ frontend: is_cover ก่อน ไม่งั้นรูปแรกตาม sort_order)
+    """
+    cover = ProductImage.objects.filter(product=OuterRef("pk")).order_by("-is_cover", "sort_order", "id")
+    return qs.annotate(
+        cover_file=Subquery(cover.values("file")[:1]),
+        cover_url=Subquery(cover.values("url_source")[:1]),
+        in_stock=Exists(Variant.objects.filter(product=OuterRef("pk"), stock__gt=0)),
+    )
+
+
+def _rating_stats(obj):
+    """คืน (sum, count) จาก annotation ถ้ามี ไม่งั้นอ่านจาก ProductRatingSummary ด้วย PK"""
+    if hasattr(obj, "rating_count"):
+        return obj.rating_sum or 0, obj.rating_count or 0
+
+    cached = getattr(obj, "_rating_stats_cache", None)
+    if cached is None:
+        # local import กัน circular (orders.models อ้างถึง Product)
+        from orders.models import ProductRatingSummary
+
+        row = ProductRatingSummary.objects.filter(pk=obj.pk).values_list("rating_sum", "review_count").first()
+        cached = obj._rating_stats_cache = row or (0, 0)
+    return cached
+
 # ---------- Base / Simple serializers ----------
 class BrandSerializer(serializers.ModelSerializer):
     class Meta:
@@ -76,18 +120,53 @@ class ProductSerializer(serializers.ModelSerializer):
         return str(obj.sale_price)
 
     def get_average_rating(self, obj):
-        # local import กัน circular (orders.models.Review อ้างถึง Product)
-        from django.db.models import Avg
-        from orders import models as order_models
-
-        agg = order_models.Review.objects.filter(product=obj).aggregate(avg=Avg("rating"))
-        avg = agg.get("avg") or 0
-        return round(float(avg), 1)
+        total, count = _rating_stats(obj)
+        return round(total / count, 1) if count else 0.0
 
     def get_review_count(self, obj):
-        from orders import models as order_models
+        return _rating_stats(obj)[1]
+
+
+# ---------- Product (Card) สำหรับ grid / rows ----------
+class ProductCardSerializer(serializers.ModelSerializer):
+    """
+    payload แบบย่อสำหรับการ์ดสินค้า (เลือกด้วย ?view=card บน list / rows / home_rows)
+    ไม่มี images/variants ทั้งชุด → queryset ต้องผ่าน with_card_fields() + with_rating_stats()
+    หน้า detail ยังใช้ ProductSerializer เต็มเหมือนเดิม
+    """
+    sale_price = serializers.SerializerMethodField()
+    average_rating = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
+    cover_image = serializers.SerializerMethodField()
+    in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "brand",
+            "category",
+            "name",
+            "base_price",
+            "sale_percent",
+            "sale_price",
+            "is_recommended",
+            "average_rating",
+            "review_count",
+            "cover_image",
+            "in_stock",
+        ]
+
+    get_sale_price = ProductSerializer.get_sale_price
+    get_average_rating = ProductSerializer.get_average_rating
+    get_review_count = ProductSerializer.get_review_count
 
-        return order_models.Review.objects.filter(product=obj).count()
+    def get_cover_image(self, obj):
+        if obj.cover_file:
+            url = default_storage.url(obj.cover_file)
+            request = self.context.get("request")
+            return request.build_absolute_uri(url) if request else url
+        return obj.cover_url or None
 
 
 # ---------- Product (Write) สำหรับ admin_api ----------
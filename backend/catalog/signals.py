@@ -0,0 +1,59 @@
+# catalog/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from .fragments import bump_product_versions_on_commit
+from .models import Brand, Category, Product, ProductImage, Variant
+from .search import refresh_search_vectors
+
+
+# ราคา/สต็อก/is_active เปลี่ยน → bump version ของ namespace "catalog"
+# response ที่ cache ไว้ (middleware, home_rows, rows) จะถูกมองข้ามทันที
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Variant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Variant)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def catalog_changed_bump_cache(sender, **kwargs):
+    bump_namespace_on_commit("catalog")
+
+
+# ---------- fragment cache ต่อสินค้า (catalog/fragments.py) ----------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed_bump_fragment(sender, instance: Product, **kwargs):
+    bump_product_versions_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Variant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=Variant)
+@receiver(post_delete, sender=ProductImage)
+def product_part_changed_bump_fragment(sender, instance, **kwargs):
+    bump_product_versions_on_commit(instance.product_id)
+
+
+# ---------- search_vector (catalog/search.py) ----------
+@receiver(post_save, sender=Product)
+def product_saved_refresh_search(sender, instance: Product, update_fields=None, **kwargs):
+    if update_fields is not None and not {"name", "description", "brand", "category"} & set(update_fields):
+        return
+    refresh_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved_refresh_search(sender, instance: Brand, created, **kwargs):
+    if not created:
+        refresh_search_vectors(Product.objects.filter(brand_id=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def category_saved_refresh_search(sender, instance: Category, created, **kwargs):
+    if not created:
+        refresh_search_vectors(Product.objects.filter(category_id=instance.pk))
@@ -0,0 +1,187 @@
+# catalog/stock_io.py
+"""
+นำเข้า/ส่งออก stock ของ variant ทีละมาก ๆ (sync กับคลังสินค้า)
+- ส่งออก: values_list().iterator() (server-side cursor) → ส่งต่อให้ csv_stream ได้เลย
+- นำเข้า: CSV หรือ XLSX คอลัมน์ product_id, color, size_eu, size_cm, stock
+  COPY เข้า temp table → หา diff → UPDATE ... FROM คำสั่งเดียว (50k แถวใช้เวลาระดับวินาที)
+  ค่า stock เป็นค่าสุทธิ (ทับค่าเดิม) แถวซ้ำ key เดียวกันใช้แถวหลังสุด
+"""
+import csv
+import io
+
+from django.db import connection, transaction
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from .fragments import bump_product_versions_on_commit
+from .models import Variant
+
+IMPORT_COLUMNS = ("product_id", "color", "size_eu", "size_cm", "stock")
+EXPORT_HEADER = ["product_id", "name", "brand", "category", "color", "size_eu", "size_cm", "stock"]
+EXPORT_CHUNK = 2000
+REPORT_LIMIT = 1000  # จำนวนแถวของ diff/unknown/invalid ที่ใส่ในรายงาน (ตัวนับยังนับครบ)
+
+
+class StockImportError(Exception):
+    """ไฟล์ใช้ไม่ได้ทั้งไฟล์ (อ่านไม่ออก / ไม่มีคอลัมน์ที่ต้องใช้)"""
+
+
+def iter_stock_export():
+    return (
+        Variant.objects.order_by("product_id", "color", "size_eu", "size_cm")
+        .values_list(
+            "product_id", "product__name", "product__brand__name", "product__category__name",
+            "color", "size_eu", "size_cm", "stock",
+        )
+        .iterator(chunk_size=EXPORT_CHUNK)
+    )
+
+
+def _cell(value):
+    # XLSX ให้ตัวเลขมาเป็น int/float (42 / 42.0 / 26.5) → เก็บเป็นข้อความแบบเดียวกับ CSV
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value).strip()
+
+
+def _table_rows(fileobj, filename):
+    """คืน (header, iterator ของ row) จาก CSV หรือ XLSX"""
+    if filename.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except Exception:
+            raise StockImportError("openpyxl is required for .xlsx files")
+        try:
+            sheet = load_workbook(fileobj, read_only=True, data_only=True).worksheets[0]
+        except Exception as exc:
+            raise StockImportError(f"cannot read xlsx: {exc}")
+        rows = sheet.iter_rows(values_only=True)
+    else:
+        rows = csv.reader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise StockImportError("file is empty")
+    except UnicodeDecodeError:
+        raise StockImportError("CSV must be UTF-8")
+    return [_cell(h).lower() for h in header], rows
+
+
+def read_stock_file(fileobj, filename):
+    """
+    อ่านไฟล์ → (rows, invalid)
+    rows: [(line, product_id, color, size_eu, size_cm, stock)], invalid: [{"line", "error"}]
+    """
+    header, table = _table_rows(fileobj, filename)
+    missing = [c for c in IMPORT_COLUMNS if c not in header]
+    if missing:
+        raise StockImportError(f"missing columns: {', '.join(missing)}")
+    index = [header.index(c) for c in IMPORT_COLUMNS]
+
+    rows, invalid = [], []
+    try:
+        for line, raw in enumerate(table, start=2):
+            values = [_cell(raw[i]) if i < len(raw) else "" for i in index]
+            if not any(values):
+                continue
+            product_id, color, size_eu, size_cm, stock = values
+            try:
+                product_id, stock = int(product_id), int(stock)
+            except ValueError:
+                invalid.append({"line": line, "error": "product_id and stock must be integers"})
+                continue
+            if stock < 0:
+                invalid.append({"line": line, "error": "stock must be >= 0"})
+            elif not (color and size_eu and size_cm):
+                invalid.append({"line": line, "error": "color, size_eu and size_cm are required"})
+            else:
+                rows.append((line, product_id, color, size_eu, size_cm, stock))
+    except UnicodeDecodeError:
+        raise StockImportError("CSV must be UTF-8")
+    return rows, invalid
+
+
+def _copy_rows(cursor, table, columns, rows):
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    if hasattr(cursor.cursor, "copy"):  # psycopg 3
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:  # psycopg2
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(sql + " WITH (FORMAT csv)", buffer)
+
+
+_MATCH = "v.product_id = s.product_id AND v.color = s.color AND v.size_eu = s.size_eu AND v.size_cm = s.size_cm"
+
+
+def import_stock(rows, invalid=(), dry_run=False, report_limit=REPORT_LIMIT):
+    """
+    ตั้ง stock ตาม rows จาก read_stock_file ในหนึ่ง transaction แล้วคืนรายงาน diff
+    dry_run=True → คำนวณรายงานเหมือนจริงแต่ไม่แก้อะไร, report_limit=None → ใส่ทุกแถวในรายงาน
+    """
+    if connection.vendor != "postgresql":
+        raise StockImportError("stock import requires PostgreSQL (COPY)")
+
+    variant_table = Variant._meta.db_table
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(
+            "CREATE TEMP TABLE stock_import (line integer, product_id bigint, color text, "
+            "size_eu text, size_cm text, stock integer) ON COMMIT DROP"
+        )
+        _copy_rows(cur, "stock_import", ("line", "product_id", "color", "size_eu", "size_cm", "stock"), rows)
+
+        # key ซ้ำ → เก็บแถวหลังสุด
+        cur.execute(
+            "DELETE FROM stock_import a USING stock_import b "
+            "WHERE a.product_id = b.product_id AND a.color = b.color AND a.size_eu = b.size_eu "
+            "AND a.size_cm = b.size_cm AND a.line < b.line"
+        )
+        duplicates = cur.rowcount
+
+        cur.execute(
+            f"SELECT s.line, s.product_id, s.color, s.size_eu, s.size_cm FROM stock_import s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {variant_table} v WHERE {_MATCH}) ORDER BY s.line"
+        )
+        unknown = cur.fetchall()
+
+        # lock แถวที่จะเปลี่ยนก่อน → ค่า old ในรายงานตรงกับที่ถูกทับจริง
+        cur.execute(
+            f"SELECT v.id, v.product_id, v.color, v.size_eu, v.size_cm, v.stock, s.stock "
+            f"FROM {variant_table} v JOIN stock_import s ON {_MATCH} "
+            f"WHERE v.stock <> s.stock ORDER BY v.id FOR UPDATE OF v"
+        )
+        changes = cur.fetchall()
+
+        if changes and not dry_run:
+            cur.execute(
+                f"UPDATE {variant_table} v SET stock = s.stock FROM stock_import s "
+                f"WHERE {_MATCH} AND v.stock <> s.stock"
+            )
+            bump_namespace_on_commit("catalog")
+            bump_product_versions_on_commit(*{row[1] for row in changes})
+
+    matched = len(rows) - duplicates - len(unknown)
+    return {
+        "dry_run": dry_run,
+        "rows": len(rows) + len(invalid),
+        "duplicates": duplicates,
+        "matched": matched,
+        "updated": len(changes),
+        "unchanged": matched - len(changes),
+        "unknown_count": len(unknown),
+        "invalid_count": len(invalid),
+        "increased": sum(new - old for *_, old, new in changes if new > old),
+        "decreased": sum(old - new for *_, old, new in changes if new < old),
+        "changes": [
+            {"variant_id": vid, "product_id": pid, "color": color, "size_eu": eu, "size_cm": cm,
+             "old": old, "new": new, "delta": new - old}
+            for vid, pid, color, eu, cm, old, new in changes[:report_limit]
+        ],
+        "unknown": [
+            {"line": line, "product_id": pid, "color": color, "size_eu": eu, "size_cm": cm}
+            for line, pid, color, eu, cm in unknown[:report_limit]
+        ],
+        "invalid": list(invalid)[:report_limit],
+    }
@@ -0,0 +1,167 @@
+# catalog/suggest_index.py
+"""
+Index สำหรับ autocomplete ในหน่วยความจำ (ต่อ process)
+- ชื่อสินค้า / แบรนด์ / หมวดหมู่ เรียงตาม popularity ไว้ล่วงหน้า
+- 1 ตัวอักษร: ตาราง top-K ต่อตัวอักษรแรกของแต่ละคำ
+- ตั้งแต่ 2 ตัวอักษร: bigram/trigram posting list (เรียงตามอันดับ) → ตรวจ substring แล้วหยุดเมื่อครบ limit
+  (ใช้ได้กับข้อความไทยที่ไม่มีช่องว่าง เพราะเป็น infix)
+- build ใน background thread ตอน start (asgi.py) และ rebuild เมื่อ namespace version ของ "catalog"
+  เปลี่ยน (catalog/signals.py) ระหว่างนั้นเสิร์ฟ index เดิม ถ้ายังไม่มี index เลย view จะ fallback ไป DB
+- ไม่มี typo tolerance / ไม่ค้น description: index ไม่เจออะไรเลย view จะถาม DB (trigram + FTS) แทน
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from aj_shoes_backend.middleware.cache_api import namespace_version
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 20                  # เก็บผลล่วงหน้าต่อ prefix สั้น (>= limit สูงสุดของ suggest)
+MIN_REBUILD_SECONDS = 30    # กัน rebuild ถี่เกินไปตอนมีการแก้ catalog ต่อเนื่อง (เช่น stock)
+MAX_AGE_SECONDS = 600       # rebuild เป็นระยะแม้ไม่มี signal (เผื่อแก้ผ่าน .update())
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class _NameIndex:
+    """entries เรียงตามอันดับแล้ว (index น้อย = popularity สูง)"""
+
+    def __init__(self, entries):
+        self.entries = entries  # [(key_lower, payload), ...]
+        self.short = defaultdict(list)
+        self.bigrams = defaultdict(list)
+        self.trigrams = defaultdict(list)
+        for idx, (key, _) in enumerate(entries):
+            for ch in {word[:1] for word in key.split()}:
+                bucket = self.short[ch]
+                if len(bucket) < TOP_K:
+                    bucket.append(idx)
+            for g in _ngrams(key, 2):
+                self.bigrams[g].append(idx)
+            for g in _ngrams(key, 3):
+                self.trigrams[g].append(idx)
+
+    def search(self, q, limit):
+        if len(q) < 2:
+            return [self.entries[i][1] for i in self.short.get(q, ())[:limit]]
+        if len(q) == 2:
+            postings = [self.bigrams.get(q)]
+        else:
+            postings = [self.trigrams.get(g) for g in _ngrams(q, 3)]
+        if not all(postings):
+            return []
+        out = []
+        for idx in min(postings, key=len):
+            key, payload = self.entries[idx]
+            if q in key:
+                out.append(payload)
+                if len(out) >= limit:
+                    break
+        return out
+
+
+class SuggestIndex:
+    def __init__(self, products, brands, categories, version):
+        self.products = _NameIndex(products)
+        self.brands = _NameIndex(brands)
+        self.categories = _NameIndex(categories)
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        from .models import Brand, Category, Product
+
+        version = namespace_version("catalog")
+        products, seen = [], set()
+        rows = (
+            Product.objects.values_list("id", "name", "brand__name")
+            .order_by("-popularity", "name")
+            .iterator(chunk_size=5000)
+        )
+        for pid, name, brand_name in rows:
+            value = (name or "").strip()
+            key = value.lower()
+            if not value or key in seen:
+                continue
+            seen.add(key)
+            label = f"{value} — {brand_name}" if brand_name else value
+            products.append((key, {"id": pid, "label": label, "value": value}))
+
+        def named(model):
+            qs = (
+                model.objects.annotate(weight=Coalesce(Sum("products__popularity"), 0))
+                .values_list("name", flat=True)
+                .order_by("-weight", "name")
+            )
+            out = []
+            for name in qs:
+                value = (name or "").strip()
+                if value:
+                    out.append((value.lower(), {"label": value, "value": value}))
+            return out
+
+        return cls(products, named(Brand), named(Category), version)
+
+    def suggest(self, q, limit):
+        """ลำดับเดียวกับ path DB: สินค้าก่อน แล้วแบรนด์ แล้วหมวดหมู่ (ตัดชื่อซ้ำ)"""
+        q = q.strip().lower()
+        results, seen = [], set()
+        for part in (self.products, self.brands, self.categories):
+            if len(results) >= limit:
+                break
+            for payload in part.search(q, limit):
+                key = payload["value"].lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(payload)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _rebuild():
+    global _index
+    try:
+        started = time.perf_counter()
+        _index = SuggestIndex.build()
+        logger.info("suggest index built in %.0f ms", (time.perf_counter() - started) * 1000)
+    except Exception:
+        logger.exception("suggest index build failed")
+    finally:
+        _build_lock.release()
+        connection.close()
+
+
+def warm_suggest_index():
+    """เริ่ม build ใน background (ถ้ายังไม่มีตัวอื่น build อยู่)"""
+    if _build_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild, name="suggest-index", daemon=True).start()
+
+
+def get_suggest_index():
+    """
+    คืน index ปัจจุบัน (อาจเก่ากว่า DB เล็กน้อยระหว่าง rebuild)
+    คืน None ถ้ายัง cold → ให้ caller ใช้ DB แทน
+    """
+    index = _index
+    if index is None:
+        warm_suggest_index()
+        return None
+    age = time.monotonic() - index.built_at
+    if age > MAX_AGE_SECONDS or (age > MIN_REBUILD_SECONDS and index.version != namespace_version("catalog")):
+        warm_suggest_index()
+    return index
@@ -2,17 +2,82 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.core.cache import cache
 
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from django.db.models import Q, CharField
-from django.db.models.functions import Concat
+from django.db.models import F, CharField, Window
+from django.db.models.functions import Concat, RowNumber
 from django.db.models import Value as V
+from django.conf import settings
+from itertools import groupby
 
 from .models import Brand, Category, Product
-from .serializers import BrandSerializer, CategorySerializer, ProductSerializer
+from .serializers import (
+    BrandSerializer, CategorySerializer, ProductSerializer, ProductCardSerializer,
+    with_rating_stats, with_card_fields,
+)
 from .filters import ProductFilter
+from .search import suggest_products, suggest_names
+from .suggest_index import get_suggest_index
+from .fragments import serialize_products
+from aj_shoes_backend.middleware.cache_api import namespace_version, cached_compute
+from aj_shoes_backend.pagination import ProductKeysetPagination
+
+# TTL เดียวกับ APISimpleCacheMiddleware: 3600s เฉพาะเมื่อ cache ใช้ร่วมกัน (Redis)
+# LocMem แต่ละ worker ไม่เห็น namespace bump ของ worker อื่น → ต้องหมดอายุเองใน 60s
+ROWS_CACHE_SECONDS = int(getattr(settings, "API_CACHE_SECONDS", 60))
+
+
+def _wants_card(request):
+    """?view=card → payload การ์ดแบบย่อ (ProductCardSerializer) แทน ProductSerializer เต็ม"""
+    return request.query_params.get("view") == "card"
+
+
+def _product_payload(request, products, card=False):
+    """serialize ผ่าน fragment cache (catalog/fragments.py) — prefetch รูป/variant เฉพาะตัวที่ miss"""
+    if card:
+        return serialize_products(products, ProductCardSerializer, request, profile="card")
+    return serialize_products(products, ProductSerializer, request, profile="full", prefetch=("images", "variants"))
+
+
+def _grouped_rows(request, group, limit):
+    """
+    สินค้า top-`limit` ต่อ brand/category ในคิวรีเดียวด้วย
+    ROW_NUMBER() OVER (PARTITION BY <group>_id ORDER BY popularity DESC, updated_at DESC)
+    JSON ต่อสินค้ามาจาก fragment cache → prefetch images/variants เฉพาะตัวที่ miss
+    ?view=card → ไม่ prefetch เลย ใช้ subquery ของ with_card_fields() (คิวรีเดียว)
+    """
+    card = _wants_card(request)
+    # version ของ namespace "catalog" bump ทุกครั้งที่สินค้า/รูป/variant เปลี่ยน (catalog/signals.py)
+    cache_key = f"catalog_rows_v2:{namespace_version('catalog')}:{group}:{limit}:{'card' if card else 'full'}"
+
+    def build():
+        ranked = (
+            Product.objects.filter(is_active=True, **{f"{group}__isnull": False})
+            .annotate(row_rank=Window(
+                RowNumber(),
+                partition_by=[F(f"{group}_id")],
+                order_by=[F("popularity").desc(), F("updated_at").desc(), F("id").asc()],
+            ))
+            .filter(row_rank__lte=limit)
+        )
+        qs = with_rating_stats(ranked).select_related(group)
+        if card:
+            qs = with_card_fields(qs)
+        products = list(qs.order_by(f"{group}__name", f"{group}_id", "row_rank"))
+
+        rows = []
+        for _, items in groupby(products, key=lambda p: getattr(p, f"{group}_id")):
+            items = list(items)
+            rows.append({
+                "title": getattr(items[0], group).name,
+                "products": _product_payload(request, items, card),
+            })
+        return rows
+
+    rows, _ = cached_compute(cache_key, build, ttl=ROWS_CACHE_SECONDS, metric="catalog_rows")
+    return rows
+
 
 class BrandViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Brand.objects.all().order_by("name")
@@ -26,18 +91,7 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
         except Exception:
             limit = 12
 
-        brands = Brand.objects.filter(products__is_active=True).distinct().order_by("name")
-        rows = []
-        for b in brands:
-            qs = (Product.objects.filter(is_active=True, brand=b)
-                  .select_related("brand", "category")
-                  .prefetch_related("images", "variants")
-                  .order_by("-popularity", "-updated_at", "id")[:limit])
-            rows.append({
-                "title": b.name,
-                "products": ProductSerializer(qs, many=True, context={"request": request}).data
-            })
-        return Response({"rows": rows})
+        return Response({"rows": _grouped_rows(request, "brand", limit)})
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all().order_by("name")
@@ -51,31 +105,38 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         except Exception:
             limit = 12
 
-        cats = Category.objects.filter(products__is_active=True).distinct().order_by("name")
-        rows = []
-        for c in cats:
-            qs = (Product.objects.filter(is_active=True, category=c)
-                  .select_related("brand", "category")
-                  .prefetch_related("images", "variants")
-                  .order_by("-popularity", "-updated_at", "id")[:limit])
-            rows.append({
-                "title": c.name,
-                "products": ProductSerializer(qs, many=True, context={"request": request}).data
-            })
-        return Response({"rows": rows})
+        return Response({"rows": _grouped_rows(request, "category", limit)})
 
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = (
-        Product.objects.filter(is_active=True)
+        with_rating_stats(Product.objects.filter(is_active=True))
         .select_related("brand","category")
-        .prefetch_related("images","variants")
-    )
+    )  # images/variants: prefetch เฉพาะตัวที่ fragment cache miss (_product_payload)
     serializer_class = ProductSerializer
+    pagination_class = ProductKeysetPagination  # opt-in ด้วย ?cursor=
     filterset_class = ProductFilter
-    search_fields = ["name", "description",]
+    # ?search= ใช้ ProductFilter.filter_search (FTS) แทน SearchFilter ของ DRF
     ordering_fields = ["base_price","popularity","sale_percent"]
     ordering = ["-popularity"]
 
+    def filter_queryset(self, queryset):
+        qs = super().filter_queryset(queryset)
+        # ค้นหาโดยไม่ได้ระบุ ?ordering= → เรียงตามความเกี่ยวข้องก่อน
+        if "search_rank" in qs.query.annotations and not self.request.query_params.get("ordering"):
+            qs = qs.order_by("-search_rank", "-popularity", "id")
+        return qs
+
+    def get_queryset(self):
+        # grid ไม่ต้องใช้รูป/variant ทั้งชุด → ไม่ prefetch
+        if self.action in ("list", "home_rows") and _wants_card(self.request):
+            return with_card_fields(with_rating_stats(Product.objects.filter(is_active=True)))
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action in ("list", "home_rows") and _wants_card(self.request):
+            return ProductCardSerializer
+        return super().get_serializer_class()
+
     def list(self, request, *args, **kwargs):
         qs = self.filter_queryset(self.get_queryset())
 
@@ -87,29 +148,71 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
                 id_list = []
             qs = qs.filter(id__in=id_list) if id_list else qs.none()
 
+        card = _wants_card(request)
         page = self.paginate_queryset(qs)
         if page is not None:
-            ser = self.get_serializer(page, many=True)
-            return self.get_paginated_response(ser.data)
-        ser = self.get_serializer(qs, many=True)
-        return Response(ser.data)
+            return self.get_paginated_response(_product_payload(request, page, card))
+        return Response(_product_payload(request, qs, card))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(_product_payload(request, [self.get_object()])[0])
 
     @action(detail=False, methods=["get"])
     def home_rows(self, request):
-        cache_key = "home_rows_v2"
-        data = cache.get(cache_key)
-        if not data:
-            recommended = Product.objects.filter(is_active=True, is_recommended=True)[:12]
-            trending = Product.objects.filter(is_active=True).order_by("-popularity")[:12]
-            personalized = Product.objects.filter(is_active=True).order_by("-updated_at")[:12]
-            data = {
-                "recommended": self.get_serializer(recommended, many=True).data,
-                "trending": self.get_serializer(trending, many=True).data,
-                "personalized": self.get_serializer(personalized, many=True).data,
+        view = "card" if _wants_card(request) else "full"
+        cache_key = f"home_rows_v3:{namespace_version('catalog')}:{view}"
+
+        def build():
+            base = self.get_queryset()
+            card = view == "card"
+            recommended = base.filter(is_recommended=True)[:12]
+            trending = base.order_by("-popularity")[:12]
+            personalized = base.order_by("-updated_at")[:12]
+            return {
+                "recommended": _product_payload(request, recommended, card),
+                "trending": _product_payload(request, trending, card),
+                "personalized": _product_payload(request, personalized, card),
             }
-            cache.set(cache_key, data, 60)
+
+        # single-flight: มีแค่ worker เดียวที่ build ใหม่ตอนหมดอายุ ที่เหลือได้ค่าเดิมไปก่อน
+        data, _ = cached_compute(cache_key, build, ttl=ROWS_CACHE_SECONDS, metric="home_rows")
         return Response(data)
 
+def _suggest_from_db(q, limit):
+    # FTS prefix + trigram (typo-tolerant) ดู catalog/search.py
+    qs = (
+        suggest_products(Product.objects.select_related("brand", "category"), q)
+        .annotate(label=Concat("name", V(" — "), "brand__name", output_field=CharField()))
+        .order_by("-similarity", "-popularity", "name")[: limit * 2]
+    )
+
+    results, seen = [], set()
+    for p in qs:
+        value = (p.name or "").strip()
+        if not value:
+            continue
+        key = value.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append({"id": p.id, "label": getattr(p, "label", value) or value, "value": value})
+        if len(results) >= limit:
+            break
+
+    for model in (Brand, Category):
+        if len(results) >= limit:
+            break
+        for obj in suggest_names(model, q)[: limit]:
+            name = obj.name.strip()
+            if name and name.lower() not in seen:
+                results.append({"label": name, "value": name})
+                seen.add(name.lower())
+                if len(results) >= limit:
+                    break
+
+    return results[:limit]
+
+
 class ProductSuggest(APIView):
     permission_classes = [AllowAny]
     def get(self, request, *args, **kwargs):
@@ -121,47 +224,12 @@ class ProductSuggest(APIView):
         if not q:
             return Response([])
 
-        qs = (
-            Product.objects.select_related("brand", "category")
-            .filter(
-                Q(name__icontains=q)
-                | Q(description__icontains=q)
-                | Q(brand__name__icontains=q)
-                | Q(category__name__icontains=q)
-            )
-            .annotate(label=Concat("name", V(" — "), "brand__name", output_field=CharField()))
-            .order_by("-popularity", "name")[: limit * 2]
-        )
-
-        results, seen = [], set()
-        for p in qs:
-            value = (p.name or "").strip()
-            if not value:
-                continue
-            key = value.lower()
-            if key in seen:
-                continue
-            seen.add(key)
-            results.append({"id": p.id, "label": getattr(p, "label", value) or value, "value": value})
-            if len(results) >= limit:
-                break
-
-        if len(results) < limit:
-            for b in Brand.objects.filter(name__icontains=q).order_by("name")[: limit]:
-                name = b.name.strip()
-                if name and name.lower() not in seen:
-                    results.append({"label": name, "value": name})
-                    seen.add(name.lower())
-                    if len(results) >= limit:
-                        break
-
-        if len(results) < limit:
-            for c in Category.objects.filter(name__icontains=q).order_by("name")[: limit]:
-                name = c.name.strip()
-                if name and name.lower() not in seen:
-                    results.append({"label": name, "value": name})
-                    seen.add(name.lower())
-                    if len(results) >= limit:
-                        break
-
-        return Response(results[:limit])
+        # index ในหน่วยความจำ (catalog/suggest_index.py) — ยัง cold ค่อยถาม DB
+        # index จับได้แค่ substring ของชื่อ → ไม่เจอเลย (พิมพ์ผิด / คำที่อยู่ใน description) ก็ถาม DB
+        # ซึ่งมี trigram similarity และ FTS บน description
+        index = get_suggest_index()
+        if index is not None:
+            results = index.suggest(q, limit)
+            if results:
+                return Response(results)
+        return Response(_suggest_from_db(q, limit))
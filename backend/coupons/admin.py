@@ -4,7 +4,8 @@ from .models import Coupon, UserCoupon
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
-    list_display = ("code", "discount_type", "percent_off", "min_spend", "max_uses", "uses_count", "valid_from", "valid_to")
+    list_display = ("code", "discount_type", "percent_off", "min_spend", "max_uses", "claimed_count", "uses_count", "valid_from", "valid_to")
+    readonly_fields = ("claimed_count",)
     search_fields = ("code",)
 
 @admin.register(UserCoupon)
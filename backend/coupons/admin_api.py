@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from datetime import timedelta
 from accounts.permissions import IsSuperadmin
+from . import flash
 from .models import Coupon
 from .serializers import CouponSerializer
 
@@ -38,5 +39,6 @@ class CouponAdminViewSet(viewsets.ModelViewSet):
                     "valid_to": end
                 }
             )
+            flash.arm(c)  # เตรียมโควต้าใน Redis ไว้ก่อนรอบเริ่ม (ถ้าเปิด COUPON_FLASH_CLAIMS)
             created.append(c.id)
         return Response({"created": created})
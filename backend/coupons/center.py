@@ -0,0 +1,72 @@
+# coupons/center.py
+"""
+Coupon Center (GET /api/coupons/center/) จาก cache — warm แล้วไม่มี DB query
+- ส่วน public (คูปองที่ active + remaining) cache ก้อนเดียวต่อ version ของ namespace "coupons"
+  bump เมื่อคูปองถูกแก้/ลบ มีคนเก็บ/คืน/ใช้คูปอง และเมื่อถึงเวลาที่คูปองใบถัดไปเริ่มหรือหมดเวลา
+- ชุด coupon id ที่ user เก็บแล้ว cache แยกต่อ user (ลบทิ้งเมื่อ user นั้นเก็บ/คืนคูปอง) แล้วค่อยรวมตอนตอบ
+"""
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from aj_shoes_backend.middleware.cache_api import (
+    bump_namespace, bump_namespace_on_commit, cached_compute, namespace_version,
+)
+from .models import Coupon, UserCoupon
+
+CENTER_NS = "coupons"
+CENTER_KEY = "coupon-center:{}"
+CLAIMED_KEY = "coupon-claimed:{}"
+CENTER_SECONDS = 300
+CLAIMED_SECONDS = 600
+
+
+def _build_center():
+    from .serializers import CouponCenterSerializer
+
+    now = timezone.now()
+    qs = Coupon.active_qs().order_by("-discount_type", "-percent_off", "-valid_to")
+    rows = [dict(row) for row in CouponCenterSerializer(qs, many=True).data]
+    # ชุดคูปอง active เปลี่ยนเองตามเวลา: ใบที่ยังไม่เริ่ม หรือใบที่กำลังจะหมดเวลา
+    boundary = Coupon.objects.aggregate(
+        starts=Min("valid_from", filter=Q(valid_from__gt=now)),
+        ends=Min("valid_to", filter=Q(valid_to__gte=now)),
+    )
+    times = [t.timestamp() for t in boundary.values() if t is not None]
+    return {"rows": rows, "valid_until": min(times) if times else None}
+
+
+def _cached_center():
+    key = CENTER_KEY.format(namespace_version(CENTER_NS))
+    value, _ = cached_compute(key, _build_center, CENTER_SECONDS, metric="coupon_center")
+    return value
+
+
+def center_rows():
+    """คูปองที่ active (ข้อมูลเดียวกับ CouponCenterSerializer) — ห้ามแก้ list/dict ที่คืนไป"""
+    value = _cached_center()
+    if value["valid_until"] is not None and value["valid_until"] <= time.time():
+        bump_namespace(CENTER_NS)
+        value = _cached_center()
+    return value["rows"]
+
+
+def claimed_coupon_ids(user_id):
+    cache = caches["default"]
+    key = CLAIMED_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = set(UserCoupon.objects.filter(user_id=user_id).values_list("coupon_id", flat=True))
+        cache.set(key, ids, CLAIMED_SECONDS)
+    return ids
+
+
+def claims_changed_on_commit(*user_ids):
+    """มีการเก็บ/คืนคูปอง → remaining ของส่วน public เปลี่ยน และชุดที่เก็บแล้วของ user เหล่านี้เปลี่ยน"""
+    bump_namespace_on_commit(CENTER_NS)
+    keys = [CLAIMED_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: caches["default"].delete_many(keys))
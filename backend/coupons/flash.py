@@ -0,0 +1,384 @@
+# coupons/flash.py
+"""
+เก็บคูปองจำนวนจำกัดช่วง flash drop (เช่น FREESHIP-xx จาก generate_rounds ที่ max_uses=100)
+- โควต้าที่เหลือ + user ที่เก็บแล้วอยู่ใน Redis ตัดโควต้าด้วย Lua script เดียว (atomic)
+  → ระหว่างแย่งกันเก็บไม่แตะ Postgres เลย และไม่มีทางแจกเกิน max_uses
+- คนที่เก็บได้ถูกต่อคิวไว้ แล้วค่อยบันทึก UserCoupon + claimed_count เป็น batch (flush_claims)
+  โดย thread พื้นหลังของ process นั้น หรือคำสั่ง flush_flash_claims
+- ไม่มี Redis → ใช้ store ในหน่วยความจำที่ทำงานแบบเดียวกัน (ถูกต้องเฉพาะตอนรัน process เดียว)
+- ปิดอยู่ / ยังไม่ arm → try_claim คืน None ให้ caller ใช้ Coupon.claim() (DB) แทน
+- กันแจกเกิน max_uses ตอน arm ใหม่ (หลัง disarm) และตอน store ล่มกลางทาง:
+  - arm นับ user ที่ยังค้างในคิวรวมกับ UserCoupon ใน DB
+  - flush ถือ lock แบบ shared ตั้งแต่ pop จนลง DB, arm ถือแบบ exclusive
+    → ไม่มีรายการที่ออกจากคิวแล้วแต่ยังไม่ commit ตอน arm อ่าน DB
+  - store error → disarm + flush ให้หมดก่อนปล่อยไปทาง DB ทำไม่ได้ก็ตอบ UNAVAILABLE
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .center import claims_changed_on_commit
+from .models import Coupon, UserCoupon, actual_claimed_count
+
+logger = logging.getLogger(__name__)
+
+KEY = "coupon-flash:{}"  # hash: left / from / to
+USERS_KEY = "coupon-flash:{}:users"  # set ของ user_id ที่เก็บแล้ว
+QUEUE_KEY = "coupon-flash:queue"  # list ของ "coupon_id:user_id" ที่รอบันทึกลง DB
+FLUSH_DELAY = 0.2  # วินาที — รอให้คิวสะสมเป็น batch ก่อนเขียน DB
+FLUSH_BATCH = 500
+KEEP_SECONDS = 24 * 3600  # เก็บ key ไว้อีกหลังคูปองหมดอายุ (คูปองไม่มีวันหมดอายุ → นับจากตอน arm)
+QUEUE_LOCK_ID = 0x46434C4D  # pg advisory lock ระหว่าง flush (shared) กับ arm (exclusive)
+
+# 1 = เก็บได้, 0 = หมด/นอกช่วงเวลา, -1 = เคยเก็บแล้ว, -2 = ยังไม่ arm
+CLAIM_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -2 end
+local now = tonumber(ARGV[2])
+local valid_to = tonumber(redis.call('HGET', KEYS[1], 'to'))
+if now < tonumber(redis.call('HGET', KEYS[1], 'from')) or (valid_to > 0 and now > valid_to) then return 0 end
+if redis.call('SISMEMBER', KEYS[2], ARGV[1]) == 1 then return -1 end
+if tonumber(redis.call('HGET', KEYS[1], 'left')) <= 0 then return 0 end
+redis.call('HINCRBY', KEYS[1], 'left', -1)
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('PEXPIRE', KEYS[2], redis.call('PTTL', KEYS[1]))
+redis.call('RPUSH', KEYS[3], ARGV[3])
+return 1
+"""
+
+# arm ครั้งเดียว: ถ้ามีอยู่แล้ว (worker อื่น arm ไปก่อน) ไม่ทับ
+# user ที่เก็บแล้ว = จาก DB (ARGV[6..]) + ที่ยังค้างในคิว "coupon_id:user_id" → left = max_uses - จำนวน user
+ARM_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+redis.call('DEL', KEYS[2])
+for i = 6, #ARGV do redis.call('SADD', KEYS[2], ARGV[i]) end
+local prefix = ARGV[5] .. ':'
+for _, item in ipairs(redis.call('LRANGE', KEYS[3], 0, -1)) do
+    if string.sub(item, 1, #prefix) == prefix then redis.call('SADD', KEYS[2], string.sub(item, #prefix + 1)) end
+end
+local left = math.max(0, tonumber(ARGV[1]) - redis.call('SCARD', KEYS[2]))
+redis.call('HSET', KEYS[1], 'left', left, 'from', ARGV[2], 'to', ARGV[3])
+redis.call('EXPIREAT', KEYS[1], ARGV[4])
+redis.call('EXPIREAT', KEYS[2], ARGV[4])
+return 1
+"""
+
+RELEASE_LUA = """
+if redis.call('SREM', KEYS[2], ARGV[1]) == 1 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'left', 1)
+end
+return 0
+"""
+
+RESULTS = {1: Coupon.CLAIMED, 0: Coupon.UNAVAILABLE, -1: Coupon.ALREADY_CLAIMED}
+
+
+class _RedisStore:
+    def __init__(self, client):
+        self.client = client
+        self._claim = client.register_script(CLAIM_LUA)
+        self._arm = client.register_script(ARM_LUA)
+        self._release = client.register_script(RELEASE_LUA)
+
+    def claim(self, coupon_id, user_id, now):
+        return int(self._claim(
+            keys=[KEY.format(coupon_id), USERS_KEY.format(coupon_id), QUEUE_KEY],
+            args=[user_id, now, f"{coupon_id}:{user_id}"],
+        ))
+
+    def arm(self, coupon_id, max_uses, valid_from, valid_to, expire_at, user_ids):
+        return bool(self._arm(
+            keys=[KEY.format(coupon_id), USERS_KEY.format(coupon_id), QUEUE_KEY],
+            args=[max_uses, valid_from, valid_to, expire_at, coupon_id, *user_ids],
+        ))
+
+    def release(self, coupon_id, user_id):
+        self._release(keys=[KEY.format(coupon_id), USERS_KEY.format(coupon_id)], args=[user_id])
+
+    def disarm(self, coupon_id):
+        # DEL หลาย key เป็นคำสั่งเดียว (atomic) → หลังจากนี้ claim ได้ -2 จนกว่าจะ arm ใหม่
+        self.client.delete(KEY.format(coupon_id), USERS_KEY.format(coupon_id))
+
+    def left(self, coupon_id):
+        left = self.client.hget(KEY.format(coupon_id), "left")
+        return None if left is None else int(left)
+
+    def pop(self, count):
+        items = self.client.lpop(QUEUE_KEY, count) or []
+        return [tuple(int(x) for x in item.decode().split(":")) for item in items]
+
+    def push_back(self, items):
+        if items:
+            self.client.lpush(QUEUE_KEY, *[f"{c}:{u}" for c, u in reversed(items)])
+
+    def pending(self):
+        return self.client.llen(QUEUE_KEY)
+
+
+class _MemoryStore:
+    """ตัวแทน Redis ใน process เดียว (dev / ไม่มี REDIS_URL) — ทุกคำสั่งอยู่ใต้ lock เดียวเหมือน Lua"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coupons = {}  # coupon_id → {"left", "from", "to", "expire_at", "users"}
+        self._queue = deque()
+
+    def _state(self, coupon_id):
+        state = self._coupons.get(coupon_id)
+        if state is not None and state["expire_at"] < time.time():
+            del self._coupons[coupon_id]
+            return None
+        return state
+
+    def claim(self, coupon_id, user_id, now):
+        with self._lock:
+            state = self._state(coupon_id)
+            if state is None:
+                return -2
+            if now < state["from"] or (state["to"] and now > state["to"]):
+                return 0
+            if user_id in state["users"]:
+                return -1
+            if state["left"] <= 0:
+                return 0
+            state["left"] -= 1
+            state["users"].add(user_id)
+            self._queue.append((coupon_id, user_id))
+            return 1
+
+    def arm(self, coupon_id, max_uses, valid_from, valid_to, expire_at, user_ids):
+        with self._lock:
+            if self._state(coupon_id) is not None:
+                return False
+            users = set(user_ids) | {u for c, u in self._queue if c == coupon_id}
+            self._coupons[coupon_id] = {
+                "left": max(0, max_uses - len(users)), "from": valid_from, "to": valid_to,
+                "expire_at": expire_at, "users": users,
+            }
+            return True
+
+    def release(self, coupon_id, user_id):
+        with self._lock:
+            state = self._state(coupon_id)
+            if state is not None and user_id in state["users"]:
+                state["users"].discard(user_id)
+                state["left"] += 1
+
+    def disarm(self, coupon_id):
+        with self._lock:
+            self._coupons.pop(coupon_id, None)
+
+    def left(self, coupon_id):
+        with self._lock:
+            state = self._state(coupon_id)
+            return None if state is None else state["left"]
+
+    def pop(self, count):
+        with self._lock:
+            return [self._queue.popleft() for _ in range(min(count, len(self._queue)))]
+
+    def push_back(self, items):
+        with self._lock:
+            self._queue.extendleft(reversed(items))
+
+    def pending(self):
+        return len(self._queue)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.CACHES["default"]["BACKEND"].startswith("django_redis"):
+                    from django_redis import get_redis_connection
+
+                    _store = _RedisStore(get_redis_connection("default"))
+                else:
+                    _store = _MemoryStore()
+    return _store
+
+
+def enabled():
+    return getattr(settings, "COUPON_FLASH_CLAIMS", False)
+
+
+_queue_lock = threading.Lock()  # ไม่ใช่ PostgreSQL (dev, process เดียว)
+
+
+@contextmanager
+def _queue_guard(exclusive):
+    """
+    ต้องเรียกภายใน transaction: flush ถือแบบ shared ตั้งแต่ pop จน commit, arm ถือแบบ exclusive
+    → ตอน arm อ่าน UserCoupon ทุกการเก็บอยู่ใน DB หรือยังอยู่ในคิวอย่างใดอย่างหนึ่ง
+    """
+    if connection.vendor == "postgresql":
+        fn = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT {fn}(%s)", [QUEUE_LOCK_ID])
+        yield
+    else:
+        with _queue_lock:
+            yield
+
+
+def _db_fallback(coupon_id):
+    """
+    store ใช้ไม่ได้กลางทาง → ก่อนปล่อยให้ caller ใช้ Coupon.claim() (DB)
+    disarm (โควต้าใน store จะไม่รู้การเก็บทาง DB) แล้วบันทึกคิวที่ค้างและรอ flush ที่กำลังทำให้จบ → None
+    ทำไม่ได้ (Redis ล่มจริง) → UNAVAILABLE: คิวที่ยังไม่ลง DB อาจทำให้ DB แจกเกิน max_uses
+    """
+    try:
+        get_store().disarm(coupon_id)
+        flush_claims()
+        with transaction.atomic(), _queue_guard(exclusive=True):
+            pass
+    except Exception:
+        logger.exception("flash coupon %s: store unavailable, refusing DB fallback", coupon_id)
+        return Coupon.UNAVAILABLE
+    return None
+
+
+def try_claim(coupon_id, user_id):
+    """
+    เก็บคูปองผ่าน store → Coupon.CLAIMED / ALREADY_CLAIMED / UNAVAILABLE
+    คืน None เมื่อปิดอยู่ ยังไม่ arm หรือ store มีปัญหา (ให้ caller ใช้ทาง DB)
+    """
+    if not enabled():
+        return None
+    try:
+        coupon_id, user_id = int(coupon_id), int(user_id)
+    except (TypeError, ValueError):
+        return None
+    try:
+        code = get_store().claim(coupon_id, user_id, time.time())
+    except Exception:
+        logger.exception("flash claim failed, falling back to DB")
+        return _db_fallback(coupon_id)
+    if code == 1:
+        _schedule_flush()
+    return RESULTS.get(code)
+
+
+def armable(coupon):
+    return enabled() and bool(coupon.max_uses)
+
+
+def _arm(coupon):
+    valid_to = coupon.valid_to.timestamp() if coupon.valid_to else 0
+    expire_at = int(valid_to or time.time()) + KEEP_SECONDS
+    with transaction.atomic(), _queue_guard(exclusive=True):
+        user_ids = list(UserCoupon.objects.filter(coupon=coupon).values_list("user_id", flat=True))
+        get_store().arm(coupon.pk, coupon.max_uses, coupon.valid_from.timestamp(), valid_to, expire_at, user_ids)
+
+
+def arm(coupon):
+    """
+    โหลดโควต้าที่เหลือ + user ที่เก็บแล้วของคูปองเข้า store (ถ้ายังไม่มี)
+    ใช้เฉพาะคูปองที่จำกัดจำนวน คืน False ถ้าไม่เข้าเงื่อนไขหรือ store ใช้ไม่ได้
+    """
+    if not armable(coupon):
+        return False
+    try:
+        _arm(coupon)
+    except Exception:
+        logger.exception("arming flash coupon %s failed", coupon.pk)
+        return False
+    return True
+
+
+def arm_and_claim(coupon, user_id):
+    """try_claim ได้ None เพราะยังไม่ arm → arm แล้วลองใหม่ คืน None ถ้าต้องใช้ทาง DB"""
+    if not armable(coupon):
+        return None
+    try:
+        _arm(coupon)
+    except Exception:
+        logger.exception("arming flash coupon %s failed", coupon.pk)
+        return _db_fallback(coupon.pk)
+    result = try_claim(coupon.pk, user_id)
+    # ถูก disarm ซ้อนระหว่างนี้ → ทาง DB ต้องรอคิวของคูปองนี้ลง DB ก่อนเหมือนกัน
+    return result if result is not None else _db_fallback(coupon.pk)
+
+
+def release(coupon_id, user_id):
+    """UserCoupon ถูกลบ → คืนโควต้าใน store (ถ้า arm อยู่)"""
+    if not enabled():
+        return
+    try:
+        get_store().release(coupon_id, user_id)
+    except Exception:
+        logger.exception("releasing flash claim %s/%s failed", coupon_id, user_id)
+
+
+def disarm(coupon_id):
+    """
+    คูปองถูกแก้ (เช่นเปลี่ยน max_uses / ช่วงเวลา) → ลบสถานะใน store ก่อน (claim ใหม่ได้ -2 ทันที)
+    แล้วบันทึกคิวที่ค้าง ให้ arm ใหม่จาก DB + คิว ตอนเก็บครั้งถัดไป
+    """
+    if not enabled():
+        return
+    try:
+        get_store().disarm(coupon_id)
+        flush_claims()
+    except Exception:
+        logger.exception("disarming flash coupon %s failed", coupon_id)
+
+
+def flush_claims(batch_size=FLUSH_BATCH):
+    """บันทึกคิวลง DB ทีละ batch จนหมด คืนจำนวนรายการที่บันทึก"""
+    store = get_store()
+    total = 0
+    while True:
+        items = []
+        try:
+            # pop ภายใต้ lock แบบ shared จน commit (ดู _queue_guard)
+            with transaction.atomic(), _queue_guard(exclusive=False):
+                items = store.pop(batch_size)
+                if not items:
+                    return total
+                coupon_ids = sorted({coupon_id for coupon_id, _ in items})
+                # lock แถวคูปองก่อน → flusher อีกตัวจะนับหลังเรา commit (claimed_count ไม่ถอยหลัง)
+                list(Coupon.objects.select_for_update().filter(pk__in=coupon_ids).order_by("pk").values_list("pk"))
+                UserCoupon.objects.bulk_create(
+                    [UserCoupon(coupon_id=c, user_id=u) for c, u in set(items)], ignore_conflicts=True
+                )
+                Coupon.objects.filter(pk__in=coupon_ids).update(claimed_count=actual_claimed_count())
+                claims_changed_on_commit(*{user_id for _, user_id in items})
+        except Exception:
+            store.push_back(items)
+            raise
+        total += len(items)
+
+
+_flush_lock = threading.Lock()
+
+
+def _flush_later():
+    failed = False
+    try:
+        time.sleep(FLUSH_DELAY)
+        flush_claims()
+    except Exception:
+        failed = True
+        logger.exception("flash claim flush failed")
+    finally:
+        _flush_lock.release()
+        connection.close()
+    # มีคนเก็บเข้ามาระหว่างปล่อย lock → รอบใหม่
+    if not failed and get_store().pending():
+        _schedule_flush()
+
+
+def _schedule_flush():
+    """เริ่ม flush ใน background (ถ้ายังไม่มีตัวอื่นรออยู่)"""
+    if _flush_lock.acquire(blocking=False):
+        threading.Thread(target=_flush_later, name="coupon-flash-flush", daemon=True).start()
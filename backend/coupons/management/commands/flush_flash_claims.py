@@ -0,0 +1,27 @@
+# coupons/management/commands/flush_flash_claims.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from coupons.flash import FLUSH_BATCH, flush_claims, get_store
+
+
+class Command(BaseCommand):
+    help = "Persist queued flash-sale coupon claims to UserCoupon in batches (use --interval to run as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=FLUSH_BATCH)
+        parser.add_argument("--interval", type=float, default=0, help="> 0 = วนทุก N วินาทีไม่จบ")
+
+    def handle(self, *args, **opts):
+        while True:
+            started = time.perf_counter()
+            saved = flush_claims(batch_size=opts["batch_size"])
+            if saved or opts["interval"] <= 0:
+                self.stdout.write(
+                    f"saved={saved} pending={get_store().pending()} "
+                    f"elapsed={(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+            if opts["interval"] <= 0:
+                break
+            time.sleep(opts["interval"])
@@ -0,0 +1,99 @@
+# coupons/management/commands/loadtest_flash_claims.py
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from coupons import flash
+from coupons.models import Coupon, UserCoupon
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test POST /api/coupons/{id}/claim/: N users race for a max_uses coupon from parallel threads; "
+        "asserts no over-issue and reports claims/sec (--mode flash = Redis/in-memory counter, db = conditional UPDATE)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--max-uses", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=2, help="แต่ละ user กดเก็บกี่ครั้ง (ทดสอบกดซ้ำ)")
+        parser.add_argument("--mode", choices=["flash", "db"], default="flash")
+
+    def handle(self, *args, **opts):
+        tag = time.time_ns()
+        now = timezone.now()
+        coupon = Coupon.objects.create(
+            code=f"FLASH-LOADTEST-{tag % 10 ** 9}", discount_type=Coupon.DiscountType.FREE_SHIPPING,
+            max_uses=opts["max_uses"], valid_from=now - timedelta(minutes=1), valid_to=now + timedelta(hours=1),
+        )
+        users = User.objects.bulk_create(
+            [User(username=f"loadtest-claim-{tag}-{i}", password="!") for i in range(opts["users"])], batch_size=1000
+        )
+        try:
+            with override_settings(COUPON_FLASH_CLAIMS=opts["mode"] == "flash"):
+                outcomes, elapsed = self._run(coupon, users, opts["threads"], opts["repeat"])
+                flushed = flash.flush_claims() if opts["mode"] == "flash" else 0
+
+            requests = sum(outcomes.values())
+            coupon.refresh_from_db()
+            stored = UserCoupon.objects.filter(coupon=coupon).count()
+            self.stdout.write(
+                f"mode={opts['mode']} users={len(users)} threads={opts['threads']} requests={requests} "
+                f"time={elapsed:.2f}s throughput={requests / elapsed:,.0f} claims/s"
+            )
+            self.stdout.write(
+                f"outcomes={dict(outcomes)} user_coupons={stored} claimed_count={coupon.claimed_count} "
+                f"flushed_at_end={flushed}"
+            )
+
+            errors = {k: v for k, v in outcomes.items() if not k.startswith(("200", "400"))}
+            if errors:
+                raise CommandError(f"unexpected responses: {errors}")
+            granted = outcomes["200 Coupon claimed."]
+            expected = min(len(users), opts["max_uses"])
+            if granted != expected or stored != expected or coupon.claimed_count != expected:
+                raise CommandError(f"granted={granted} stored={stored} claimed_count={coupon.claimed_count}, expected {expected}")
+            self.stdout.write(self.style.SUCCESS("OK: no over-issue, every granted claim persisted"))
+        finally:
+            coupon.delete()
+            User.objects.filter(pk__in=[u.pk for u in users]).delete()
+
+    def _run(self, coupon, users, threads, repeat):
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+        url = f"/api/coupons/{coupon.pk}/claim/"
+
+        def worker(n):
+            client = APIClient()
+            mine = Counter()
+            try:
+                barrier.wait()
+                for user in users[n::threads]:
+                    client.force_authenticate(user)
+                    for _ in range(repeat):
+                        response = client.post(url)
+                        mine[f"{response.status_code} {response.json().get('detail')}"] += 1
+            finally:
+                connection.close()
+            with lock:
+                outcomes.update(mine)
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return outcomes, time.perf_counter() - started
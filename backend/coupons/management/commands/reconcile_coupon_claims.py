@@ -0,0 +1,32 @@
+# coupons/management/commands/reconcile_coupon_claims.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from coupons.models import Coupon, actual_claimed_count
+
+
+class Command(BaseCommand):
+    help = "Recompute Coupon.claimed_count from UserCoupon rows and report coupons whose counter drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="แค่รายงาน ไม่แก้ค่า")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            drifted = list(
+                Coupon.objects.select_for_update()
+                .annotate(actual=actual_claimed_count())
+                .values("id", "code", "claimed_count", "actual")
+            )
+            drifted = [row for row in drifted if row["claimed_count"] != row["actual"]]
+            for row in drifted:
+                self.stdout.write(f"{row['code']}: claimed_count={row['claimed_count']} actual={row['actual']}")
+            if drifted and not opts["dry_run"]:
+                Coupon.objects.filter(pk__in=[row["id"] for row in drifted]).update(claimed_count=actual_claimed_count())
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("all coupon claim counters match"))
+        elif opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} coupon(s) drifted (dry run, nothing changed)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"fixed {len(drifted)} coupon(s)"))
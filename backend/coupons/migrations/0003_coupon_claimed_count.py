@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+# เติม claimed_count ของคูปองเดิมจากจำนวน UserCoupon (คำสั่งเดียว)
+BACKFILL_SQL = """
+UPDATE coupons_coupon c
+SET claimed_count = COALESCE(
+    (SELECT COUNT(*) FROM coupons_usercoupon uc WHERE uc.coupon_id = c.id), 0
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0002_usercoupon'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='claimed_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
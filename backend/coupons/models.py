@@ -1,8 +1,9 @@
 # models.py — READY TO REPLACE
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.conf import settings
-from django.db.models import Count, F, Q  # ✅ เพิ่ม
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value  # ✅ เพิ่ม
+from django.db.models.functions import Coalesce
 
 class Coupon(models.Model):
     class DiscountType(models.TextChoices):
@@ -15,10 +16,25 @@ class Coupon(models.Model):
     min_spend = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     max_uses = models.PositiveIntegerField(default=0)  # 0 = unlimited (ไม่จำกัดจำนวนแจก)
     uses_count = models.PositiveIntegerField(default=0)  # จำนวน "ที่ถูกใช้" ตอนคิดบิล (เก็บไว้ใช้ภายหลัง)
+    # จำนวน "ที่ถูกเก็บ" (UserCoupon) — ดูแลโดย claim() + coupons/signals.py, ซ่อมด้วย reconcile_coupon_claims
+    claimed_count = models.PositiveIntegerField(default=0)
     valid_from = models.DateTimeField(default=timezone.now)
     valid_to = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # ผลของ claim()
+    CLAIMED = "claimed"
+    ALREADY_CLAIMED = "already_claimed"
+    UNAVAILABLE = "unavailable"
+
+    def save(self, *args, **kwargs):
+        # claimed_count เปลี่ยนด้วย UPDATE แบบ atomic เท่านั้น → แก้คูปอง (admin/API) ไม่เขียนค่าที่โหลดไว้ทับ
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != "claimed_count"
+            ]
+        super().save(*args, **kwargs)
+
     def is_active(self):
         """Active เมื่ออยู่ในช่วงเวลา และจำนวน 'ที่ถูกเก็บ' ยังไม่เต็มโควต้า"""
         now = timezone.now()
@@ -26,10 +42,8 @@ class Coupon(models.Model):
             return False
         if self.valid_from and now < self.valid_from:
             return False
-        if self.max_uses:
-            claimed_count = self.claimed_users.count()  # ใช้ related_name จาก UserCoupon ด้านล่าง
-            if claimed_count >= self.max_uses:
-                return False
+        if self.max_uses and self.claimed_count >= self.max_uses:
+            return False
         return True
 
     @staticmethod
@@ -42,20 +56,40 @@ class Coupon(models.Model):
         qs = (
             Coupon.objects.filter(valid_from__lte=now)
             .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=now))
-            .annotate(claimed_count=Count("claimed_users"))
             .filter(Q(max_uses=0) | Q(claimed_count__lt=F("max_uses")))
         )
         return qs
 
+    def claim(self, user):
+        """
+        เก็บคูปองให้ user → คืน CLAIMED / ALREADY_CLAIMED / UNAVAILABLE
+        นับโควต้าด้วย conditional UPDATE คำสั่งเดียว (ช่วงเวลา + claimed_count < max_uses)
+        → คนเก็บพร้อมกันจำนวนมากก็ไม่เกิน max_uses
+        """
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                claimed = UserCoupon(user=user, coupon=self)
+                claimed._claim_counted = True  # นับใน UPDATE ด้านล่างแล้ว ไม่ต้องให้ signal นับซ้ำ
+                claimed.save()
+                updated = (
+                    Coupon.objects.filter(pk=self.pk, valid_from__lte=now)
+                    .filter(Q(valid_to__isnull=True) | Q(valid_to__gte=now))
+                    .filter(Q(max_uses=0) | Q(claimed_count__lt=F("max_uses")))
+                    .update(claimed_count=F("claimed_count") + 1)
+                )
+                if not updated:
+                    transaction.set_rollback(True)
+                    return self.UNAVAILABLE
+        except IntegrityError:  # unique_together (user, coupon)
+            return self.ALREADY_CLAIMED
+        return self.CLAIMED
+
     def remaining(self):
         """จำนวนสิทธิ์ที่ยังเหลือสำหรับ 'การเก็บ' (แสดงใน Coupon Center)"""
         if not self.max_uses:
             return None  # unlimited
-        # ถ้ามี annotation มาแล้วจะไม่ยิง query ซ้ำ
-        claimed = getattr(self, "claimed_count", None)
-        if claimed is None:
-            claimed = self.claimed_users.count()
-        return max(0, self.max_uses - claimed)
+        return max(0, self.max_uses - self.claimed_count)
 
     def __str__(self):
         return self.code
@@ -73,3 +107,18 @@ class UserCoupon(models.Model):
 
     def __str__(self):
         return f"{self.user_id} - {self.coupon.code}"
+
+
+def actual_claimed_count():
+    """นิพจน์ COUNT(UserCoupon) ของคูปองแต่ละแถว ใช้ตั้ง/ตรวจ Coupon.claimed_count ให้ตรงของจริง"""
+    return Coalesce(
+        Subquery(
+            UserCoupon.objects.filter(coupon=OuterRef("pk"))
+            .order_by()
+            .values("coupon")
+            .annotate(n=Count("pk"))
+            .values("n"),
+            output_field=models.IntegerField(),
+        ),
+        Value(0),
+    )
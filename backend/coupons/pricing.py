@@ -0,0 +1,85 @@
+# coupons/pricing.py
+"""
+คิดราคาตะกร้า + คูปอง ที่เดียว ใช้ร่วมกันโดย
+CartViewSet._summary, CartViewSet.checkout และ CouponViewSet.price_preview
+(ยอดที่เห็นในตะกร้า = ยอดที่ถูกเรียกเก็บตอน checkout)
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Coupon, UserCoupon
+
+SHIPPING_FEE = Decimal("50.00")
+
+
+def claimed_coupons(user, codes):
+    """
+    คูปองตาม `codes` (ไม่สนตัวพิมพ์) ที่ยัง active และ `user` เก็บไว้แล้ว — คิวรีเดียว
+    (สถานะการเก็บของ user มาเป็น annotation, จำนวนที่ถูกเก็บอ่านจาก Coupon.claimed_count)
+    """
+    codes = [c for c in codes if c]
+    if not codes:
+        return []
+    cond = Q()
+    for code in codes:
+        cond |= Q(code__iexact=code)
+    qs = Coupon.objects.filter(cond).annotate(
+        is_claimed=Exists(UserCoupon.objects.filter(user=user, coupon=OuterRef("pk"))),
+    )
+    return [c for c in qs if c.is_claimed and c.is_active()]
+
+
+def pick_coupons(coupons):
+    """เลือกได้สูงสุด: ส่วนลด % ที่มากที่สุด 1 ใบ + ส่งฟรี 1 ใบ → (percent_coupon, free_coupon)"""
+    best_percent, free_ship = None, None
+    for c in coupons:
+        if c.discount_type == Coupon.DiscountType.PERCENT:
+            if best_percent is None or int(c.percent_off or 0) > int(best_percent.percent_off or 0):
+                best_percent = c
+        elif c.discount_type == Coupon.DiscountType.FREE_SHIPPING:
+            free_ship = c
+    return best_percent, free_ship
+
+
+def price(subtotal, shipping_fee=SHIPPING_FEE, percent_coupon=None, free_coupon=None):
+    """
+    คืน dict ของยอด (Decimal ทั้งหมด)
+    - ส่วนลด % คิดเมื่อ subtotal >= min_spend ปัดเป็นบาทแบบ ROUND_HALF_UP
+    - ส่งฟรีเมื่อมีคูปองส่งฟรี
+    """
+    subtotal = Decimal(subtotal)
+    shipping_fee = Decimal(shipping_fee)
+    applied = []
+    discount_percent = 0
+    discount_amount = Decimal("0.00")
+
+    if (
+        percent_coupon is not None
+        and percent_coupon.discount_type == Coupon.DiscountType.PERCENT
+        and subtotal >= Decimal(str(percent_coupon.min_spend or 0))
+    ):
+        discount_percent = int(percent_coupon.percent_off or 0)
+        discount_amount = (subtotal * Decimal(discount_percent) / Decimal(100)).quantize(
+            Decimal("1."), rounding=ROUND_HALF_UP
+        )
+        applied.append({"code": percent_coupon.code, "discount_type": "percent", "percent_off": discount_percent})
+
+    free_shipping = free_coupon is not None and free_coupon.discount_type == Coupon.DiscountType.FREE_SHIPPING
+    if free_shipping:
+        applied.append({"code": free_coupon.code, "discount_type": "free_shipping"})
+
+    effective_shipping = Decimal("0.00") if free_shipping else shipping_fee
+    total = subtotal - discount_amount + effective_shipping
+    if total < 0:
+        total = Decimal("0.00")
+
+    return {
+        "applied_coupons": applied,
+        "discount_percent": discount_percent,
+        "discount_amount": discount_amount,
+        "free_shipping": free_shipping,
+        "shipping_fee": effective_shipping,
+        "subtotal": subtotal,
+        "total": total,
+    }
@@ -0,0 +1,46 @@
+# coupons/signals.py
+from django.db import transaction
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import flash
+from .center import CENTER_NS, claims_changed_on_commit
+from .models import Coupon, UserCoupon
+
+
+# Coupon.claimed_count สำหรับ UserCoupon ที่ไม่ได้มาจาก Coupon.claim() (เช่นเพิ่ม/ลบผ่าน admin, ลบ user)
+@receiver(post_save, sender=UserCoupon)
+def user_coupon_created_count(sender, instance: UserCoupon, created, **kwargs):
+    if not created:
+        return
+    if not getattr(instance, "_claim_counted", False):
+        Coupon.objects.filter(pk=instance.coupon_id).update(claimed_count=F("claimed_count") + 1)
+    claims_changed_on_commit(instance.user_id)
+
+
+@receiver(post_delete, sender=UserCoupon)
+def user_coupon_deleted_count(sender, instance: UserCoupon, **kwargs):
+    Coupon.objects.filter(pk=instance.coupon_id).update(
+        claimed_count=Greatest(F("claimed_count") - 1, Value(0))
+    )
+    transaction.on_commit(lambda: flash.release(instance.coupon_id, instance.user_id))
+    claims_changed_on_commit(instance.user_id)
+
+
+# Coupon Center cache + โควต้า flash ใน store (คิดจากค่าตอน arm) → คูปองถูกแก้/ลบ ให้ arm ใหม่
+@receiver(post_save, sender=Coupon)
+def coupon_saved(sender, instance: Coupon, created, update_fields=None, **kwargs):
+    bump_namespace_on_commit(CENTER_NS)
+    if created or (update_fields and set(update_fields) <= {"uses_count"}):
+        return  # คืน uses_count ตอนยกเลิก order ไม่กระทบโควต้าการเก็บ
+    transaction.on_commit(lambda: flash.disarm(instance.pk))
+
+
+@receiver(post_delete, sender=Coupon)
+def coupon_deleted(sender, instance: Coupon, **kwargs):
+    bump_namespace_on_commit(CENTER_NS)
+    transaction.on_commit(lambda: flash.disarm(instance.pk))
@@ -1,14 +1,15 @@
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from django.utils import timezone
 from django.db import models  # Q, F
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from . import flash
+from .center import center_rows, claimed_coupon_ids
 from .models import Coupon, UserCoupon
-from .serializers import (
-    CouponSerializer, CouponCenterSerializer, UserCouponSerializer
-)
+from .pricing import claimed_coupons, pick_coupons, price
+from .serializers import CouponSerializer, UserCouponSerializer
 
 
 class CouponViewSet(viewsets.ModelViewSet):
@@ -32,26 +33,26 @@ class CouponViewSet(viewsets.ModelViewSet):
     # GET /api/coupons/center/  → แสดงเฉพาะคูปองที่ Active
     @action(detail=False, methods=["get"])
     def center(self, request):
-        qs = Coupon.active_qs().order_by("-discount_type", "-percent_off", "-valid_to")
-        data = CouponCenterSerializer(qs, many=True).data
+        # ส่วน public + ชุดที่ user เก็บแล้ว มาจาก cache คนละก้อน (coupons/center.py)
+        data = center_rows()
         # ถ้าล็อกอินแล้วให้ติดธง claimed เพื่อเปลี่ยนปุ่มเป็น “เก็บแล้ว”
         if request.user and request.user.is_authenticated:
-            claimed_codes = set(
-                UserCoupon.objects.filter(user=request.user, coupon__in=qs)
-                .values_list("coupon__code", flat=True)
-            )
-            for row in data:
-                row["claimed"] = row["code"] in claimed_codes
+            claimed_ids = claimed_coupon_ids(request.user.pk)
+            data = [{**row, "claimed": row["id"] in claimed_ids} for row in data]
         return Response(data)
 
-    # POST /api/coupons/{id}/claim/  → เก็บคูปอง (กันซ้ำด้วย unique_together)
+    # POST /api/coupons/{id}/claim/  → เก็บคูปอง (กันซ้ำด้วย unique_together, โควต้าด้วย conditional UPDATE
+    # หรือตัวนับใน Redis เมื่อเปิด COUPON_FLASH_CLAIMS — ดู coupons/flash.py)
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated])
     def claim(self, request, pk=None):
-        coupon = self.get_object()
-        if not coupon.is_active():
+        # flash drop: ตัดโควต้าใน Redis ไม่ต้องแตะ DB (ยังไม่ arm / ปิดอยู่ → None)
+        result = flash.try_claim(pk, request.user.pk)
+        if result is None:
+            coupon = self.get_object()
+            result = flash.arm_and_claim(coupon, request.user.pk) or coupon.claim(request.user)
+        if result == Coupon.UNAVAILABLE:
             return Response({"detail": "Coupon expired or unavailable."}, status=status.HTTP_400_BAD_REQUEST)
-        obj, created = UserCoupon.objects.get_or_create(user=request.user, coupon=coupon)
-        if not created:
+        if result == Coupon.ALREADY_CLAIMED:
             return Response({"detail": "You already claimed this coupon."}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"detail": "Coupon claimed."})
 
@@ -96,66 +97,6 @@ class CouponViewSet(viewsets.ModelViewSet):
         codes = request.data.get("coupon_codes") or []
         codes = list(dict.fromkeys([str(c).strip() for c in codes if c]))  # กันซ้ำ + trim
 
-        if not codes:
-            return Response({
-                "applied_coupons": [],
-                "discount_percent": 0,
-                "discount_amount": Decimal("0.00"),
-                "free_shipping": False,
-                "shipping_fee": shipping_fee,
-                "subtotal": subtotal,
-                "total": (subtotal + shipping_fee),
-            })
-
-        # เลือกเฉพาะคูปองที่ยัง active และผู้ใช้คนนี้เคย claim แล้ว
-        coupons = []
-        for c in Coupon.objects.filter(code__in=codes):
-            if not c.is_active():
-                continue
-            if not UserCoupon.objects.filter(user=request.user, coupon=c).exists():
-                continue
-            coupons.append(c)
-
-        best_percent = None
-        free_ship = None
-        for c in coupons:
-            if c.discount_type == "percent":
-                if (best_percent is None) or int(c.percent_off or 0) > int(best_percent.percent_off or 0):
-                    best_percent = c
-            elif c.discount_type == "free_shipping":
-                free_ship = c
-
-        applied = []
-        discount_amount = Decimal("0.00")
-        discount_percent = 0
-
-        if best_percent and subtotal >= Decimal(str(best_percent.min_spend or 0)):
-            discount_percent = int(best_percent.percent_off or 0)
-            discount_amount = (subtotal * Decimal(discount_percent) / Decimal(100)).quantize(Decimal("1."), rounding=ROUND_HALF_UP)
-            applied.append({
-                "code": best_percent.code,
-                "discount_type": "percent",
-                "percent_off": discount_percent
-            })
-
-        free_shipping = bool(free_ship)
-        if free_shipping:
-            applied.append({
-                "code": free_ship.code,
-                "discount_type": "free_shipping"
-            })
-
-        effective_shipping = Decimal("0.00") if free_shipping else shipping_fee
-        total = subtotal - discount_amount + effective_shipping
-        if total < 0:
-            total = Decimal("0.00")
-
-        return Response({
-            "applied_coupons": applied,
-            "discount_percent": discount_percent,
-            "discount_amount": discount_amount,
-            "free_shipping": free_shipping,
-            "shipping_fee": effective_shipping,
-            "subtotal": subtotal,
-            "total": total,
-        })
+        # เลือกเฉพาะคูปองที่ยัง active และผู้ใช้คนนี้เคย claim แล้ว (คิวรีเดียว) แล้วคิดราคาแบบเดียวกับตะกร้า
+        best_percent, free_ship = pick_coupons(claimed_coupons(request.user, codes))
+        return Response(price(subtotal, shipping_fee, best_percent, free_ship))
@@ -1,9 +1,10 @@
 # notifications/urls.py
 from django.urls import path
-from .views import NotificationListView, mark_read, mark_all_read, NotificationPreferenceView, WebPushSubscribeView
+from .views import NotificationListView, unread_count, mark_read, mark_all_read, NotificationPreferenceView, WebPushSubscribeView
 
 urlpatterns = [
     path("", NotificationListView.as_view(), name="notification-list"),
+    path("unread-count/", unread_count, name="notification-unread-count"),
     path("mark-read/", mark_read, name="notification-mark-read"),
     path("mark-all-read/", mark_all_read, name="notification-mark-all-read"),
     path("prefs/", NotificationPreferenceView.as_view(), name="notification-prefs"),
@@ -5,18 +5,27 @@ from rest_framework.decorators import api_view, permission_classes
 from django.db.models import Q
 from .models import Notification, NotificationPreference, WebPushSubscription
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer, WebPushSubscriptionSerializer
+from aj_shoes_backend.pagination import NotificationKeysetPagination
 
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # แบ่งหน้าเสมอ: {"next", "results"} — ไม่ส่ง ?cursor= = หน้าแรก, badge ใช้ unread_count
+    pagination_class = NotificationKeysetPagination
 
     def get_queryset(self):
-        qs = Notification.objects.filter(user=self.request.user)
+        qs = Notification.objects.filter(user=self.request.user).order_by("-created_at", "-id")
         unread = self.request.query_params.get("unread")
         if unread == "true":
             qs = qs.filter(is_read=False)
         return qs
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def unread_count(request):
+    count = Notification.objects.filter(user=request.user, is_read=False).count()
+    return Response({"unread": count})
+
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
 def mark_read(request):
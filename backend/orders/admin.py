@@ -16,7 +16,10 @@ from .models import (
     Review,
     Favorite,
     PaymentConfig,
+    ProductRatingSummary,
 )
+from .expiry import sweep_expired_orders
+from .stock import release_stock
 
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
@@ -56,6 +59,12 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "product__name")
     list_filter = ("rating",)
 
+@admin.register(ProductRatingSummary)
+class ProductRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ("product", "review_count", "rating_sum", "star_1", "star_2", "star_3", "star_4", "star_5", "updated_at")
+    search_fields = ("product__name",)
+    readonly_fields = ("updated_at",)
+
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "product", "created_at")
@@ -181,10 +190,7 @@ def reject_payment(modeladmin, request, queryset):
             
             # คืน stock กลับ (ถ้าเคยลดไปแล้ว)
             if order.payment_slip:  # ถ้าเคยอัปโหลดสลิปแล้ว
-                for order_item in order.items.all():
-                    variant = order_item.variant
-                    variant.stock = F("stock") + order_item.quantity
-                    variant.save(update_fields=["stock"])
+                release_stock(order.items.all())
             
             # คืน coupon usage กลับ
             if order.coupon:
@@ -221,54 +227,9 @@ def reject_payment(modeladmin, request, queryset):
 @admin.action(description="Clean up expired orders")
 def cleanup_expired_orders(modeladmin, request, queryset):
     """Clean up expired pending payment orders"""
-    from .models import Cart, CartItem
-    
-    expired_orders = Order.objects.filter(
-        status="pending_payment",
-        payment_deadline__lt=timezone.now()
-    )
-    
-    count = 0
-    for order in expired_orders:
-        with transaction.atomic():
-            # คืน stock (ถ้าเคยลดไปแล้ว)
-            if order.payment_slip:
-                for order_item in order.items.all():
-                    variant = order_item.variant
-                    variant.stock = F("stock") + order_item.quantity
-                    variant.save(update_fields=["stock"])
-            
-            # เก็บข้อมูลเพื่อคืนเข้า cart
-            order_items_backup = []
-            for order_item in order.items.all():
-                order_items_backup.append({
-                    'product_id': order_item.product_id,
-                    'variant_id': order_item.variant_id,
-                    'quantity': order_item.quantity
-                })
-            
-            # คืนสินค้ากลับ cart
-            cart, _ = Cart.objects.get_or_create(user=order.user)
-            for item_backup in order_items_backup:
-                cart_item, created = CartItem.objects.get_or_create(
-                    cart=cart,
-                    product_id=item_backup['product_id'],
-                    variant_id=item_backup['variant_id'],
-                    defaults={"quantity": item_backup['quantity']}
-                )
-                if not created:
-                    cart_item.quantity = F("quantity") + item_backup['quantity']
-                    cart_item.save()
-            
-            # คืน coupon usage
-            if order.coupon:
-                order.coupon.uses_count = F("uses_count") - 1
-                order.coupon.save(update_fields=["uses_count"])
-            
-            order.delete()
-            count += 1
-    
-    modeladmin.message_user(request, f"Cleaned up {count} expired orders.")
+    # ทำทั้งหมดไม่ขึ้นกับ queryset ที่เลือก (เหมือนเดิม) แบบ batch ดู orders/expiry.py
+    stats = sweep_expired_orders()
+    modeladmin.message_user(request, f"Cleaned up {stats['orders']} expired orders.")
 
 # ---------- Order Admin with Inlines ----------
 
@@ -0,0 +1,170 @@
+# orders/expiry.py
+"""
+เก็บกวาดคำสั่งซื้อ PENDING_PAYMENT ที่เลยกำหนดชำระ (sweeper)
+- ทำทีละ batch เล็ก ๆ แต่ละ batch เป็น transaction ของตัวเอง (ไม่มี transaction ยักษ์ค้าง lock)
+- SELECT ... FOR UPDATE SKIP LOCKED → ข้าม order ที่ request อื่นกำลังถืออยู่ (เช่น upload_payment)
+  และรัน sweeper หลายตัวพร้อมกันได้โดยไม่ทำงานซ้ำ
+- คืน stock (เฉพาะที่อัปโหลดสลิปแล้ว = เคยจอง), คืนสินค้าเข้าตะกร้า และคืน coupon usage แบบ bulk
+- ตัวนับสะสมอยู่ใน cache: sweeper_metrics() / GET /api/admin/orders/sweeper/metrics/
+"""
+import logging
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from coupons.center import CENTER_NS
+from coupons.models import Coupon
+from .models import Cart, CartItem, Order, OrderItem
+from .stock import release_stock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+METRIC_KEY = "orders-sweeper:{}"
+METRIC_FIELDS = ("runs", "batches", "orders", "items", "stock_released", "skipped_locked")
+
+
+def _add_metrics(stats):
+    cache = caches["default"]
+    for field in METRIC_FIELDS:
+        delta = stats.get(field, 0)
+        if not delta:
+            continue
+        key = METRIC_KEY.format(field)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            if not cache.add(key, delta, timeout=None):
+                cache.incr(key, delta)
+    cache.set(METRIC_KEY.format("last_run"), {**stats, "at": timezone.now().isoformat()}, timeout=None)
+
+
+def sweeper_metrics():
+    cache = caches["default"]
+    keys = [METRIC_KEY.format(f) for f in METRIC_FIELDS]
+    found = cache.get_many(keys + [METRIC_KEY.format("last_run")])
+    out = {f: int(found.get(k) or 0) for f, k in zip(METRIC_FIELDS, keys)}
+    out["last_run"] = found.get(METRIC_KEY.format("last_run"))
+    return out
+
+
+def _expired_qs(now):
+    return Order.objects.filter(status=Order.Status.PENDING_PAYMENT, payment_deadline__lt=now)
+
+
+def _add_by_pk(model, field, amounts):
+    """
+    UPDATE model SET field = GREATEST(field + CASE pk WHEN .. THEN .. END, 0) WHERE pk IN (..) — คำสั่งเดียว
+    (ไม่ให้ติดลบ ไม่งั้น PositiveIntegerField จะทำให้ทั้ง batch ล้มซ้ำทุกรอบ)
+    """
+    if not amounts:
+        return
+    delta = Case(
+        *[When(pk=pk, then=Value(n)) for pk, n in amounts.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    model.objects.filter(pk__in=amounts).update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def _restore_carts(items, user_of_order):
+    """คืน order items เข้าตะกร้าของเจ้าของ: รวมเข้าบรรทัดเดิมถ้ามี (variant เดียวกัน) ไม่งั้นสร้างใหม่"""
+    wanted = defaultdict(int)  # (user_id, product_id, variant_id) → qty
+    for it in items:
+        wanted[(user_of_order[it.order_id], it.product_id, it.variant_id)] += it.quantity
+    user_ids = {key[0] for key in wanted}
+
+    carts = dict(Cart.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+    missing = [Cart(user_id=uid) for uid in user_ids if uid not in carts]
+    if missing:
+        Cart.objects.bulk_create(missing, ignore_conflicts=True)
+        carts = dict(Cart.objects.filter(user_id__in=user_ids).values_list("user_id", "id"))
+
+    existing = {}
+    for pk, cart_id, product_id, variant_id in CartItem.objects.filter(
+        cart_id__in=carts.values(), variant_id__in={key[2] for key in wanted}
+    ).values_list("id", "cart_id", "product_id", "variant_id"):
+        existing.setdefault((cart_id, product_id, variant_id), pk)
+
+    increments, new_items = {}, []
+    for (user_id, product_id, variant_id), qty in wanted.items():
+        pk = existing.get((carts[user_id], product_id, variant_id))
+        if pk:
+            increments[pk] = increments.get(pk, 0) + qty
+        else:
+            new_items.append(CartItem(cart_id=carts[user_id], product_id=product_id, variant_id=variant_id, quantity=qty))
+    _add_by_pk(CartItem, "quantity", increments)
+    CartItem.objects.bulk_create(new_items)
+
+
+def sweep_batch(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """ประมวลผล expired orders หนึ่ง batch ใน transaction เดียว คืน stats ของ batch"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        orders = list(
+            _expired_qs(now)
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("payment_deadline", "id")
+            .values("id", "user_id", "coupon_id", "payment_slip")[:batch_size]
+        )
+        if not orders:
+            return {"orders": 0, "items": 0, "stock_released": 0}
+
+        order_ids = [o["id"] for o in orders]
+        user_of_order = {o["id"]: o["user_id"] for o in orders}
+        reserved = {o["id"] for o in orders if o["payment_slip"]}
+        items = list(OrderItem.objects.filter(order_id__in=order_ids).only(
+            "order_id", "product_id", "variant_id", "quantity"
+        ))
+
+        # คืน stock (ถ้าเคยลดไปแล้ว)
+        release_stock([it for it in items if it.order_id in reserved])
+        # คืนสินค้ากลับ cart
+        _restore_carts(items, user_of_order)
+        # คืน coupon usage
+        used = Counter(o["coupon_id"] for o in orders if o["coupon_id"])
+        _add_by_pk(Coupon, "uses_count", {pk: -n for pk, n in used.items()})
+        if used:
+            bump_namespace_on_commit(CENTER_NS)
+
+        Order.objects.filter(pk__in=order_ids).delete()
+
+    return {
+        "orders": len(order_ids),
+        "items": len(items),
+        "stock_released": sum(it.quantity for it in items if it.order_id in reserved),
+    }
+
+
+def sweep_expired_orders(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0.0):
+    """
+    วน sweep_batch จนไม่เหลือ (หรือครบ max_batches) คืน stats รวม
+    `pause` (วินาที) พักระหว่าง batch เพื่อเว้นช่องให้ traffic ปกติ
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    stats = Counter(runs=1)
+    while max_batches is None or stats["batches"] < max_batches:
+        result = sweep_batch(batch_size, now=now)
+        if not result["orders"]:
+            break
+        stats.update(result)
+        stats["batches"] += 1
+        if result["orders"] < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    # ยังหมดอายุแต่ไม่ได้ทำ = ถูก lock อยู่ (รอบหน้าค่อยเก็บ)
+    if max_batches is None:
+        stats["skipped_locked"] = _expired_qs(now).count()
+    stats = {**{f: 0 for f in METRIC_FIELDS}, **stats, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
+    _add_metrics(stats)
+    logger.info("expired order sweep: %s", stats)
+    return stats
@@ -0,0 +1,62 @@
+# orders/management/commands/bench_checkout.py
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from catalog.models import Brand, Category, Product, ProductImage, Variant
+from orders.models import Address, Cart, CartItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark POST /api/orders/cart/checkout/ latency and query count per cart size (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 50])
+        parser.add_argument("--rounds", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench-checkout-{time.time_ns()}")
+            address = Address.objects.create(
+                user=user, full_name="Bench", phone="0800000000", address="1 Bench Rd",
+                province="Bangkok", postal_code="10100",
+            )
+            cart, _ = Cart.objects.get_or_create(user=user)
+            brand = Brand.objects.create(name="bench-checkout-brand")
+            category = Category.objects.create(name="bench-checkout-cat")
+            variants = []
+            for i in range(max(opts["lines"])):
+                product = Product.objects.create(brand=brand, category=category, name=f"bench checkout {i}",
+                                                 base_price=1990, sale_percent=15)
+                ProductImage.objects.create(product=product, url_source=f"https://cdn.example.com/{i}.jpg", is_cover=True)
+                variants.append(Variant.objects.create(product=product, color="Black", size_eu="42",
+                                                       size_cm="26.5", stock=1_000_000))
+
+            client = APIClient()
+            client.force_authenticate(user)
+            for lines in opts["lines"]:
+                samples, queries = [], 0
+                for _ in range(opts["rounds"]):
+                    CartItem.objects.bulk_create([
+                        CartItem(cart=cart, product_id=v.product_id, variant=v, quantity=2) for v in variants[:lines]
+                    ])
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = client.post("/api/orders/cart/checkout/", {"address_id": address.pk}, format="json")
+                        samples.append(time.perf_counter() - started)
+                    if response.status_code != 201:
+                        self.stderr.write(f"checkout failed: {response.status_code} {response.content[:200]!r}")
+                        break
+                    queries = len(ctx.captured_queries)
+                self.stdout.write(
+                    f"lines={lines:>3} queries={queries:>4} "
+                    f"median={statistics.median(samples) * 1000:7.2f}ms max={max(samples) * 1000:7.2f}ms"
+                )
+            transaction.set_rollback(True)
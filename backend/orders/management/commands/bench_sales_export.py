@@ -0,0 +1,224 @@
+# orders/management/commands/bench_sales_export.py
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from aj_shoes_backend.analytics_views import SALES_EXPORT_HEADER, _base_queryset, _sales_export_rows
+from catalog.models import Brand, Category, Product, Variant
+from orders.models import Address
+
+User = get_user_model()
+
+# ข้อมูล bench อยู่ในช่วงวันที่นี้เท่านั้น (ไม่ปนกับ order จริง)
+DATE_FROM, DATE_TO = "2000-06-01", "2000-06-30"
+URLS = {
+    "csv": "/api/admin/analytics/export.csv",
+    "xlsx": "/api/admin/analytics/export.xlsx",
+}
+
+
+def _rss_kb(field):
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _in_child(fn):
+    """
+    รัน fn ใน process ลูก (fork) → peak RSS ของแต่ละแบบไม่ปนกัน
+    คืน {"seconds", "bytes", "peak_mb", "first_byte"} (peak_mb = VmHWM - RSS ตอนเริ่ม)
+    fn คืนจำนวน byte หรือ {"bytes", "first_byte": perf_counter ตอนได้ byte แรก}
+    """
+    connections.close_all()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            with open("/proc/self/clear_refs", "w") as fh:
+                fh.write("5")  # reset VmHWM
+            base = _rss_kb("VmRSS")
+            started = time.perf_counter()
+            result = fn()
+            if not isinstance(result, dict):
+                result = {"bytes": result, "first_byte": None}
+            first_byte = result["first_byte"]
+            out = {"seconds": time.perf_counter() - started, "bytes": result["bytes"],
+                   "peak_mb": (_rss_kb("VmHWM") - base) / 1024,
+                   "first_byte": None if first_byte is None else first_byte - started}
+        except BaseException as exc:
+            out = {"error": repr(exc)}
+        os.write(write_fd, json.dumps(out).encode())
+        os._exit(0)
+    os.close(write_fd)
+    chunks = []
+    while chunk := os.read(read_fd, 65536):
+        chunks.append(chunk)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return json.loads(b"".join(chunks))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the sales CSV/XLSX exports: seed N order items, then measure peak RSS and wall time "
+        "per format in a forked process (--buffered adds the old in-memory Workbook for comparison, "
+        "--asgi sends the request through Django's ASGIHandler as under daphne)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+        parser.add_argument("--formats", nargs="+", choices=sorted(URLS), default=["csv", "xlsx"])
+        parser.add_argument("--buffered", action="store_true", help="วัดแบบเดิม (Workbook เต็ม + BytesIO) ด้วย")
+        parser.add_argument("--asgi", action="store_true", help="วัดผ่าน ASGIHandler ด้วย (เวลาถึง byte แรก)")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql" or not os.path.exists("/proc/self/clear_refs"):
+            raise CommandError("ต้องรันบน PostgreSQL + Linux (/proc สำหรับวัด RSS)")
+
+        for rows in opts["rows"]:
+            user, product = self._seed(rows)
+            try:
+                runs = [(fmt, lambda fmt=fmt: self._export(user, fmt)) for fmt in opts["formats"]]
+                if opts["asgi"]:
+                    runs += [(f"{fmt}-asgi", lambda fmt=fmt: self._export_asgi(user, fmt)) for fmt in opts["formats"]]
+                if opts["buffered"]:
+                    runs.append(("xlsx-buffered", self._buffered_xlsx))
+                for name, fn in runs:
+                    result = _in_child(fn)
+                    if "error" in result:
+                        raise CommandError(f"{name} failed: {result['error']}")
+                    first = result["first_byte"]
+                    self.stdout.write(
+                        f"rows={rows:>9,} {name:<14} time={result['seconds']:7.2f}s "
+                        f"peak_rss=+{result['peak_mb']:7.1f}MB size={result['bytes'] / 1e6:7.1f}MB"
+                        + (f" first_byte={first:6.2f}s" if first is not None else "")
+                    )
+            finally:
+                self._cleanup(user, product)
+
+    def _export(self, user, fmt):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(URLS[fmt], {"date_from": DATE_FROM, "date_to": DATE_TO})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return size
+
+    def _export_asgi(self, user, fmt):
+        """ส่ง request ผ่าน ASGIHandler ของ Django (เส้นทางเดียวกับ daphne) ด้วย JWT จริง"""
+        path = URLS[fmt]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": f"date_from={DATE_FROM}&date_to={DATE_TO}".encode(),
+            "headers": [(b"host", b"localhost"), (b"authorization", f"Bearer {AccessToken.for_user(user)}".encode())],
+            "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+        }
+        out = {"bytes": 0, "first_byte": None, "status": None}
+
+        async def run():
+            request_sent, disconnected = False, asyncio.Event()
+
+            async def receive():
+                nonlocal request_sent
+                if not request_sent:
+                    request_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    out["status"] = message["status"]
+                elif message.get("body"):
+                    if out["first_byte"] is None:
+                        out["first_byte"] = time.perf_counter()
+                    out["bytes"] += len(message["body"])
+
+            await ASGIHandler()(scope, receive, send)
+
+        asyncio.run(run())
+        if out["status"] != 200:
+            raise RuntimeError(f"HTTP {out['status']}")
+        return out
+
+    def _buffered_xlsx(self):
+        """แบบเดิมก่อน write_only: Workbook เต็ม → BytesIO → bio.read()"""
+        from openpyxl import Workbook
+
+        tz = timezone.get_current_timezone()
+        date_from, date_to = (datetime.strptime(d, "%Y-%m-%d").replace(tzinfo=tz) for d in (DATE_FROM, DATE_TO))
+        items = _base_queryset(date_from, date_to, [], [], [])
+        wb = Workbook()
+        ws = wb.active
+        ws.append(SALES_EXPORT_HEADER)
+        for row in _sales_export_rows(items):
+            ws.append(row)
+        bio = BytesIO()
+        wb.save(bio)
+        bio.seek(0)
+        return len(bio.read())
+
+    def _seed(self, rows):
+        started = time.perf_counter()
+        tag = time.time_ns()
+        user = User.objects.create(username=f"bench-export-{tag}", password="!", is_staff=True)
+        address = Address.objects.create(user=user, full_name="bench", phone="0", address="-", province="-", postal_code="0")
+        brand = Brand.objects.create(name=f"bench-export-{tag}")
+        category = Category.objects.create(name=f"bench-export-{tag}")
+        product = Product.objects.create(brand=brand, category=category, name="bench export shoe", base_price=1990)
+        variant = Variant.objects.create(product=product, color="Black", size_eu="42", size_cm="26.5", stock=0)
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO orders_order (user_id, address_id, status, shipping_carrier, shipping_cost, total,
+                                          created_at, payment_deadline)
+                SELECT %s, %s, 'delivered', 'Kerry', 50, 1990, %s::timestamptz + (g || ' seconds')::interval, NULL
+                FROM generate_series(1, %s) AS g
+                """,
+                [user.pk, address.pk, DATE_FROM, (rows + 2) // 3],
+            )
+            cur.execute(
+                """
+                INSERT INTO orders_orderitem (order_id, product_id, variant_id, price, quantity)
+                SELECT o.id, %s, %s, 1990.00, 1 + (o.id %% 3)
+                FROM orders_order o CROSS JOIN generate_series(1, 3)
+                WHERE o.user_id = %s
+                LIMIT %s
+                """,
+                [product.pk, variant.pk, user.pk, rows],
+            )
+            cur.execute("ANALYZE orders_order")
+            cur.execute("ANALYZE orders_orderitem")
+        self.stdout.write(f"seeded {rows:,} order items in {time.perf_counter() - started:.1f}s")
+        return user, product
+
+    def _cleanup(self, user, product):
+        # ลบด้วย SQL ตรง ๆ (ORM cascade จะโหลดทีละแถวเป็นล้านแถว)
+        with connection.cursor() as cur:
+            cur.execute(
+                "DELETE FROM orders_orderitem WHERE order_id IN (SELECT id FROM orders_order WHERE user_id = %s)",
+                [user.pk],
+            )
+            cur.execute("DELETE FROM orders_order WHERE user_id = %s", [user.pk])
+        brand, category = product.brand, product.category
+        product.delete()
+        brand.delete()
+        category.delete()
+        user.delete()
@@ -0,0 +1,145 @@
+# orders/management/commands/bench_sales_summary.py
+import statistics
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from aj_shoes_backend.analytics_views import _series
+from aj_shoes_backend.sales_aggregate import METHODS, SOURCES, aggregate_sales
+from catalog.models import Brand, Category, Product, Variant
+from coupons.models import Coupon
+from orders.models import Address, DailyOrderRollup, DailySalesRollup
+from orders.rollup import rebuild
+
+User = get_user_model()
+
+# ข้อมูล bench อยู่ในปีนี้เท่านั้น (ไม่ปนกับ order จริง)
+DAY_FROM, DAY_TO = date(2000, 1, 1), date(2000, 12, 31)
+GROUPS = ("day", "week", "month", "quarter")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the sales dashboard aggregation: seed N order items, then time one-query-per-breakdown "
+        "vs GROUPING SETS over the live OrderItem joins and over DailySalesRollup, and check all results match"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+        parser.add_argument("--products", type=int, default=300)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--sources", nargs="+", choices=SOURCES, default=list(SOURCES))
+        parser.add_argument("--brand-filter", action="store_true", help="วัดแบบกรอง brand เดียวด้วย")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("GROUPING SETS ต้องใช้ PostgreSQL")
+
+        for rows in opts["rows"]:
+            seeded = self._seed(rows, opts["products"])
+            try:
+                filters = [{}]
+                if opts["brand_filter"]:
+                    filters.append({"brands": [seeded["brands"][0]]})
+                for source in opts["sources"]:
+                    for flt in filters:
+                        self._bench(rows, source, flt, opts["repeat"])
+            finally:
+                self._cleanup(seeded)
+
+    def _bench(self, rows, source, flt, repeat):
+        baseline = None
+        for method in METHODS[::-1]:  # queries (แบบเดิม) ก่อน เป็นตัวเทียบ
+            timings, result = [], None
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    result = aggregate_sales(DAY_FROM, DAY_TO, source=source, method=method, **flt)
+                    for group in GROUPS:
+                        _series(result["daily"], group)
+                    timings.append(time.perf_counter() - started)
+            if baseline is None:
+                baseline = result
+            elif result != baseline:
+                raise CommandError(f"{source}/{method} differs from the per-query result")
+            label = f"{source}{'+brand' if flt else ''}/{method}"
+            self.stdout.write(
+                f"rows={rows:>9,} {label:<28} queries={len(ctx.captured_queries):>2} "
+                f"median={statistics.median(timings) * 1000:9.1f}ms min={min(timings) * 1000:9.1f}ms"
+            )
+
+    def _seed(self, rows, n_products):
+        started = time.perf_counter()
+        tag = time.time_ns()
+        user = User.objects.create(username=f"bench-summary-{tag}", password="!")
+        address = Address.objects.create(user=user, full_name="bench", phone="0", address="-", province="-", postal_code="0")
+        brands = Brand.objects.bulk_create([Brand(name=f"bench-summary-{tag}-{i}") for i in range(10)])
+        categories = Category.objects.bulk_create([Category(name=f"bench-summary-{tag}-{i}") for i in range(5)])
+        products = Product.objects.bulk_create([
+            Product(brand=brands[i % len(brands)], category=categories[i % len(categories)] if i % 7 else None,
+                    name=f"bench summary shoe {i}", base_price=1000 + i)
+            for i in range(n_products)
+        ])
+        variants = Variant.objects.bulk_create([
+            Variant(product=p, color="Black", size_eu="42", size_cm="26.5", stock=0) for p in products
+        ])
+        coupons = Coupon.objects.bulk_create([Coupon(code=f"BS{tag % 10**9}-{i}", percent_off=10) for i in range(3)])
+        with connection.cursor() as cur:
+            # order ที่ 5 ทุกตัวยังรอชำระ (ไม่นับยอด), 1 ใน 4 ใช้คูปอง
+            cur.execute(
+                """
+                INSERT INTO orders_order (user_id, address_id, status, shipping_carrier, shipping_cost, total,
+                                          coupon_id, created_at, payment_deadline)
+                SELECT %s, %s,
+                       CASE WHEN g %% 5 = 0 THEN 'pending_payment'
+                            ELSE (ARRAY['payment_verified', 'shipped', 'delivered'])[1 + g %% 3] END,
+                       'Kerry', 50, 1990,
+                       CASE WHEN g %% 4 = 0 THEN (%s::bigint[])[1 + g %% 3] END,
+                       %s::timestamptz + (g * (365 * 86400.0 / %s) || ' seconds')::interval, NULL
+                FROM generate_series(0, %s - 1) AS g
+                """,
+                [user.pk, address.pk, [c.pk for c in coupons], str(DAY_FROM), (rows + 2) // 3, (rows + 2) // 3],
+            )
+            cur.execute(
+                """
+                INSERT INTO orders_orderitem (order_id, product_id, variant_id, price, quantity)
+                SELECT o.id, (%s::bigint[])[1 + k], (%s::bigint[])[1 + k], 990 + k, 1 + (o.id %% 3)
+                FROM orders_order o CROSS JOIN generate_series(0, 2) AS s
+                CROSS JOIN LATERAL (SELECT ((o.id * 7 + s * 13) %% %s)::int AS k) AS pick
+                WHERE o.user_id = %s
+                LIMIT %s
+                """,
+                [[p.pk for p in products], [v.pk for v in variants], n_products, user.pk, rows],
+            )
+            cur.execute("ANALYZE orders_order")
+            cur.execute("ANALYZE orders_orderitem")
+        # raw INSERT ไม่ผ่าน signal → สร้าง rollup ของช่วง bench เอง
+        rebuild(DAY_FROM, DAY_TO)
+        self.stdout.write(
+            f"seeded {rows:,} order items + rollup ({DailySalesRollup.objects.filter(date__year=2000).count():,} rows) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return {"user": user, "brands": [b.pk for b in brands], "categories": [c.pk for c in categories],
+                "products": [p.pk for p in products], "coupons": [c.pk for c in coupons]}
+
+    def _cleanup(self, seeded):
+        # ลบด้วย SQL ตรง ๆ (ORM cascade จะโหลดทีละแถวเป็นล้านแถว)
+        DailySalesRollup.objects.filter(date__gte=DAY_FROM, date__lte=DAY_TO).delete()
+        DailyOrderRollup.objects.filter(date__gte=DAY_FROM, date__lte=DAY_TO).delete()
+        user = seeded["user"]
+        with connection.cursor() as cur:
+            cur.execute(
+                "DELETE FROM orders_orderitem WHERE order_id IN (SELECT id FROM orders_order WHERE user_id = %s)",
+                [user.pk],
+            )
+            cur.execute("DELETE FROM orders_order WHERE user_id = %s", [user.pk])
+        Variant.objects.filter(product_id__in=seeded["products"]).delete()
+        Product.objects.filter(pk__in=seeded["products"]).delete()
+        Brand.objects.filter(pk__in=seeded["brands"]).delete()
+        Category.objects.filter(pk__in=seeded["categories"]).delete()
+        Coupon.objects.filter(pk__in=seeded["coupons"]).delete()
+        user.delete()
@@ -0,0 +1,104 @@
+# orders/management/commands/check_order_query_plans.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from orders.expiry import _expired_qs
+from orders.models import Address, Order
+
+User = get_user_model()
+
+
+def _plans():
+    """(ชื่อ, queryset แบบเดียวกับโค้ดจริง, index ที่ต้องถูกใช้)"""
+    now = timezone.now()
+    user_id = User.objects.filter(username__startswith="plan-check-").values_list("id", flat=True).first()
+    return [
+        (
+            "expiry sweep",
+            _expired_qs(now).order_by("payment_deadline", "id").values("id", "user_id", "coupon_id", "payment_slip")[:100],
+            "order_pending_deadline_idx",
+        ),
+        (
+            "my orders (history)",
+            Order.objects.filter(user_id=user_id).exclude(status=Order.Status.PENDING_PAYMENT).order_by("-created_at")[:20],
+            "order_user_created_idx",
+        ),
+        (
+            "admin pending listing",
+            Order.objects.filter(status=Order.Status.PENDING_PAYMENT).order_by("-created_at")[:100],
+            "order_status_created_idx",
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Query-plan regression check: seed N orders (rolled back), ANALYZE, and assert the "
+        "pending/history/admin order queries use their indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--pending-percent", type=float, default=2.0)
+        parser.add_argument("--show-plans", action="store_true")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("ต้องรันบน PostgreSQL (partial index / EXPLAIN)")
+
+        failures = []
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._seed(opts["orders"], opts["users"], opts["pending_percent"])
+            self.stdout.write(f"seeded {opts['orders']} orders in {time.perf_counter() - started:.1f}s")
+
+            for name, qs, index in _plans():
+                plan = qs.explain()
+                ok = index in plan and "Index" in plan
+                self.stdout.write(f"[{'OK' if ok else 'FAIL'}] {name}: expects {index}")
+                if opts["show_plans"] or not ok:
+                    self.stdout.write("    " + plan.replace("\n", "\n    "))
+                if not ok:
+                    failures.append(name)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"queries not using their index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("all order queries use index scans"))
+
+    def _seed(self, orders, users, pending_percent):
+        people = User.objects.bulk_create(
+            [User(username=f"plan-check-{i}", password="!") for i in range(users)], batch_size=5000
+        )
+        Address.objects.bulk_create([
+            Address(user=u, full_name="plan", phone="0", address="-", province="-", postal_code="0")
+            for u in people
+        ], batch_size=5000)
+
+        # generate_series ฝั่ง DB เร็วกว่าสร้าง object ทีละแถวมาก
+        with connection.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO orders_order
+                    (user_id, address_id, status, shipping_carrier, shipping_cost, total,
+                     payment_deadline, created_at)
+                SELECT a.user_id, a.id,
+                       CASE WHEN random() * 100 < %s THEN 'pending_payment'
+                            ELSE (ARRAY['payment_verified', 'shipped', 'delivered'])[1 + (g %% 3)] END,
+                       'Kerry', 50, 1000 + (g %% 5000),
+                       now() - (g || ' seconds')::interval + interval '30 minutes',
+                       now() - (g || ' seconds')::interval
+                FROM generate_series(1, %s) AS g
+                JOIN (
+                    SELECT id, user_id, row_number() OVER (ORDER BY id) - 1 AS n
+                    FROM orders_address WHERE user_id = ANY(%s)
+                ) a ON a.n = g %% %s
+                """,
+                [pending_percent, orders, [u.pk for u in people], len(people)],
+            )
+            cur.execute("ANALYZE orders_order")
@@ -0,0 +1,40 @@
+# orders/management/commands/rebuild_rating_summary.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace
+from catalog.fragments import FRAGMENT_NS
+from orders.models import Review, ProductRatingSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild ProductRatingSummary from the Review table (bulk)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rows = (
+            Review.objects.values("product_id")
+            .annotate(
+                review_count=Count("id"),
+                rating_sum=Sum("rating"),
+                **{
+                    field: Count("id", filter=Q(rating=star))
+                    for star, field in ProductRatingSummary.STAR_FIELDS.items()
+                },
+            )
+            .order_by("product_id")
+        )
+        summaries = [ProductRatingSummary(**row) for row in rows]
+
+        with transaction.atomic():
+            ProductRatingSummary.objects.all().delete()
+            ProductRatingSummary.objects.bulk_create(summaries, batch_size=batch_size)
+        # bulk_create ไม่ยิง signal → ล้าง cache ของ product JSON ทั้งหมดเอง
+        bump_namespace("catalog")
+        bump_namespace(FRAGMENT_NS)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summary for {len(summaries)} products."))
@@ -0,0 +1,37 @@
+# orders/management/commands/run_export_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from aj_shoes_backend.export_jobs import STALE_MINUTES, purge_jobs, requeue_stale, run_job
+from orders.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued export jobs (sales/stock CSV/XLSX). Use with EXPORT_JOB_WORKERS=0, or as a sweeper that "
+        "requeues jobs stuck in 'running' after a crash. Loops every --interval seconds; 0 = run once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0)
+        parser.add_argument("--stale-minutes", type=int, default=STALE_MINUTES, help="RUNNING นานเกินนี้ถือว่า process ตาย → คิวใหม่")
+        parser.add_argument("--purge-days", type=int, default=0, help="ลบ job + ไฟล์ที่เก่ากว่า N วัน (0 = ไม่ลบ)")
+
+    def handle(self, *args, **opts):
+        while True:
+            requeued = requeue_stale(opts["stale_minutes"])
+            if requeued:
+                self.stdout.write(f"requeued {requeued} stale job(s)")
+            queued = ExportJob.objects.filter(status=ExportJob.Status.QUEUED).order_by("created_at")
+            for job_id in queued.values_list("id", flat=True):
+                if run_job(job_id):
+                    job = ExportJob.objects.get(pk=job_id)
+                    self.stdout.write(f"job #{job.pk} {job.kind}.{job.fmt}: {job.status} rows={job.rows}")
+            if opts["purge_days"]:
+                purged = purge_jobs(opts["purge_days"])
+                if purged:
+                    self.stdout.write(f"purged {purged} old job(s)")
+            if not opts["interval"]:
+                break
+            time.sleep(opts["interval"])
@@ -0,0 +1,85 @@
+# orders/management/commands/stress_stock_reservation.py
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from catalog.models import Brand, Category, Product, Variant
+from orders.stock import InsufficientStock, reserve_stock
+
+Line = namedtuple("Line", "variant_id product_id quantity")
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency harness: N parallel buyers reserve the same two variants "
+        "(opposite line order) and the command asserts there is no oversell or deadlock"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=50)
+        parser.add_argument("--stock-a", type=int, default=20)
+        parser.add_argument("--stock-b", type=int, default=30)
+        parser.add_argument("--hold-ms", type=int, default=5, help="ถือ transaction ไว้หลังจอง (จำลองงานอื่นใน checkout)")
+
+    def handle(self, *args, **opts):
+        buyers = opts["buyers"]
+        brand = Brand.objects.create(name=f"stress-brand-{time.time_ns()}")
+        category = Category.objects.create(name=f"stress-cat-{time.time_ns()}")
+        product = Product.objects.create(brand=brand, category=category, name="stress product", base_price=100)
+        a = Variant.objects.create(product=product, color="A", size_eu="40", size_cm="25", stock=opts["stock_a"])
+        b = Variant.objects.create(product=product, color="B", size_eu="40", size_cm="25", stock=opts["stock_b"])
+
+        try:
+            outcomes = Counter()
+            barrier = threading.Barrier(buyers)
+            lock = threading.Lock()
+
+            def buyer(n):
+                lines = [Line(a.pk, product.pk, 1), Line(b.pk, product.pk, 1)]
+                random.Random(n).shuffle(lines)
+                try:
+                    barrier.wait()
+                    with transaction.atomic():
+                        reserve_stock(lines)
+                        time.sleep(opts["hold_ms"] / 1000)
+                    result = "reserved"
+                except InsufficientStock:
+                    result = "short"
+                except Exception as exc:  # deadlock / IntegrityError = harness ล้มเหลว
+                    result = f"error: {exc.__class__.__name__}"
+                finally:
+                    connection.close()
+                with lock:
+                    outcomes[result] += 1
+
+            threads = [threading.Thread(target=buyer, args=(n,)) for n in range(buyers)]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = (time.perf_counter() - started) * 1000
+
+            a.refresh_from_db()
+            b.refresh_from_db()
+            expected = min(buyers, opts["stock_a"], opts["stock_b"])
+            self.stdout.write(
+                f"buyers={buyers} outcomes={dict(outcomes)} stock_a={a.stock} stock_b={b.stock} time={elapsed:.0f}ms"
+            )
+
+            errors = {k: v for k, v in outcomes.items() if k.startswith("error")}
+            if errors:
+                raise CommandError(f"unexpected errors: {errors}")
+            if outcomes["reserved"] != expected:
+                raise CommandError(f"reserved {outcomes['reserved']} orders, expected {expected}")
+            if a.stock != opts["stock_a"] - expected or b.stock != opts["stock_b"] - expected:
+                raise CommandError("stock does not match the number of successful reservations")
+            self.stdout.write(self.style.SUCCESS("OK: no oversell, no negative stock, no deadlock"))
+        finally:
+            product.delete()
+            brand.delete()
+            category.delete()
@@ -0,0 +1,29 @@
+# orders/management/commands/sweep_expired_orders.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.expiry import DEFAULT_BATCH_SIZE, sweep_expired_orders
+
+
+class Command(BaseCommand):
+    help = "Release expired PENDING_PAYMENT orders in small SKIP LOCKED batches (use --interval to run as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, default=None, help="จำกัดจำนวน batch ต่อรอบ")
+        parser.add_argument("--pause", type=float, default=0.05, help="พักระหว่าง batch (วินาที)")
+        parser.add_argument("--interval", type=float, default=0, help="> 0 = วนทุก N วินาทีไม่จบ (cron ในตัว)")
+
+    def handle(self, *args, **opts):
+        while True:
+            stats = sweep_expired_orders(
+                batch_size=opts["batch_size"], max_batches=opts["max_batches"], pause=opts["pause"]
+            )
+            self.stdout.write(
+                f"orders={stats['orders']} items={stats['items']} stock_released={stats['stock_released']} "
+                f"batches={stats['batches']} skipped_locked={stats['skipped_locked']} elapsed={stats['elapsed_ms']}ms"
+            )
+            if opts["interval"] <= 0:
+                break
+            time.sleep(opts["interval"])
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_summary(apps, schema_editor):
+    Review = apps.get_model("orders", "Review")
+    ProductRatingSummary = apps.get_model("orders", "ProductRatingSummary")
+    rows = (
+        Review.objects.values("product_id")
+        .annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            **{f"star_{i}": Count("id", filter=Q(rating=i)) for i in range(1, 6)},
+        )
+        .order_by("product_id")
+    )
+    ProductRatingSummary.objects.bulk_create([ProductRatingSummary(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_rename_description_en_product_description_and_more'),
+        ('orders', '0009_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='catalog.product')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('star_1', models.PositiveIntegerField(default=0)),
+                ('star_2', models.PositiveIntegerField(default=0)),
+                ('star_3', models.PositiveIntegerField(default=0)),
+                ('star_4', models.PositiveIntegerField(default=0)),
+                ('star_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 11:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ไม่ lock การเขียนตาราง orders ระหว่างสร้าง (ต้องอยู่นอก transaction)
+    atomic = False
+
+    dependencies = [
+        ('coupons', '0002_usercoupon'),
+        ('orders', '0010_productratingsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'pending_payment')), fields=['payment_deadline'], name='order_pending_deadline_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        # index เดี่ยวของ FK user ซ้ำกับ order_user_created_idx (คอลัมน์นำหน้าเดียวกัน) → ลบทิ้ง
+        migrations.AlterField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='orders', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
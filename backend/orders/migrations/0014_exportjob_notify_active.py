@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-17 12:48
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def prepare_active_jobs(apps, schema_editor):
+    """queued_at ของแถวเดิม = created_at และเหลือ job ที่ยังไม่จบตัวล่าสุดตัวเดียวต่อ fingerprint (ก่อนสร้าง constraint)"""
+    ExportJob = apps.get_model("orders", "ExportJob")
+    ExportJob.objects.update(queued_at=F("created_at"))
+    seen = set()
+    active = ExportJob.objects.filter(status__in=["queued", "running"]).order_by("-created_at", "-id")
+    for pk, fp in active.values_list("id", "fingerprint"):
+        if fp in seen:
+            ExportJob.objects.filter(pk=pk).update(status="failed", error="superseded by a newer job")
+        seen.add(fp)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_dailysalesrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='notify',
+            field=models.ManyToManyField(blank=True, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(prepare_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='exportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('fingerprint',), name='export_job_active_fingerprint'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 # orders/models.py
 from django.db import models
+from django.db.models import F, Q
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from catalog.models import Product, Variant
+from catalog.models import Brand, Category, Product, Variant
 from coupons.models import Coupon
 
 User = settings.AUTH_USER_MODEL
@@ -55,7 +56,11 @@ class Order(models.Model):
         DELIVERED = "delivered", "ส่งถึงแล้ว"
         # ลบ CANCELLED ออกเลย
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
+    # สถานะที่นับเป็นยอดขายใน dashboard (ชำระแล้วขึ้นไป) — ดู DailySalesRollup
+    COUNTED_STATUSES = (Status.PAYMENT_VERIFIED, Status.SHIPPED, Status.DELIVERED)
+
+    # index ของ user อยู่ใน order_user_created_idx (user_id, created_at DESC) ด้านล่างแล้ว
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders", db_index=False)
     address = models.ForeignKey(Address, on_delete=models.PROTECT)
     status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING_PAYMENT)
     shipping_carrier = models.CharField(max_length=32, default="Kerry")
@@ -67,6 +72,21 @@ class Order(models.Model):
     payment_verified_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # sweeper (orders/expiry.py): status='pending_payment' AND payment_deadline < now()
+            # partial → เล็กเท่าจำนวน order ที่รอชำระ ไม่โตตามประวัติทั้งหมด
+            models.Index(
+                fields=["payment_deadline"],
+                condition=Q(status="pending_payment"),
+                name="order_pending_deadline_idx",
+            ),
+            # MyOrdersView: user_id = ? ORDER BY created_at DESC
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+            # admin listing ตามสถานะ (เช่นรออนุมัติสลิป) เรียงตามเวลา
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.payment_deadline and self.status == self.Status.PENDING_PAYMENT:
             self.payment_deadline = timezone.now() + timedelta(minutes=30)
@@ -106,4 +126,151 @@ class Review(models.Model):
     updated_at = models.DateTimeField(auto_now=True)  # ✅ ใหม่: เก็บเวลาแก้ไขล่าสุด
 
     class Meta:
-        unique_together = ("user", "product")  # ✅ ใหม่: จำกัด 1 คนรีวิวสินค้าตัวเดิมได้ครั้งเดียว
\ No newline at end of file
+        unique_together = ("user", "product")  # ✅ ใหม่: จำกัด 1 คนรีวิวสินค้าตัวเดิมได้ครั้งเดียว
+
+class ProductRatingSummary(models.Model):
+    """
+    สรุปรีวิวต่อสินค้า (denormalized) อัปเดตแบบ incremental ทุกครั้งที่ Review ถูกสร้าง/แก้/ลบ
+    ดู orders/signals.py และคำสั่ง rebuild_rating_summary
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="rating_summary")
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    STAR_FIELDS = {1: "star_1", 2: "star_2", 3: "star_3", 4: "star_4", 5: "star_5"}
+
+    @property
+    def average(self):
+        if not self.review_count:
+            return 0
+        return self.rating_sum / self.review_count
+
+    def stars(self):
+        return {str(i): getattr(self, f) for i, f in self.STAR_FIELDS.items()}
+
+    @classmethod
+    def apply_delta(cls, product_id, count=0, rating_sum=0, stars=None, create=True):
+        """
+        บวก/ลบค่าด้วย UPDATE ... SET x = x + n (atomic ระดับแถว)
+        create=False ใช้ตอนลบรีวิว เพื่อไม่สร้างแถวใหม่ให้สินค้าที่กำลังถูกลบ
+        """
+        updates = {"review_count": F("review_count") + count, "rating_sum": F("rating_sum") + rating_sum,
+                   "updated_at": timezone.now()}
+        for star, delta in (stars or {}).items():
+            field = cls.STAR_FIELDS.get(star)
+            if field and delta:
+                updates[field] = F(field) + delta
+        qs = cls.objects.filter(product_id=product_id)
+        if qs.update(**updates) or not create:
+            return
+        cls.objects.get_or_create(product_id=product_id)
+        qs.update(**updates)
+
+
+class DailySalesRollup(models.Model):
+    """
+    ยอดขายรายวันต่อ (วันที่, สินค้า, คูปอง) สำหรับ dashboard — brand/category ตามสินค้า ณ ตอนนับ
+    บวก/ลบทีละ order เมื่อเข้า/ออกจาก Order.COUNTED_STATUSES (orders/rollup.py + orders/signals.py)
+    สร้างใหม่ทั้งหมด/บางช่วงด้วยคำสั่ง backfill_sales_rollup
+    orders = จำนวน order ที่มีสินค้านี้ในวันนั้น (รวมข้ามสินค้าไม่ได้ → ยอด order รวมดู DailyOrderRollup)
+    """
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name="+")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    coupon_code = models.CharField(max_length=32, blank=True, default="")  # "" = ไม่ใช้คูปอง
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    items = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "product", "coupon_code"], name="sales_rollup_day_product_coupon"),
+        ]
+
+    @classmethod
+    def apply_delta(cls, date, product_id, coupon_code, brand_id, category_id, revenue=0, items=0, orders=0):
+        """บวก/ลบด้วย UPDATE ... SET x = x + n (atomic ระดับแถว) แบบเดียวกับ ProductRatingSummary.apply_delta"""
+        updates = {"revenue": F("revenue") + revenue, "items": F("items") + items, "orders": F("orders") + orders,
+                   "brand_id": brand_id, "category_id": category_id}
+        qs = cls.objects.filter(date=date, product_id=product_id, coupon_code=coupon_code)
+        if qs.update(**updates):
+            return
+        cls.objects.get_or_create(
+            date=date, product_id=product_id, coupon_code=coupon_code,
+            defaults={"brand_id": brand_id, "category_id": category_id},
+        )
+        qs.update(**updates)
+
+
+class DailyOrderRollup(models.Model):
+    """จำนวน order ที่นับยอดต่อ (วันที่, คูปอง) — order หนึ่งอยู่ในแถวเดียวเสมอ จึงรวมข้ามวันได้ตรง"""
+    date = models.DateField()
+    coupon_code = models.CharField(max_length=32, blank=True, default="")
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "coupon_code"], name="order_rollup_day_coupon"),
+        ]
+
+    @classmethod
+    def apply_delta(cls, date, coupon_code, orders):
+        qs = cls.objects.filter(date=date, coupon_code=coupon_code)
+        if qs.update(orders=F("orders") + orders):
+            return
+        cls.objects.get_or_create(date=date, coupon_code=coupon_code)
+        qs.update(orders=F("orders") + orders)
+
+
+class ExportJob(models.Model):
+    """งาน export (ยอดขาย / stock) ที่ทำใน background → ไฟล์อยู่ใน MEDIA_ROOT/exports/ (aj_shoes_backend/export_jobs.py)"""
+
+    class Kind(models.TextChoices):
+        SALES = "sales", "ยอดขาย"
+        STOCK = "stock", "Stock"
+
+    class Format(models.TextChoices):
+        CSV = "csv", "CSV"
+        XLSX = "xlsx", "Excel"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "รอคิว"
+        RUNNING = "running", "กำลังสร้าง"
+        DONE = "done", "พร้อมดาวน์โหลด"
+        FAILED = "failed", "ล้มเหลว"
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    # ผู้ขอ export เดียวกันคนอื่นที่ได้ job นี้ไป (reuse) → แจ้งเตือนด้วยเมื่อเสร็จ
+    notify = models.ManyToManyField(User, blank=True, related_name="+")
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    fmt = models.CharField(max_length=8, choices=Format.choices, default=Format.CSV)
+    filters = models.JSONField(default=dict, blank=True)
+    # hash ของ (kind, fmt, filters, version ของข้อมูล) → ตัวกรองเดิม + ไม่มี order ใหม่ = ใช้ไฟล์เดิมได้
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    file = models.FileField(upload_to="exports/", null=True, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    queued_at = models.DateTimeField(default=timezone.now)  # เข้าคิวล่าสุด (requeue แล้วนับใหม่)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        constraints = [
+            # job ที่ยังไม่จบมีได้ตัวเดียวต่อ fingerprint → request พร้อมกันไม่สร้าง export ซ้ำ
+            models.UniqueConstraint(
+                fields=["fingerprint"], condition=Q(status__in=["queued", "running"]), name="export_job_active_fingerprint",
+            ),
+        ]
+
+    def __str__(self):
+        return f"ExportJob #{self.id} {self.kind}.{self.fmt} ({self.status})"
@@ -0,0 +1,164 @@
+# orders/rollup.py
+"""
+ตารางสรุปยอดขายรายวันสำหรับ dashboard (DailySalesRollup / DailyOrderRollup)
+- apply_order(): order เข้า Order.COUNTED_STATUSES → บวก, ออก (ถูกลบ) → ลบ  (เรียกจาก orders/signals.py)
+  คิดจาก OrderItem ของ order นั้นคิวรีเดียว แล้ว UPDATE ... SET x = x + n ทีละแถว (สินค้าใน order มีไม่กี่ตัว)
+- rebuild(): คำนวณใหม่จาก OrderItem ทั้งช่วง (คำสั่ง backfill_sales_rollup)
+- daily_order_counts(): จำนวน order ต่อวัน — ไม่มีตัวกรอง brand/category ใช้ DailyOrderRollup
+  มีตัวกรอง → นับจาก Order ตรง ๆ (order ที่มีสินค้าตรงตัวกรอง "อย่างน้อยหนึ่งชิ้น" รวมจากแถวสินค้าไม่ได้)
+วันที่ = วันตาม TIME_ZONE ของ order.created_at
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyOrderRollup, DailySalesRollup, Order, OrderItem
+
+REBUILD_BATCH_SIZE = 2000
+
+
+def apply_order(order, sign=1):
+    """บวก (sign=1) หรือลบ (sign=-1) ยอดของ order นี้ในตาราง rollup — เรียกภายใน transaction ของการเปลี่ยนสถานะ"""
+    lines = OrderItem.objects.filter(order_id=order.pk).values_list(
+        "product_id", "product__brand_id", "product__category_id", "price", "quantity", "order__coupon__code",
+    )
+    per_product = {}
+    coupon_code = ""
+    for product_id, brand_id, category_id, price, quantity, code in lines:
+        coupon_code = code or ""
+        row = per_product.setdefault(product_id, [brand_id, category_id, Decimal(0), 0])
+        row[2] += (price or 0) * quantity
+        row[3] += quantity
+    if not per_product:
+        return
+
+    day = timezone.localdate(order.created_at)
+    with transaction.atomic():
+        for product_id, (brand_id, category_id, revenue, items) in sorted(per_product.items()):
+            DailySalesRollup.apply_delta(
+                day, product_id, coupon_code, brand_id, category_id,
+                revenue=sign * revenue, items=sign * items, orders=sign,
+            )
+        DailyOrderRollup.apply_delta(day, coupon_code, orders=sign)
+        if sign < 0:
+            # แถวที่ไม่เหลือ order แล้วไม่ต้องเก็บ (ไม่ให้โผล่เป็น 0 ใน breakdown/top)
+            DailySalesRollup.objects.filter(
+                date=day, product_id__in=per_product, coupon_code=coupon_code, orders__lte=0
+            ).delete()
+            DailyOrderRollup.objects.filter(date=day, coupon_code=coupon_code, orders__lte=0).delete()
+
+
+def day_bounds(day_from, day_to):
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(day_from, time.min, tzinfo=tz) if day_from else None
+    end = datetime.combine(day_to + timedelta(days=1), time.min, tzinfo=tz) if day_to else None
+    return start, end
+
+
+def counted_orders(day_from, day_to):
+    start, end = day_bounds(day_from, day_to)
+    qs = Order.objects.filter(status__in=Order.COUNTED_STATUSES)
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lt=end)
+    return qs
+
+
+def rebuild(day_from=None, day_to=None, batch_size=REBUILD_BATCH_SIZE):
+    """ลบแล้วคำนวณ rollup ช่วง [day_from, day_to] ใหม่จาก OrderItem (None = ไม่จำกัด) → คืน (แถวสินค้า, แถว order)"""
+    orders = counted_orders(day_from, day_to)
+    sales_rows = (
+        OrderItem.objects.filter(order__in=orders)
+        .annotate(day=TruncDate("order__created_at"), code=Coalesce("order__coupon__code", Value("")))
+        .values("day", "product_id", "code")
+        .annotate(
+            brand=F("product__brand_id"),
+            category=F("product__category_id"),
+            total=Sum(F("price") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            qty=Sum("quantity"),
+            n=Count("order_id", distinct=True),
+        )
+        .order_by()
+    )
+    order_rows = (
+        orders.annotate(day=TruncDate("created_at"), code=Coalesce("coupon__code", Value("")))
+        .values("day", "code")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    sales_scope = DailySalesRollup.objects.all()
+    order_scope = DailyOrderRollup.objects.all()
+    if day_from:
+        sales_scope, order_scope = sales_scope.filter(date__gte=day_from), order_scope.filter(date__gte=day_from)
+    if day_to:
+        sales_scope, order_scope = sales_scope.filter(date__lte=day_to), order_scope.filter(date__lte=day_to)
+
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # กัน apply_order ที่เกิดระหว่าง rebuild: รอ transaction ที่เขียนค้างอยู่ให้จบก่อน และให้ที่มาทีหลังรอเรา
+            with connection.cursor() as cur:
+                cur.execute(
+                    f"LOCK TABLE {DailySalesRollup._meta.db_table}, {DailyOrderRollup._meta.db_table} IN EXCLUSIVE MODE"
+                )
+        sales_scope.delete()
+        order_scope.delete()
+        created_sales = _bulk_insert(
+            DailySalesRollup,
+            (
+                DailySalesRollup(date=r["day"], product_id=r["product_id"], coupon_code=r["code"],
+                                 brand_id=r["brand"], category_id=r["category"],
+                                 revenue=r["total"] or 0, items=r["qty"] or 0, orders=r["n"])
+                for r in sales_rows.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        created_orders = _bulk_insert(
+            DailyOrderRollup,
+            (DailyOrderRollup(date=r["day"], coupon_code=r["code"], orders=r["n"]) for r in order_rows.iterator()),
+            batch_size,
+        )
+    return created_sales, created_orders
+
+
+def _bulk_insert(model, objs, batch_size):
+    count, batch = 0, []
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def daily_order_counts_qs(day_from, day_to, brands=(), categories=(), coupons=(), live=False):
+    """values_list (วันที่, จำนวน order ที่นับยอด) ต่อวันในช่วง [day_from, day_to] — live=True นับจาก Order เสมอ"""
+    if not brands and not categories and not live:
+        qs = DailyOrderRollup.objects.filter(date__gte=day_from, date__lte=day_to)
+        if coupons:
+            qs = qs.filter(coupon_code__in=coupons)
+        return qs.values("date").annotate(n=Sum("orders")).order_by().values_list("date", "n")
+
+    lines = OrderItem.objects.filter(order=OuterRef("pk"))
+    if brands:
+        lines = lines.filter(product__brand_id__in=brands)
+    if categories:
+        lines = lines.filter(product__category_id__in=categories)
+    qs = counted_orders(day_from, day_to).filter(Exists(lines))
+    if coupons:
+        qs = qs.filter(coupon__code__in=coupons)
+    return qs.annotate(day=TruncDate("created_at")).values("day").annotate(n=Count("id")).order_by().values_list("day", "n")
+
+
+def daily_order_counts(day_from, day_to, brands=(), categories=(), coupons=(), live=False):
+    """{date: จำนวน order ที่นับยอด} ในช่วง [day_from, day_to]"""
+    return dict(daily_order_counts_qs(day_from, day_to, brands, categories, coupons, live))
@@ -1,7 +1,7 @@
 # orders/serializers.py
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Address, Cart, CartItem, Order, OrderItem, Favorite, Review, PaymentConfig
+from .models import Address, Cart, CartItem, Order, OrderItem, Favorite, Review, PaymentConfig, ExportJob
 from catalog.serializers import VariantSerializer
 from catalog.models import Product
 from coupons.models import Coupon
@@ -106,6 +106,20 @@ class AddressSerializer(serializers.ModelSerializer):
         fields = ["id", "full_name", "phone", "address", "province", "postal_code", "is_default"]
 
 
+# ---------- items ที่ view โหลดไว้แล้ว ----------
+class PreloadedItemsListSerializer(serializers.ListSerializer):
+    """
+    cart.items / order.items: ถ้า view ส่งรายการที่โหลดไว้แล้วมาใน context={"items": {<pk ของ cart/order>: [...]}}
+    ใช้รายการนั้นแทนการ query related manager (ไม่มีใน context → อ่าน instance.items.all() ตามปกติ)
+    """
+
+    def get_attribute(self, instance):
+        items = self.context.get("items", {}).get(instance.pk)
+        if items is not None:
+            return items
+        return super().get_attribute(instance)
+
+
 # ---------- Cart / CartItem ----------
 class CartItemSerializer(serializers.ModelSerializer):
     product_detail = ProductBriefSerializer(source="product", read_only=True)
@@ -114,6 +128,7 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ["id", "product", "variant", "quantity", "product_detail", "variant_detail"]
+        list_serializer_class = PreloadedItemsListSerializer
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -173,6 +188,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["id", "product", "product_detail", "variant", "variant_detail", "price", "quantity"]
+        list_serializer_class = PreloadedItemsListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -214,4 +230,24 @@ class OrderSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.payment_slip.url)
             return obj.payment_slip.url
-        return None
\ No newline at end of file
+        return None
+
+
+# ---------- Export job (admin) ----------
+class ExportJobSerializer(serializers.ModelSerializer):
+    format = serializers.CharField(source="fmt", read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ["id", "kind", "format", "filters", "status", "rows", "error",
+                  "created_at", "started_at", "finished_at", "download_url"]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        from aj_shoes_backend.export_jobs import download_path
+        path = download_path(obj)
+        request = self.context.get("request")
+        if path and request:
+            return request.build_absolute_uri(path)
+        return path
@@ -1,8 +1,12 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_init, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from .models import Order
+from .models import Order, Review, ProductRatingSummary
+from .rollup import apply_order
 from notifications.utils import create_and_push
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from catalog.fragments import bump_product_versions_on_commit
 
 # ถ้ามีโมเดล Notification (เราใส่ไว้ให้ใน accounts/models.py ด้านล่าง)
 try:
@@ -33,3 +37,92 @@ def order_created_notify_admin(sender, instance: Order, created, **kwargs):
             related_content_type=ContentType.objects.get_for_model(Order),
             related_object_id=str(instance.pk),
         )
+
+
+# ---------- ProductRatingSummary (incremental) ----------
+@receiver(post_init, sender=Review)
+def review_remember_rating(sender, instance: Review, **kwargs):
+    # จำค่าเดิมไว้ เพื่อคำนวณ delta ตอน save
+    # ใช้ __dict__ กันกรณี field ถูก defer (.only()) แล้วไปยิง query เพิ่ม
+    instance._loaded_rating = instance.__dict__.get("rating") if instance.pk else None
+    instance._loaded_product_id = instance.__dict__.get("product_id") if instance.pk else None
+
+
+@receiver(pre_save, sender=Review)
+def review_read_stored_rating(sender, instance: Review, **kwargs):
+    # ไม่รู้ค่าเดิมเมื่อ rating/product_id ถูก defer (.only/.defer) หรือสร้าง Review(pk=...) เอง
+    # (ค่าที่ post_init จำไว้คือค่าที่ส่งเข้า constructor) → อ่านค่าที่เก็บอยู่ด้วย query เดียวก่อน UPDATE
+    if instance.pk is None:
+        return
+    known = getattr(instance, "_loaded_rating", None) is not None and getattr(instance, "_loaded_product_id", None) is not None
+    if known and not instance._state.adding:
+        return
+    stored = Review.objects.filter(pk=instance.pk).values("rating", "product_id").first()
+    if stored is not None:
+        instance._loaded_rating = stored["rating"]
+        instance._loaded_product_id = stored["product_id"]
+
+
+@receiver(post_save, sender=Review)
+def review_saved_update_summary(sender, instance: Review, created, **kwargs):
+    old_rating = getattr(instance, "_loaded_rating", None)
+    old_product_id = getattr(instance, "_loaded_product_id", None)
+    with transaction.atomic():
+        if created:
+            ProductRatingSummary.apply_delta(
+                instance.product_id, count=1, rating_sum=instance.rating, stars={instance.rating: 1}
+            )
+        elif old_product_id != instance.product_id:
+            ProductRatingSummary.apply_delta(
+                old_product_id, count=-1, rating_sum=-old_rating, stars={old_rating: -1}, create=False
+            )
+            ProductRatingSummary.apply_delta(
+                instance.product_id, count=1, rating_sum=instance.rating, stars={instance.rating: 1}
+            )
+        elif old_rating != instance.rating:
+            ProductRatingSummary.apply_delta(
+                instance.product_id,
+                rating_sum=instance.rating - old_rating,
+                stars={old_rating: -1, instance.rating: 1},
+            )
+    instance._loaded_rating = instance.rating
+    instance._loaded_product_id = instance.product_id
+    # average_rating/review_count อยู่ใน product JSON ที่ถูก cache
+    bump_namespace_on_commit("catalog")
+    bump_product_versions_on_commit(instance.product_id, old_product_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted_update_summary(sender, instance: Review, **kwargs):
+    rating = getattr(instance, "_loaded_rating", None)
+    if rating is None:
+        rating = instance.rating
+    ProductRatingSummary.apply_delta(
+        instance.product_id, count=-1, rating_sum=-rating, stars={rating: -1}, create=False
+    )
+    bump_namespace_on_commit("catalog")
+    bump_product_versions_on_commit(instance.product_id)
+
+
+# ---------- DailySalesRollup (incremental) ----------
+@receiver(post_init, sender=Order)
+def order_remember_status(sender, instance: Order, **kwargs):
+    instance._loaded_status = instance.__dict__.get("status") if instance.pk else None
+
+
+@receiver(post_save, sender=Order)
+def order_saved_update_rollup(sender, instance: Order, created, **kwargs):
+    was_counted = getattr(instance, "_loaded_status", None) in Order.COUNTED_STATUSES
+    is_counted = instance.status in Order.COUNTED_STATUSES
+    if is_counted and not was_counted:
+        apply_order(instance, 1)
+    elif was_counted and not is_counted:
+        apply_order(instance, -1)
+    instance._loaded_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted_update_rollup(sender, instance: Order, **kwargs):
+    # pre_delete: OrderItem ยังอยู่ให้คิดยอดที่ต้องหักออก
+    if getattr(instance, "_loaded_status", None) in Order.COUNTED_STATUSES:
+        apply_order(instance, -1)
@@ -0,0 +1,103 @@
+# orders/stock.py
+"""
+จอง / คืน stock ของ Variant แบบไม่มี race
+- จอง: UPDATE ... SET stock = stock - q WHERE id = ? AND stock >= q ทีละ variant
+  (DB ตรวจและลดในคำสั่งเดียว → ไม่ต้อง lock แถวก่อน และ stock ไม่มีทางติดลบ)
+- เรียงตาม variant id เสมอ → ทุก transaction lock แถวในลำดับเดียวกัน ไม่เกิด deadlock
+- ถ้าไม่พอแม้แต่รายการเดียว → rollback ทั้งชุด แล้วรายงานทุกรายการที่ขาดพร้อมกัน
+- .update() ไม่ยิง signal → bump cache ของ catalog / product fragment เอง
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from catalog.fragments import bump_product_versions_on_commit
+from catalog.models import Variant
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortfalls):
+        # [{"variant_id", "product_id", "product", "requested", "available"}, ...]
+        self.shortfalls = shortfalls
+        super().__init__(self.message)
+
+    @property
+    def message(self):
+        return " / ".join(
+            f"สินค้า {s['product']} เหลือไม่พอ (เหลือ {s['available']} ต้องการ {s['requested']})"
+            for s in self.shortfalls
+        )
+
+    def as_response_data(self):
+        return {"detail": self.message, "shortfalls": self.shortfalls}
+
+
+def _group(lines):
+    """รวมจำนวนต่อ variant (ตะกร้าอาจมี variant เดียวกันหลายบรรทัด) → {variant_id: (product_id, qty)}"""
+    wanted = defaultdict(int)
+    products = {}
+    for line in lines:
+        wanted[line.variant_id] += line.quantity
+        products[line.variant_id] = line.product_id
+    return {vid: (products[vid], qty) for vid, qty in wanted.items() if qty > 0}
+
+
+def _shortfalls(wanted, variant_ids):
+    rows = Variant.objects.filter(pk__in=variant_ids).values_list("id", "stock", "product__name")
+    found = {vid: (stock, name) for vid, stock, name in rows}
+    return [
+        {
+            "variant_id": vid,
+            "product_id": wanted[vid][0],
+            "product": found.get(vid, (0, ""))[1],
+            "requested": wanted[vid][1],
+            "available": found.get(vid, (0, ""))[0],
+        }
+        for vid in variant_ids
+    ]
+
+
+def check_stock(lines):
+    """ตรวจอย่างเดียว (ไม่จอง) ในคิวรีเดียว — raise InsufficientStock พร้อมทุกรายการที่ขาด"""
+    wanted = _group(lines)
+    stock = dict(Variant.objects.filter(pk__in=wanted).values_list("id", "stock"))
+    short = sorted(vid for vid, (_, qty) in wanted.items() if stock.get(vid, 0) < qty)
+    if short:
+        raise InsufficientStock(_shortfalls(wanted, short))
+
+
+def reserve_stock(lines):
+    """
+    ลด stock ตาม `lines` (object ที่มี variant_id / product_id / quantity เช่น OrderItem, CartItem)
+    ทั้งหมดหรือไม่ลดเลย: ถ้าขาด raise InsufficientStock (savepoint ถูก rollback แล้ว)
+    """
+    wanted = _group(lines)
+    short = []
+    with transaction.atomic():
+        for vid in sorted(wanted):
+            qty = wanted[vid][1]
+            if not Variant.objects.filter(pk=vid, stock__gte=qty).update(stock=F("stock") - qty):
+                short.append(vid)
+        if short:
+            # ทำต่อจนครบทุกรายการก่อน เพื่อรายงานที่ขาดทั้งหมดในครั้งเดียว
+            shortfalls = _shortfalls(wanted, short)
+            transaction.set_rollback(True)
+    if short:
+        raise InsufficientStock(shortfalls)
+    _stock_changed(wanted)
+
+
+def release_stock(lines):
+    """คืน stock (ยกเลิก / หมดเวลา / ปฏิเสธสลิป) เรียงตาม id เหมือนตอนจอง"""
+    wanted = _group(lines)
+    for vid in sorted(wanted):
+        Variant.objects.filter(pk=vid).update(stock=F("stock") + wanted[vid][1])
+    if wanted:
+        _stock_changed(wanted)
+
+
+def _stock_changed(wanted):
+    bump_namespace_on_commit("catalog")
+    bump_product_versions_on_commit(*{pid for pid, _ in wanted.values()})
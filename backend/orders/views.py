@@ -1,9 +1,8 @@
 # orders/views.py — PATCHED (add-only/related changes)
 from django.db import transaction
-from django.db.models import F, Avg, Count
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.utils import timezone
 
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
@@ -11,9 +10,15 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from decimal import Decimal  # ✅ NEW
-from coupons.models import Coupon, UserCoupon  # ✅ NEW
-
-from .models import Address, Cart, CartItem, Order, OrderItem, Favorite, Review, PaymentConfig
+from aj_shoes_backend.middleware.cache_api import bump_namespace_on_commit
+from aj_shoes_backend.pagination import RecentKeysetPagination
+from .expiry import sweep_expired_orders
+from .stock import InsufficientStock, check_stock, release_stock, reserve_stock
+from coupons.center import CENTER_NS
+from coupons.models import Coupon  # ✅ NEW
+from coupons.pricing import SHIPPING_FEE, claimed_coupons, pick_coupons, price
+
+from .models import Address, Cart, CartItem, Order, OrderItem, Favorite, Review, PaymentConfig, ProductRatingSummary
 from .serializers import (
     AddressSerializer,
     CartSerializer,
@@ -27,11 +32,18 @@ from .serializers import (
 User = get_user_model()
 
 
+CENT = Decimal("0.01")
+
+
 def _ensure_cart(user):
-    cart, _ = Cart.objects.get_or_create(user=user)
+    cart, _ = Cart.objects.select_related("coupon").get_or_create(user=user)
     return cart
 
 
+def _unit_price(product):
+    return Decimal(str(product.sale_price)).quantize(CENT)
+
+
 class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -47,23 +59,26 @@ class CartViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     # ----------------- session coupons helpers (NEW) -----------------
-    def _get_session_coupons(self, request):
-        """คืน (percent_coupon, free_coupon) ที่ยัง valid และ user เก็บไว้แล้ว"""
+    def _get_session_coupons(self, request, cart=None):
+        """
+        คืน (percent_coupon, free_coupon) ที่ยัง valid และ user เก็บไว้แล้ว — คิวรีเดียว (coupons.pricing)
+        ไม่มีใน session แต่มี cart.coupon (ของเดิม ใบเดียว) → fallback ตามประเภท
+        """
         data = request.session.get("cart_coupons") or {}
         percent_code = (data.get("percent") or "").strip()
         free_code = (data.get("free") or "").strip()
 
-        def resolve(code):
-            if not code:
-                return None
-            c = Coupon.objects.filter(code__iexact=code).first()
-            if not c or not c.is_active():
-                return None
-            if not UserCoupon.objects.filter(user=request.user, coupon=c).exists():
-                return None
-            return c
+        found = {c.code.lower(): c for c in claimed_coupons(request.user, [percent_code, free_code])}
+        percent_c = found.get(percent_code.lower()) if percent_code else None
+        free_c = found.get(free_code.lower()) if free_code else None
 
-        return resolve(percent_code), resolve(free_code)
+        # fallback ของเดิม: cart.coupon (ใบเดียว)
+        if cart is not None and cart.coupon and (not percent_c and not free_c):
+            if cart.coupon.discount_type == "percent":
+                percent_c = cart.coupon
+            elif cart.coupon.discount_type == "free_shipping":
+                free_c = cart.coupon
+        return percent_c, free_c
 
     def _set_session_coupons(self, request, codes):
         """
@@ -75,79 +90,47 @@ class CartViewSet(viewsets.ViewSet):
             codes = [codes]
         codes = [str(c).strip() for c in (codes or []) if c]
 
-        best_percent, free_ship = None, None
-        for c in Coupon.objects.filter(code__in=codes):
-            if not c.is_active():
-                continue
-            if not UserCoupon.objects.filter(user=request.user, coupon=c).exists():
-                continue
-            if c.discount_type == "percent":
-                if (best_percent is None) or (int(c.percent_off or 0) > int(best_percent.percent_off or 0)):
-                    best_percent = c
-            elif c.discount_type == "free_shipping":
-                free_ship = c
+        best_percent, free_ship = pick_coupons(claimed_coupons(request.user, codes))
 
         request.session["cart_coupons"] = {
             "percent": best_percent.code if best_percent else None,
             "free": free_ship.code if free_ship else None,
         }
         request.session.modified = True
-        return self._get_session_coupons(request)
 
-    def _summary(self, request, cart):
+    def _cart_items(self, cart):
+        """โหลดรายการในตะกร้าครั้งเดียว (ส่งต่อให้ CartSerializer ทาง context["items"])"""
+        return list(cart.items.select_related("product", "variant").prefetch_related("product__images"))
+
+    def _summary(self, request, cart, items=None):
         """
-        คำนวณ subtotal/discount/shipping/total + รายชื่อคูปองที่ใช้
+        คำนวณ subtotal/discount/shipping/total + รายชื่อคูปองที่ใช้ (coupons.pricing.price)
         ใช้คูปองจาก session ถ้ามี; ถ้าไม่มีให้ fallback เป็น cart.coupon (ของเดิม)
         """
-        items = cart.items.select_related("product", "variant")
-        subtotal = Decimal("0.00")
-        for it in items:
-            subtotal += Decimal(str(it.product.sale_price)) * it.quantity
-
-        shipping_base = Decimal("50.00")
-
-        # session coupons
-        percent_c, free_c = self._get_session_coupons(request)
-
-        # fallback: cart.coupon เดิม (ใบเดียว)
-        if cart.coupon and (not percent_c and not free_c):
-            if cart.coupon.discount_type == "percent":
-                percent_c = cart.coupon
-            elif cart.coupon.discount_type == "free_shipping":
-                free_c = cart.coupon
-
-        discount_percent = int(percent_c.percent_off) if percent_c else 0
-        discount_amount = (subtotal * Decimal(discount_percent) / Decimal(100)) if discount_percent else Decimal("0.00")
-        # ปัดเป็นบาท (เปลี่ยนเป็น Decimal("0.01") ถ้าต้องการสตางค์)
-        discount_amount = discount_amount.quantize(Decimal("1"))
-
-        shipping_fee = Decimal("0.00") if free_c else shipping_base
-        total = subtotal - discount_amount + shipping_fee
-        if total < 0:
-            total = Decimal("0.00")
-
-        applied = []
-        if percent_c:
-            applied.append({"code": percent_c.code, "discount_type": "percent", "percent_off": discount_percent})
-        if free_c:
-            applied.append({"code": free_c.code, "discount_type": "free_shipping"})
-
+        if items is None:
+            items = self._cart_items(cart)
+        subtotal = sum((_unit_price(it.product) * it.quantity for it in items), Decimal("0.00"))
+        percent_c, free_c = self._get_session_coupons(request, cart)
+        summary = price(subtotal, SHIPPING_FEE, percent_c, free_c)
         return {
-            "subtotal": float(subtotal),
-            "discount_amount": float(discount_amount),
-            "discount_percent": discount_percent,
-            "free_shipping": bool(free_c),
-            "shipping_fee": float(shipping_fee),
-            "applied_coupons": applied,
-            "total": float(total),
+            **summary,
+            "subtotal": float(summary["subtotal"]),
+            "discount_amount": float(summary["discount_amount"]),
+            "shipping_fee": float(summary["shipping_fee"]),
+            "total": float(summary["total"]),
         }
 
+    def _cart_response(self, request, cart):
+        """CartSerializer + summary จากรายการชุดเดียวกัน (ไม่ query items ซ้ำ)"""
+        items = self._cart_items(cart)
+        data = CartSerializer(cart, context={'request': request, 'items': {cart.pk: items}}).data
+        data.update(self._summary(request, cart, items))
+        return data
+
     # GET /api/orders/cart/
     def list(self, request):
         cart = _ensure_cart(request.user)
-        data = CartSerializer(cart, context={'request': request}).data  # ของเดิม
-        data.update(self._summary(request, cart))  # ✅ เพิ่มสรุปใหม่
-        return Response(data)
+        return Response(self._cart_response(request, cart))
 
     # POST /api/orders/cart/
     def create(self, request):
@@ -199,9 +182,7 @@ class CartViewSet(viewsets.ViewSet):
         codes = request.data.get("coupon_codes", None)
         if isinstance(codes, (list, tuple)) and len(codes) > 0:
             self._set_session_coupons(request, codes)
-            data = CartSerializer(cart, context={'request': request}).data
-            data.update(self._summary(request, cart))
-            return Response(data)
+            return Response(self._cart_response(request, cart))
 
         # โหมดเดิม: { "code": "ABC" } → เซ็ตลง cart.coupon ผ่าน serializer เดิม
         serializer = CartSerializer(
@@ -214,9 +195,7 @@ class CartViewSet(viewsets.ViewSet):
         request.session["cart_coupons"] = {"percent": None, "free": None}
         request.session.modified = True
 
-        data = CartSerializer(cart, context={'request': request}).data
-        data.update(self._summary(request, cart))
-        return Response(data)
+        return Response(self._cart_response(request, cart))
 
     # POST /api/orders/cart/remove-coupon/  (NEW)
     @action(detail=False, methods=["post"])
@@ -252,9 +231,7 @@ class CartViewSet(viewsets.ViewSet):
             cart.save(update_fields=["coupon"])
 
         # Return ข้อมูลอัปเดต
-        data = CartSerializer(cart, context={'request': request}).data
-        data.update(self._summary(request, cart))
-        return Response(data)
+        return Response(self._cart_response(request, cart))
 
     # POST /api/orders/cart/checkout/
     @action(detail=False, methods=["post"])
@@ -282,42 +259,30 @@ class CartViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        qs = cart.items.select_related("product", "variant")
+        # โหลดตะกร้าครั้งเดียวพร้อม relation ที่ response ต้องใช้ (รูปสินค้าสำหรับ ProductBriefSerializer)
+        qs = cart.items.select_related("product", "variant").prefetch_related("product__images")
         if item_ids:
             qs = qs.filter(id__in=item_ids)
+        items = list(qs)
 
-        if not qs.exists():
+        if not items:
             return Response({"detail": "No items selected."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate total before creating order
-        total = 0.0
-        for it in qs:
-            if it.variant.stock < it.quantity:
-                raise ValidationError(
-                    {"detail": f"Insufficient stock for {it.product.name} (variant {it.variant.id})."}
-                )
-            price = float(it.product.sale_price)
-            total += price * it.quantity
-
-        shipping_cost = 50.0
-
-        # ✅ ใช้คูปองจาก session (ส่วนลด% + ส่งฟรีพร้อมกัน)
-        percent_c, free_c = self._get_session_coupons(request)
-
-        # fallback ของเดิม: cart.coupon (ใบเดียว)
-        if cart.coupon and (not percent_c and not free_c):
-            if cart.coupon.discount_type == "percent":
-                percent_c = cart.coupon
-            elif cart.coupon.discount_type == "free_shipping":
-                free_c = cart.coupon
+        # ตรวจ stock ทุกบรรทัดในคิวรีเดียว (ยังไม่จอง — จองตอนอัปโหลดสลิป)
+        try:
+            check_stock(items)
+        except InsufficientStock as exc:
+            return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
 
-        # Apply coupon discount (คงโครงของเดิม แต่ขยายกรณี free+percent)
-        if percent_c and percent_c.discount_type == "percent":
-            total = total * (100.0 - float(percent_c.percent_off or 0)) / 100.0
-        if free_c and free_c.discount_type == "free_shipping":
-            shipping_cost = 0.0
+        # คิดราคาครั้งเดียวเป็น Decimal (ราคาต่อชิ้นเก็บลง OrderItem.price) — สูตรเดียวกับ _summary
+        prices = {it.pk: _unit_price(it.product) for it in items}
+        subtotal = sum((prices[it.pk] * it.quantity for it in items), Decimal("0.00"))
 
-        final_total = total + shipping_cost
+        # ✅ ใช้คูปองจาก session (ส่วนลด% + ส่งฟรีพร้อมกัน) / fallback cart.coupon
+        percent_c, free_c = self._get_session_coupons(request, cart)
+        summary = price(subtotal, SHIPPING_FEE, percent_c, free_c)
+        shipping_cost = summary["shipping_fee"]
+        final_total = summary["total"]
 
         with transaction.atomic():
             # Create order in PENDING_PAYMENT status
@@ -327,42 +292,41 @@ class CartViewSet(viewsets.ViewSet):
                 shipping_carrier=request.data.get("carrier", "Kerry"),
                 shipping_cost=shipping_cost,
                 coupon=cart.coupon,  # เก็บใบเดิมไว้เพื่อความเข้ากันได้
-                total=round(final_total, 2),
+                total=final_total,
                 status=Order.Status.PENDING_PAYMENT,
             )
 
-            # Create order items but don't reduce stock yet
-            for it in qs:
-                price = float(it.product.sale_price)
-                OrderItem.objects.create(
+            # Create order items but don't reduce stock yet (INSERT เดียว)
+            order_items = OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
                     product=it.product,
                     variant=it.variant,
-                    price=price,
+                    price=prices[it.pk],
                     quantity=it.quantity,
                 )
+                for it in items
+            ])
 
-            # Update coupon usage (ของเดิม + ครอบคลุม session coupons)
-            if cart.coupon:
-                c = cart.coupon
-                c.uses_count = F("uses_count") + 1
-                c.save(update_fields=["uses_count"])
-            if percent_c and (not cart.coupon or cart.coupon.id != percent_c.id):
-                percent_c.uses_count = F("uses_count") + 1
-                percent_c.save(update_fields=["uses_count"])
-            if free_c and (not cart.coupon or cart.coupon.id != free_c.id):
-                free_c.uses_count = F("uses_count") + 1
-                free_c.save(update_fields=["uses_count"])
+            # Update coupon usage (ของเดิม + ครอบคลุม session coupons) ใน UPDATE เดียว
+            # นับเฉพาะใบที่ price() ใช้จริง (เช่น ยอดไม่ถึง min_spend → ไม่นับ)
+            applied = {a["code"] for a in summary["applied_coupons"]}
+            used = {c.pk for c in (cart.coupon, percent_c, free_c) if c and c.code in applied}
+            if used:
+                Coupon.objects.filter(pk__in=used).update(uses_count=F("uses_count") + 1)
+                bump_namespace_on_commit(CENTER_NS)
 
-            qs.delete()
+            CartItem.objects.filter(pk__in=[it.pk for it in items]).delete()
 
-            cart.coupon = None
-            cart.save(update_fields=["coupon"])
+            if cart.coupon_id:
+                cart.coupon = None
+                cart.save(update_fields=["coupon"])
 
         # Return order with payment config
+        # response จาก object ในหน่วยความจำ (context["items"]) ไม่ต้อง query items/products/images ซ้ำ
         payment_config = PaymentConfig.objects.filter(is_active=True).first()
         response_data = {
-            "order": OrderSerializer(order, context={'request': request}).data,
+            "order": OrderSerializer(order, context={'request': request, 'items': {order.pk: order_items}}).data,
             "payment_config": PaymentConfigSerializer(payment_config, context={'request': request}).data if payment_config else None,
             "requires_payment": True
         }
@@ -402,23 +366,24 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # ตรวจสอบและลด stock เมื่ออัปโหลดสลิปสำเร็จ
+        # จอง stock เมื่ออัปโหลดสลิปสำเร็จ (conditional UPDATE ดู orders/stock.py)
         with transaction.atomic():
-            # ตรวจสอบ stock ก่อนลด
-            for order_item in order.items.all():
-                variant = order_item.variant
-                if variant.stock < order_item.quantity:
-                    return Response(
-                        {"detail": f"สินค้า {order_item.product.name} เหลือไม่พอ (เหลือ {variant.stock} ต้องการ {order_item.quantity})"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # ลด stock
-            for order_item in order.items.all():
-                variant = order_item.variant
-                variant.stock = F("stock") - order_item.quantity
-                variant.save(update_fields=["stock"])
-            
+            # lock order กัน upload ซ้อนกันแล้วลด stock ซ้ำ
+            # (ถ้า sweeper ลบ order ที่หมดเวลาไปก่อน → 404)
+            order = get_object_or_404(Order.objects.select_for_update(), pk=order.pk)
+            if order.status != Order.Status.PENDING_PAYMENT:
+                return Response(
+                    {"detail": "Order is not awaiting payment"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # อัปโหลดสลิปใหม่ทับของเดิม → stock ถูกจองไปแล้ว ไม่ลดซ้ำ
+            if not order.payment_slip:
+                try:
+                    reserve_stock(order.items.all())
+                except InsufficientStock as exc:
+                    return Response(exc.as_response_data(), status=status.HTTP_400_BAD_REQUEST)
+
             # บันทึกสลิป (status ยังเป็น PENDING_PAYMENT)
             order.payment_slip = payment_slip
             order.save()
@@ -442,12 +407,18 @@ class OrderViewSet(viewsets.ViewSet):
             )
 
         with transaction.atomic():
+            # lock order แล้วตรวจซ้ำ: upload_payment / sweeper / ยกเลิกซ้อนกันอาจเปลี่ยนสถานะหรือสลิปไปแล้ว
+            # (ถ้า sweeper ลบ order ที่หมดเวลาไปก่อน → 404)
+            order = get_object_or_404(Order.objects.select_for_update(), pk=order.pk)
+            if order.status != Order.Status.PENDING_PAYMENT:
+                return Response(
+                    {"detail": "Order cannot be cancelled"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # คืน stock กลับ (ถ้าเคยลดไปแล้ว)
             if order.payment_slip:  # ถ้าเคยอัปโหลดสลิปแล้ว = stock เคยถูกลด
-                for order_item in order.items.all():
-                    variant = order_item.variant
-                    variant.stock = F("stock") + order_item.quantity
-                    variant.save(update_fields=["stock"])
+                release_stock(order.items.all())
             
             # Restore cart items
             cart = _ensure_cart(request.user)
@@ -484,44 +455,11 @@ class OrderViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        expired_orders = Order.objects.filter(
-            status=Order.Status.PENDING_PAYMENT,
-            payment_deadline__lt=timezone.now()
-        )
-        
-        count = 0
-        with transaction.atomic():
-            for order in expired_orders:
-                # คืน stock (ถ้าเคยลดไปแล้ว)
-                if order.payment_slip:
-                    for order_item in order.items.all():
-                        variant = order_item.variant
-                        variant.stock = F("stock") + order_item.quantity
-                        variant.save(update_fields=["stock"])
-                
-                # คืนสินค้ากลับ cart
-                cart = _ensure_cart(order.user)
-                for order_item in order.items.all():
-                    cart_item, created = CartItem.objects.get_or_create(
-                        cart=cart,
-                        product=order_item.product,
-                        variant=order_item.variant,
-                        defaults={"quantity": order_item.quantity}
-                    )
-                    if not created:
-                        cart_item.quantity = F("quantity") + order_item.quantity
-                        cart_item.save()
-                
-                # คืน coupon usage
-                if order.coupon:
-                    order.coupon.uses_count = F("uses_count") - 1
-                    order.coupon.save(update_fields=["uses_count"])
-                
-                order.delete()
-                count += 1
-        
+        # ทำเป็น batch เล็ก ๆ (SKIP LOCKED) ดู orders/expiry.py — ปกติรันผ่าน `manage.py sweep_expired_orders`
+        stats = sweep_expired_orders()
         return Response({
-            "detail": f"Cleaned up {count} expired orders"
+            "detail": f"Cleaned up {stats['orders']} expired orders",
+            "stats": stats,
         })
 
 
@@ -553,6 +491,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = RecentKeysetPagination  # opt-in ด้วย ?cursor=
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
     def get_queryset(self):
@@ -569,14 +508,13 @@ class ReviewViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         """
         รองรับการอ่าน 'ทั้งหมด' แบบแบ่งหน้า:
-        - ?page=<n> (เริ่ม 1)
-        - ?page_size=<n> (ดีฟอลต์ 20)
-        ถ้ามี DRF paginator ใน settings จะใช้ของ DRF อัตโนมัติ
-        ถ้าไม่มี จะทำ fallback pagination เอง
+        - ?cursor=<opaque> (ค่าว่าง = หน้าแรก) → keyset pagination (-created_at, id) ไม่มี COUNT
+        - ?page=<n> (เริ่ม 1) + ?page_size=<n> (ดีฟอลต์ 20) → แบบเดิม
+          (count มาจาก ProductRatingSummary ถ้ามี ?product= ไม่งั้นใช้ค่าที่ cache ไว้)
         """
         queryset = self.get_queryset()
 
-        # ลองใช้ paginator ของ DRF ก่อน (ถ้าตั้งค่าไว้)
+        # keyset pagination (ถ้า client ส่ง ?cursor=)
         page = self.paginate_queryset(queryset)
         if page is not None:
             data = ReviewSerializer(page, many=True, context={"request": request}).data
@@ -594,7 +532,14 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
         start = (page_num - 1) * page_size
         end = start + page_size
-        total = queryset.count()
+        product_id = request.query_params.get("product")
+        if product_id:
+            total = (
+                ProductRatingSummary.objects.filter(pk=product_id)
+                .values_list("review_count", flat=True).first() or 0
+            )
+        else:
+            total = self.paginator.estimate_total(queryset)
         items = queryset[start:end]
         data = ReviewSerializer(items, many=True, context={"request": request}).data
         return Response({
@@ -620,7 +565,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not purchased:
             raise ValidationError({"detail": "You can review only products that have been delivered."})
 
-        serializer.save(user=user)
+        # ProductRatingSummary ถูกอัปเดตผ่าน signal → ให้อยู่ใน commit เดียวกับรีวิว
+        with transaction.atomic():
+            serializer.save(user=user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
 
     @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
     def summary(self, request):
@@ -637,7 +592,10 @@ class ReviewViewSet(viewsets.ModelViewSet):
             limit = 10
 
         base_qs = Review.objects.filter(product_id=product_id).select_related("user").order_by("-created_at")
-        total = base_qs.count()
+        total = (
+            ProductRatingSummary.objects.filter(pk=product_id)
+            .values_list("review_count", flat=True).first() or 0
+        )
         items = base_qs[:max(0, limit)]
         data = ReviewSerializer(items, many=True, context={"request": request}).data
         return Response({"total": total, "items": data})
@@ -656,25 +614,21 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not product_id:
             return Response({"detail": "product is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        qs = Review.objects.filter(product_id=product_id)
-        total = qs.count()
-        avg = qs.aggregate(avg=Avg("rating"))["avg"] or 0
-
-        # นับจำนวนรีวิวแต่ละดาว
-        counts = qs.values("rating").annotate(c=Count("id"))
-        stars = {str(i): 0 for i in range(1, 6)}
-        for row in counts:
-            stars[str(row["rating"])] = row["c"]
+        # อ่านจากตารางสรุป (PK lookup เดียว) แทนการ COUNT/AVG/GROUP BY ทุกครั้ง
+        summary = ProductRatingSummary.objects.filter(pk=product_id).first()
+        if summary is None:
+            summary = ProductRatingSummary(review_count=0, rating_sum=0)
 
         return Response({
-            "average": round(avg, 2),
-            "total": total,
-            "stars": stars,
+            "average": round(summary.average, 2),
+            "total": summary.review_count,
+            "stars": summary.stars(),
         })
 
 class MyOrdersView(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RecentKeysetPagination  # opt-in ด้วย ?cursor=
 
     def get_queryset(self):
         return (
@@ -12,6 +12,9 @@ type Noti = {
   is_read?: boolean 
 };
 
+// /api/notifications/ แบ่งหน้าเสมอ (ใหม่สุดก่อน)
+type NotiPage = { next: string | null; results: Noti[] };
+
 const API_BASE = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
 
 function buildHeaders(extra: Record<string, string> = {}) {
@@ -75,8 +78,8 @@ export default function NotificationBell() {
   useEffect(() => {
     const fetchUnread = async () => {
       try {
-        const list: Noti[] = await apiRequest("/api/notifications/?unread=true");
-        setUnread(list.length);
+        const { unread }: { unread: number } = await apiRequest("/api/notifications/unread-count/");
+        setUnread(unread);
       } catch (err) {
         console.warn("Failed to fetch unread notifications:", err);
       }
@@ -120,8 +123,8 @@ export default function NotificationBell() {
       setLoading(true);
       try {
         // โหลดรายการ notifications
-        const list: Noti[] = await apiRequest("/api/notifications/");
-        setItems(list);
+        const page: NotiPage = await apiRequest("/api/notifications/");
+        setItems(page.results);
 
         // mark all as read
         await apiRequest("/api/notifications/mark-all-read/", {
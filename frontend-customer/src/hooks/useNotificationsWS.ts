@@ -39,7 +39,8 @@ export function useNotificationsWS(onMessage: (data: any) => void) {
         });
         
         if (response.ok) {
-          const notifications = await response.json();
+          // response แบ่งหน้า { next, results } — หน้าแรกคือรายการใหม่สุด พอสำหรับรอบ 30 วินาที
+          const { results: notifications } = await response.json();
           // เฉพาะการแจ้งเตือนใหม่ (เปรียบเทียบกับ localStorage)
           const lastCheck = localStorage.getItem('last_notification_check');
           const lastCheckTime = lastCheck ? new Date(lastCheck).getTime() : 0;